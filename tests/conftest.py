@@ -0,0 +1,33 @@
+from dataclasses import replace
+
+import pytest
+
+from v2_mlops_modernisation.etl import run_etl
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.scripts.make_sample_data import Config, _make_reference, make_raw_chunk
+
+
+@pytest.fixture(scope="session")
+def raw_and_reference(tmp_path_factory):
+    """(RAW rows as read from the CSV, (neighbourhood, clinic) masters) for 4,000 synthetic rows.
+
+    600 patients give many visits per patient (modes and maxima span partitions), and the
+    default duplicate rate repeats some appointment_ids. Shared by the whole session:
+    tests that change the rows work on a copy.
+    """
+    cfg = replace(Config(), n_rows=4000, n_patients=600)
+    reference = _make_reference(cfg, tmp_path_factory.mktemp("data"))
+    raw = make_raw_chunk(cfg, 0, cfg.n_rows, *reference)
+    return raw.astype({"appointment_datetime": str, "booking_datetime": str}), reference
+
+
+@pytest.fixture(scope="session")
+def fact_and_vocab(raw_and_reference):
+    """(vocabulary-encoded curated fact, vocabulary) staged from raw_and_reference.
+
+    Shared by the whole session: tests that change the fact work on a copy.
+    """
+    raw, reference = raw_and_reference
+    stage = run_etl.transform_stage(raw, reference)
+    vocabulary = vocab.update(vocab.from_reference(*reference), stage)
+    return vocab.encode(run_etl.build_fact(stage), vocabulary), vocabulary
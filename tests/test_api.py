@@ -0,0 +1,225 @@
+from dataclasses import replace
+import asyncio
+
+import joblib
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.pipeline import Pipeline
+
+from v2_mlops_modernisation.api import main
+from v2_mlops_modernisation.api.batcher import MicroBatcher
+from v2_mlops_modernisation.api.model_store import WARMUP_RECORD, ModelHolder
+from v2_mlops_modernisation.api.prediction_cache import PredictionCache, request_key
+from v2_mlops_modernisation.features.derivations import model_frame
+from v2_mlops_modernisation.ml import backends, feature_cache, registry
+
+
+@pytest.fixture(scope="module")
+def pipelines(fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+    fm = feature_cache.build(fact, "2026-01-15", feature_cache.encoder_categories(vocabulary, fact))
+    out = []
+    for c in (1.0, 0.01):
+        clf = backends.get("logreg").make_estimator([], 0).set_params(C=c, max_iter=5000)
+        clf.fit(fm.X_train, fm.y_train)
+        out.append(Pipeline([("pre", fm.preprocessor), ("clf", clf)]))
+    return out
+
+
+def _register(root, run_id, payload=None, pipe=None):
+    tmp = registry.new_artifact_dir(root)
+    if pipe is not None:
+        joblib.dump(pipe, tmp / registry.MODEL_FILE)
+    else:
+        (tmp / registry.MODEL_FILE).write_bytes(payload)
+    registry.register({"run_id": run_id, "kind": "train", "model": "logreg"}, registry.commit_artifact(tmp, root),
+                      aliases=(registry.CHAMPION,), root=root)
+
+
+def test_holder_loads_once_and_swaps_on_champion_change(tmp_path, pipelines):
+    holder = ModelHolder(tmp_path / "missing.joblib", root=tmp_path, poll_s=0)
+    holder.start()
+    assert holder.current is None and not holder.status()["ready"]
+
+    _register(tmp_path, "r1", pipe=pipelines[0])
+    assert holder.refresh()
+    first = holder.current
+    assert first.version == "r1" and first.warmup_ms >= 0
+    assert not holder.refresh()
+    assert holder.current is first
+
+    _register(tmp_path, "r2", pipe=pipelines[1])
+    assert holder.refresh() and holder.current.version == "r2"
+    # a request that picked up the old model still scores with it
+    assert first.pipeline.predict_proba(model_frame([WARMUP_RECORD]))[0, 1] != \
+        holder.current.pipeline.predict_proba(model_frame([WARMUP_RECORD]))[0, 1]
+
+    _register(tmp_path, "broken", payload=b"not a pickle")
+    assert not holder.refresh()
+    assert holder.current.version == "r2" and holder.status()["last_error"]
+
+
+def test_fallback_file_version_and_api(tmp_path, pipelines, monkeypatch):
+    fallback = tmp_path / "best_model.joblib"
+    joblib.dump(pipelines[0], fallback)
+    holder = ModelHolder(fallback, root=tmp_path, poll_s=0)
+    monkeypatch.setattr(main, "holder", holder)
+    monkeypatch.setattr(main, "cache", PredictionCache(max_size=100, ttl_s=60))
+
+    with TestClient(main.app) as client:
+        health = client.get("/health").json()
+        assert health["status"] == "ok" and health["ready"] and health["fast_path"]
+        assert health["model_version"] == f"file-{registry.file_sha256(fallback)[:12]}"
+
+        out = client.post("/predict", json=WARMUP_RECORD).json()
+        expected = pipelines[0].predict_proba(model_frame([WARMUP_RECORD]))[0, 1]
+        assert out["predicted_no_show_proba"] == pytest.approx(expected)
+        # the compiled fast path skips the cache and says so
+        cache = client.get("/metrics").json()["cache"]
+        assert (cache["bypassed"], cache["hits"], cache["misses"]) == (1, 0, 0)
+
+
+def test_batch_matches_single_predictions_and_reports_bad_rows(tmp_path, pipelines, monkeypatch):
+    fallback = tmp_path / "best_model.joblib"
+    joblib.dump(pipelines[0], fallback)
+    monkeypatch.setattr(main, "holder", ModelHolder(fallback, root=tmp_path, poll_s=0))
+    good = [WARMUP_RECORD, {**WARMUP_RECORD, "age": 80, "lead_time_days": "30", "clinic_id": "C99"},
+            {**WARMUP_RECORD, "gender": "M", "deprivation_index": 0.9, "sms_reminder_sent": 0}]
+    bad = [{**WARMUP_RECORD, "age": 130, "gender": "X"}, {**WARMUP_RECORD, "lead_time_days": 2.5},
+           {k: v for k, v in WARMUP_RECORD.items() if k != "clinic_id"}, "not a record"]
+    records = [good[0], bad[0], good[1], bad[1], bad[2], good[2], bad[3]]
+
+    with TestClient(main.app) as client:
+        single = [client.post("/predict", json=r).json() for r in good]
+        out = client.post("/predict/batch", json={"records": records}).json()
+        columnar = client.post("/predict/batch", json={"columns": {k: [r[k] for r in good] for k in WARMUP_RECORD}}).json()
+        assert client.post("/predict/batch", json={"columns": {"age": [1, 2], "gender": ["F"]}}).status_code == 422
+
+    assert out["n_rows"] == 7 and out["n_valid"] == 3
+    preds = out["predictions"]
+    assert [p["index"] for p in preds] == list(range(7))
+    for p, s in zip([preds[0], preds[2], preds[5]], single):
+        assert p["predicted_no_show_proba"] == pytest.approx(s["predicted_no_show_proba"])
+        assert p["risk_band"] == s["risk_band"] and p["errors"] == []
+    assert [e["loc"][0] for e in preds[1]["errors"]] == ["age", "gender"]
+    assert preds[3]["errors"][0]["type"] == "int_from_float"
+    assert preds[4]["errors"][0] == {"loc": ["clinic_id"], "msg": "Field required", "type": "missing"}
+    assert preds[6]["errors"][0]["type"] == "dict_type" and preds[6]["predicted_no_show_proba"] is None
+    assert [p["predicted_no_show_proba"] for p in columnar["predictions"]] == \
+        pytest.approx([s["predicted_no_show_proba"] for s in single])
+
+
+def test_micro_batcher_flushes_on_size_and_wait_and_bounds_the_queue():
+    sizes = []
+
+    def score(records):
+        sizes.append(len(records))
+        return [r["x"] / 10 for r in records]
+
+    async def scenario():
+        batcher = MicroBatcher(score, max_batch=4, max_wait_ms=20, max_queue=16)
+        await batcher.start()
+        burst = await asyncio.gather(*(batcher.submit({"x": i}) for i in range(10)))
+        lone = await batcher.submit({"x": 5})
+        # the consumer is only scheduled once the loop is free: fill the queue first
+        futures = [asyncio.ensure_future(batcher.submit({"x": 1})) for _ in range(17)]
+        await asyncio.sleep(0)
+        rejected = [f for f in futures if f.done() and isinstance(f.exception(), asyncio.QueueFull)]
+        await asyncio.gather(*(f for f in futures if f not in rejected))
+        metrics = batcher.metrics()
+        await batcher.stop()
+        return burst, lone, len(rejected), metrics
+
+    burst, lone, rejected, metrics = asyncio.run(scenario())
+    assert burst == pytest.approx([i / 10 for i in range(10)]) and lone == pytest.approx(0.5)
+    assert sizes[:4] == [4, 4, 2, 1]
+    assert rejected == 1 and metrics["rejected"] == 1
+    assert metrics["requests"] == 27 and metrics["batched_requests"] == 27 and metrics["max_batch_seen"] == 4
+    assert metrics["flush_full"] >= 2 and metrics["flush_wait"] >= 2 and metrics["queue_depth"] == 0
+
+
+def test_predict_through_micro_batcher(tmp_path, pipelines, monkeypatch):
+    fallback = tmp_path / "best_model.joblib"
+    joblib.dump(pipelines[0], fallback)
+    monkeypatch.setattr(main, "holder", ModelHolder(fallback, root=tmp_path, poll_s=0))
+    monkeypatch.setattr(main, "batcher", MicroBatcher(main.score_records, max_batch=8, max_wait_ms=1))
+
+    with TestClient(main.app) as client:
+        out = client.post("/predict", json=WARMUP_RECORD).json()
+        metrics = client.get("/metrics").json()["batcher"]
+    expected = pipelines[0].predict_proba(model_frame([WARMUP_RECORD]))[0, 1]
+    assert out["predicted_no_show_proba"] == pytest.approx(expected)
+    assert metrics["requests"] == 1 and metrics["batches"] == 1 and metrics["max_batch"] == 8
+
+
+def test_prediction_cache_lru_ttl_and_canonical_keys():
+    now = [0.0]
+    cache = PredictionCache(max_size=2, ttl_s=10, clock=lambda: now[0])
+    a = request_key({"age": 42, "gender": "F", "age_band": "30-44"}, "v1")
+    assert a == request_key({"gender": "F", "age": 42}, "v1") != request_key({"gender": "F", "age": 42}, "v2")
+    b, c = request_key({"age": 43}, "v1"), request_key({"age": 44}, "v1")
+
+    assert cache.get(a) is None
+    cache.put(a, 0.1)
+    cache.put(b, 0.2)
+    assert cache.get(a) == 0.1  # a is now most recent
+    cache.put(c, 0.3)           # evicts b
+    assert cache.get(b) is None and cache.get(c) == 0.3
+    now[0] = 11
+    assert cache.get(a) is None
+    m = cache.metrics()
+    assert (m["hits"], m["misses"], m["evictions"], m["expirations"], m["size"]) == (2, 3, 1, 1, 1)
+
+
+def test_predict_cache_hits_and_clears_on_hot_swap(tmp_path, pipelines, monkeypatch):
+    _register(tmp_path, "r1", pipe=pipelines[0])
+    holder = ModelHolder(tmp_path / "missing.joblib", root=tmp_path, poll_s=0)
+    monkeypatch.setattr(main, "holder", holder)
+    monkeypatch.setattr(main, "cache", PredictionCache(max_size=100, ttl_s=60))
+
+    with TestClient(main.app) as client:
+        # the cache sits in front of the pipeline path
+        holder.current = replace(holder.current, compiled=None)
+        first = client.post("/predict", json=WARMUP_RECORD).json()
+        again = client.post("/predict", json={**WARMUP_RECORD, "age_band": "75+"}).json()
+        assert again == first
+        assert client.get("/metrics").json()["cache"]["hits"] == 1
+
+        _register(tmp_path, "r2", pipe=pipelines[1])
+        assert holder.refresh()
+        holder.current = replace(holder.current, compiled=None)
+        swapped = client.post("/predict", json=WARMUP_RECORD).json()
+        metrics = client.get("/metrics").json()["cache"]
+
+    assert swapped["predicted_no_show_proba"] == pytest.approx(
+        pipelines[1].predict_proba(model_frame([WARMUP_RECORD]))[0, 1])
+    assert metrics["invalidations"] == 1 and metrics["misses"] == 2 and metrics["size"] == 1
+
+
+def test_batched_prediction_is_cached_under_the_model_that_scored_it(tmp_path, pipelines, monkeypatch):
+    _register(tmp_path, "r1", pipe=pipelines[0])
+    holder = ModelHolder(tmp_path / "missing.joblib", root=tmp_path, poll_s=0)
+    holder.start()
+    cache = PredictionCache(max_size=100, ttl_s=60)
+    holder.on_swap.append(cache.clear)
+    monkeypatch.setattr(main, "holder", holder)
+    monkeypatch.setattr(main, "cache", cache)
+    request = main.PredictionRequest(**WARMUP_RECORD)
+
+    async def scenario():
+        batcher = MicroBatcher(main.score_records, max_batch=8, max_wait_ms=100)
+        monkeypatch.setattr(main, "batcher", batcher)
+        await batcher.start()
+        pending = asyncio.ensure_future(main.predict(request))
+        await asyncio.sleep(0.02)  # queued while r1 serves; the batch is still collecting
+        _register(tmp_path, "r2", pipe=pipelines[1])
+        assert holder.refresh()
+        out = await pending
+        await batcher.stop()
+        return out
+
+    out = asyncio.run(scenario())
+    expected = pipelines[1].predict_proba(model_frame([WARMUP_RECORD]))[0, 1]
+    assert out.predicted_no_show_proba == pytest.approx(expected)
+    assert cache.get(request_key(request.model_dump(), "r1")) is None
+    assert cache.get(request_key(request.model_dump(), "r2")) == pytest.approx(expected)
@@ -0,0 +1,33 @@
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+from v2_mlops_modernisation.features.derivations import model_frame
+from v2_mlops_modernisation.ml import backends, feature_cache
+
+
+def test_hgb_backend_trains_on_cached_ordinal_matrices(tmp_path, fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+
+    backend = backends.get("hgb")
+    fm = feature_cache.get_or_build(fact, "2026-01-15", vocabulary, tmp_path / "cache", encoding=backend.encoding)
+    again = feature_cache.get_or_build(fact, "2026-01-15", vocabulary, tmp_path / "cache", encoding=backend.encoding)
+    assert again.hit and isinstance(again.X_train, np.ndarray)
+    assert fm.X_train.shape[1] == 16
+    # ordinal value = vocabulary code
+    clinic_col = 8 + 4
+    train_rows = fact[feature_cache.split_mask(fact, "2026-01-15")]
+    np.testing.assert_array_equal(fm.X_train[:, clinic_col], train_rows["clinic_id"].cat.codes.to_numpy())
+
+    categories = feature_cache.encoder_categories(vocabulary, fact)
+    clf = backend.make_estimator(categories, 0)
+    clf.fit(again.X_train, again.y_train)
+    assert clf.n_iter_ < clf.max_iter  # early stopping
+    assert clf.is_categorical_ is not None and clf.is_categorical_[8:].all()
+
+    pipe = Pipeline([("pre", again.preprocessor), ("clf", clf)])
+    record = model_frame(fact.head(1)).astype({"clinic_id": object}).assign(clinic_id="C99")
+    proba = pipe.predict_proba(record)[:, 1]
+    assert 0 < proba[0] < 1
+
+    effects = backend.feature_effects(pipe, again.X_test, again.y_test)
+    assert list(effects.columns) == ["feature", "permutation_importance"] and len(effects) == 16
@@ -0,0 +1,75 @@
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+from joblib import dump
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from v2_mlops_modernisation.etl import run_etl
+from v2_mlops_modernisation.features.derivations import model_frame, risk_band
+from v2_mlops_modernisation.ml import feature_cache, score
+from v2_mlops_modernisation.storage import parquet_store
+
+
+def _fit(fact, vocabulary):
+    pipe = Pipeline([("pre", feature_cache.make_preprocessor(feature_cache.encoder_categories(vocabulary, fact))),
+                     ("clf", LogisticRegression(max_iter=5000))])
+    return pipe.fit(model_frame(fact), fact["no_show_label"])
+
+
+def test_chunked_pool_scoring_matches_single_call(tmp_path, fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+    pipe = _fit(fact, vocabulary)
+    model_path = tmp_path / "model.joblib"
+    dump(pipe, model_path)
+    chunks = [fact.iloc[i:i + 250] for i in range(0, len(fact), 250)]
+
+    inline = pd.concat(score.score_chunks(chunks, model_path, workers=1), ignore_index=True)
+    pooled = pd.concat(score.score_chunks(chunks, model_path, workers=2), ignore_index=True)
+
+    expected = pipe.predict_proba(model_frame(fact))[:, 1]
+    pd.testing.assert_frame_equal(inline, pooled)
+    assert inline["appointment_id"].tolist() == fact["appointment_id"].tolist()
+    np.testing.assert_allclose(inline["predicted_no_show_proba"], expected)
+    assert inline["risk_band"].tolist() == [risk_band(float(p)) for p in expected]
+
+
+def test_attach_predictions_keeps_rows_and_replaces_stale_scores():
+    fact = pd.DataFrame({"appointment_id": ["A1", "A2", "A1"], "risk_band": ["Low", "Low", "Low"]})
+    preds = pd.DataFrame({"appointment_id": ["A2", "A1"], "predicted_no_show_proba": [0.6, 0.8],
+                          "risk_band": ["High", "Critical"]})
+    got = score.attach_predictions(fact, preds)
+    assert got["appointment_id"].tolist() == ["A1", "A2", "A1"]
+    assert got["risk_band"].tolist() == ["Critical", "High", "Critical"]
+
+
+def test_run_writes_scores_chunk_by_chunk(tmp_path, monkeypatch, raw_and_reference, fact_and_vocab):
+    data = tmp_path / "data"
+    p = run_etl.Paths(base=tmp_path, raw=data / "raw", staged=data / "staged", curated=data / "curated",
+                      ref=data / "reference", wh=tmp_path / "warehouse")
+    raw, reference = raw_and_reference
+    monkeypatch.setattr(run_etl, "_paths", lambda: p)
+    monkeypatch.setattr(run_etl, "load_reference", lambda: reference)
+    monkeypatch.setattr(sys, "argv", ["run_etl"])
+    monkeypatch.setattr(score, "_base", lambda: tmp_path)
+    monkeypatch.setattr(parquet_store, "default_root", lambda: run_etl.parquet_root(p))
+    p.raw.mkdir(parents=True)
+    raw.to_csv(p.raw / "appointments_raw.csv", index=False)
+    run_etl.main()
+    model_path = tmp_path / "model.joblib"
+    dump(_fit(*fact_and_vocab), model_path)
+
+    summary = score.run(model_path, chunk_rows=700)
+
+    side = pd.read_csv(p.curated / f"{score.PREDICTIONS_TABLE}.csv")
+    stored = parquet_store.read_table("curated", score.PREDICTIONS_TABLE)
+    assert summary["rows_scored"] == len(side) == len(stored) > 700
+    assert side["appointment_id"].is_unique
+    assert sorted(p.name for p in summary["predictions"].iterdir()) == sorted(
+        {f"date_month={d[:7]}" for d in side["date_key"]})
+    with sqlite3.connect(p.wh / "warehouse.db") as conn:
+        scored = pd.read_sql("SELECT appointment_id, predicted_no_show_proba FROM fact_appointments", conn)
+    merged = scored.merge(side, on="appointment_id", validate="one_to_one")
+    np.testing.assert_allclose(merged["predicted_no_show_proba_x"], merged["predicted_no_show_proba_y"])
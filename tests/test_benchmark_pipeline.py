@@ -0,0 +1,68 @@
+from v2_mlops_modernisation.monitoring import timings
+from v2_mlops_modernisation.scripts import benchmark_pipeline as bench
+
+
+def _doc(train_wall=10.0, fit_wall=8.0, rss=300.0, train_rc=0):
+    return {"results": [
+        {"scale": 1000, "stage": "run_etl", "returncode": 0, "wall_s": 2.0, "cpu_s": 2.0, "peak_rss_mb": 200.0,
+         "rows": 1000, "rows_per_s": 500.0, "steps": []},
+        {"scale": 1000, "stage": "train", "returncode": train_rc, "wall_s": train_wall, "cpu_s": train_wall,
+         "peak_rss_mb": rss, "rows": 1000, "rows_per_s": 1000 / train_wall,
+         "steps": [{"step": "fit", "wall_s": fit_wall, "cpu_s": fit_wall, "rows": 800, "peak_rss_mb": rss}]},
+    ]}
+
+
+def _regressed(rows):
+    return {(r["stage"], r["step"], r["metric"]) for r in rows if r["regressed"]}
+
+
+def test_compare_flags_growth_beyond_tolerance_and_noise_floor():
+    base = _doc()
+    assert _regressed(bench.compare(base, _doc(train_wall=11.5, fit_wall=9.5), 0.2, 0.5, 64)) == set()
+
+    rows = bench.compare(base, _doc(train_wall=13.0, fit_wall=11.0, rss=400.0), 0.2, 0.5, 64)
+    assert _regressed(rows) == {("train", "_total", "wall_s"), ("train", "_total", "cpu_s"),
+                                ("train", "fit", "wall_s"), ("train", "fit", "cpu_s"),
+                                ("train", "_total", "peak_rss_mb"), ("train", "fit", "peak_rss_mb")}
+
+    # +50% but only 0.1 s: below the noise floor
+    small = {"results": [dict(base["results"][0], wall_s=0.2, cpu_s=0.2)]}
+    assert _regressed(bench.compare(small, {"results": [dict(small["results"][0], wall_s=0.3)]}, 0.2, 0.5, 64)) == set()
+
+
+def test_compare_skips_failed_stages():
+    rows = bench.compare(_doc(), _doc(train_wall=100.0, train_rc=1), 0.2, 0.5, 64)
+    assert {r["stage"] for r in rows} == {"run_etl"}
+
+
+def test_scaling_table_lists_rows_per_second_by_scale():
+    doc = _doc()
+    big = [dict(r, scale=10_000, rows=10_000, rows_per_s=r["rows_per_s"] * 2) for r in doc["results"]]
+    table = bench.scaling_table(doc["results"] + big).splitlines()
+    assert table[0].split() == ["stage", "1,000", "10,000"]
+    assert table[1].split() == ["run_etl", "500", "1,000"]
+    assert table[2].split() == ["train", "100", "200"]
+
+
+def test_laps_write_step_records_only_when_enabled(tmp_path, monkeypatch):
+    path = tmp_path / "steps.jsonl"
+    monkeypatch.delenv(timings.ENV_VAR, raising=False)
+    timings.Laps("run_etl")("extract", rows=10)
+    assert not path.exists()
+
+    monkeypatch.setenv(timings.ENV_VAR, str(path))
+    laps = timings.Laps("run_etl")
+    laps("extract", rows=10)
+    laps("stage")
+    records = timings.read(path)
+    assert [(r["stage"], r["step"], r["rows"]) for r in records] == [("run_etl", "extract", 10), ("run_etl", "stage", None)]
+    assert all(r["wall_s"] >= 0 and r["peak_rss_mb"] > 0 for r in records)
+
+
+def test_run_stage_with_timeout_reaps_finished_and_kills_slow_stages(tmp_path):
+    log = tmp_path / "bench.log"
+    done = bench.run_stage("quick", ["-c", "print(1)"], tmp_path, 10, log, timeout=30)
+    assert done["returncode"] == 0 and not done["timed_out"] and done["cpu_s"] >= 0
+
+    slow = bench.run_stage("slow", ["-c", "import time; time.sleep(30)"], tmp_path, 10, log, timeout=0.5)
+    assert slow["returncode"] != 0 and slow["timed_out"] and slow["wall_s"] < 10
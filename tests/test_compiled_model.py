@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+from v2_mlops_modernisation.features.derivations import MODEL_FEATURES, model_frame, risk_band
+from v2_mlops_modernisation.ml import backends, compiled, feature_cache, incremental
+
+
+def _records(fact):
+    records = model_frame(fact).astype({c: object for c in ["clinic_id", "gender"]}).to_dict("records")
+    # unknown category, wrong age band, string / missing numerics
+    records[0]["clinic_id"] = "C99"
+    records[1]["age_band"] = "75+"
+    records[2]["lead_time_days"] = "12"
+    records[3]["deprivation_index"] = None
+    return records
+
+
+def test_compiled_logreg_matches_joblib_pipeline(tmp_path, fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+    backend = backends.get("logreg")
+    fm = feature_cache.build(fact, "2026-01-15", feature_cache.encoder_categories(vocabulary, fact))
+    clf = backend.make_estimator([], 0).set_params(max_iter=5000)
+    clf.fit(fm.X_train, fm.y_train)
+    pipe = Pipeline([("pre", fm.preprocessor), ("clf", clf)])
+    assert compiled.supports(pipe)
+
+    model = compiled.load(compiled.export(pipe, tmp_path / "best_model.compiled"))
+    assert isinstance(model.coef, np.memmap)
+
+    records = _records(fact)
+    expected = pipe.predict_proba(model_frame(records))[:, 1]
+    np.testing.assert_allclose(model.predict_proba(records), expected, rtol=0, atol=1e-12)
+    columns = {c: [r[c] for r in records] for c in MODEL_FEATURES}
+    np.testing.assert_allclose(model.predict_proba(columns), expected, rtol=0, atol=1e-12)
+    assert model.risk_band(expected).tolist() == risk_band(expected).tolist()
+
+
+def test_compiled_sgd_folds_the_scaler(tmp_path, fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+    pipe = incremental.make_pipeline(fact, vocabulary, incremental.Config())
+    incremental.partial_fit(pipe, fact, 1000)
+
+    model = compiled.load(compiled.export(pipe, tmp_path / "online.compiled"))
+    records = _records(fact)
+    np.testing.assert_allclose(model.predict_proba(records), pipe.predict_proba(model_frame(records))[:, 1],
+                               rtol=0, atol=1e-10)
+
+
+def test_non_linear_pipeline_is_not_compiled(tmp_path, fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+    categories = feature_cache.encoder_categories(vocabulary, fact)
+    fm = feature_cache.build(fact, "2026-01-15", categories, encoding="ordinal")
+    clf = backends.get("hgb").make_estimator(categories, 0).set_params(max_iter=5)
+    clf.fit(fm.X_train, fm.y_train)
+    assert not compiled.supports(Pipeline([("pre", fm.preprocessor), ("clf", clf)]))
+    assert compiled.from_pipeline(Pipeline([("pre", fm.preprocessor), ("clf", clf)])) is None
+
+    path = tmp_path / "best_model.compiled"
+    path.mkdir()
+    compiled.remove(path)
+    assert not path.exists()
+
+
+def test_predict_one_matches_pipeline_and_is_sub_millisecond(tmp_path, fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+    fm = feature_cache.build(fact, "2026-01-15", feature_cache.encoder_categories(vocabulary, fact))
+    clf = backends.get("logreg").make_estimator([], 0).set_params(max_iter=5000)
+    clf.fit(fm.X_train, fm.y_train)
+    pipe = Pipeline([("pre", fm.preprocessor), ("clf", clf)])
+    model = compiled.from_pipeline(pipe)
+
+    records = _records(fact)[:500]
+    expected = pipe.predict_proba(model_frame(records))[:, 1]
+    np.testing.assert_allclose([model.predict_one(r) for r in records], expected, rtol=0, atol=1e-12)
+
+    timings = []
+    for r in records * 4:
+        t0 = time.perf_counter()
+        model.predict_one(r)
+        timings.append(time.perf_counter() - t0)
+    assert np.percentile(timings, 99) < 1e-3
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from v2_mlops_modernisation.storage import csv_store
+
+
+def _fact():
+    return pd.DataFrame({
+        "appointment_id": ["a1", "a2", "a3", "a4", "a5"],
+        "date_key": ["2026-02-03", "2025-12-30", "2026-01-02", "2026-01-20", "2026-02-10"],
+        "clinic_id": ["C01", "C02", "C, 3", "C01", "C02"],
+        "lead_time_days": [4, 1, 2, 3, 5],
+    })
+
+
+def test_upsert_rewrites_the_tail_from_the_earliest_touched_month(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_store, "BLOCK_BYTES", 7)  # rows span scan blocks
+    path = tmp_path / "fact_appointments.csv"
+    csv_store.write_table(_fact(), path, "fact_appointments")
+    head = path.read_bytes()
+    assert pd.read_csv(path)["appointment_id"].tolist() == ["a2", "a3", "a4", "a1", "a5"]
+
+    # a4 moves from January to February, a6 is new
+    delta = pd.DataFrame({"appointment_id": ["a4", "a6"], "date_key": ["2026-02-11", "2026-02-12"],
+                          "clinic_id": ["C03", "C01"], "lead_time_days": [7, 8]})
+    csv_store.upsert_table(delta, path, "fact_appointments", "appointment_id", stale_months={"2026-01"})
+
+    got = pd.read_csv(path)
+    assert got["appointment_id"].tolist() == ["a2", "a3", "a1", "a5", "a4", "a6"]
+    assert got.set_index("appointment_id").loc["a4", "clinic_id"] == "C03"
+    assert got.set_index("appointment_id").loc["a3", "clinic_id"] == "C, 3"
+    # rows before the earliest touched month are left as they were
+    january = head.index(b"\na3,")
+    assert path.read_bytes()[:january] == head[:january]
+
+
+def test_upsert_deletes_keys_missing_from_the_delta(tmp_path):
+    path = tmp_path / "kpi_daily.csv"
+    kpi = pd.DataFrame({"date_key": ["2026-01-01", "2026-01-02", "2026-01-03"], "appointments": [3, 1, 2]})
+    csv_store.write_table(kpi, path, "kpi_daily")
+
+    csv_store.upsert_table(kpi.iloc[[2]].assign(appointments=5), path, "kpi_daily", "date_key",
+                           stale_months={"2026-01"}, keys={"2026-01-02", "2026-01-03"})
+
+    assert pd.read_csv(path).values.tolist() == [["2026-01-01", 3], ["2026-01-03", 5]]
+
+
+def test_table_writer_matches_write_table(tmp_path):
+    whole, streamed = tmp_path / "whole.csv", tmp_path / "streamed.csv"
+    csv_store.write_table(_fact(), whole, "fact_appointments")
+
+    with csv_store.table_writer(streamed, "fact_appointments") as write:
+        for i in range(0, 5, 2):
+            write(_fact().iloc[i:i + 2])
+
+    assert streamed.read_bytes() == whole.read_bytes()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["streamed.csv", "whole.csv"]
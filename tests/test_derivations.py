@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from v2_mlops_modernisation.features.derivations import age_band, lead_time_band, model_frame, risk_band, time_fields
+
+
+def test_age_band_edges_for_column_and_scalar():
+    ages = pd.Series([-3, 0, 17, 18, 29, 30, 44, 45, 59, 60, 74, 75, 110])
+    expected = ["Unknown", "0-17", "0-17", "18-29", "18-29", "30-44", "30-44",
+                "45-59", "45-59", "60-74", "60-74", "75+", "75+"]
+    assert age_band(ages).tolist() == expected
+    assert [age_band(int(a)) for a in ages] == expected
+
+
+def test_lead_time_band_edges_for_column_and_scalar():
+    days = np.array([-1, 0, 1, 2, 3, 7, 8, 14, 15, 30, 31, 200])
+    expected = ["0", "0", "1-2", "1-2", "3-7", "3-7", "8-14", "8-14", "15-30", "15-30", "31+", "31+"]
+    assert lead_time_band(days).tolist() == expected
+    assert [lead_time_band(int(d)) for d in days] == expected
+
+
+def test_risk_band_edges_for_column_and_scalar():
+    proba = np.array([0.0, 0.3499, 0.35, 0.5499, 0.55, 0.7499, 0.75, 1.0])
+    expected = ["Low", "Low", "Medium", "Medium", "High", "High", "Critical", "Critical"]
+    assert risk_band(proba).tolist() == expected
+    assert [risk_band(float(p)) for p in proba] == expected
+
+
+def test_time_fields_column_matches_single_record():
+    dts = pd.Series(pd.to_datetime(["2026-02-07 08:15:00", "2026-02-09 17:45:00"]))
+    cols = time_fields(dts)
+    for i, dt in enumerate(dts):
+        rec = time_fields(dt.to_pydatetime())
+        assert rec == {k: v.iloc[i].item() if hasattr(v.iloc[i], "item") else v.iloc[i] for k, v in cols.items()}
+
+
+def test_model_frame_rederives_age_band():
+    X = model_frame([{"age": 70, "age_band": "0-17", "lead_time_days": "5", "sms_reminder_sent": None}])
+    assert X.loc[0, "age_band"] == "60-74"
+    assert X.loc[0, "lead_time_days"] == 5
+    assert X.loc[0, "sms_reminder_sent"] == 0
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from v2_mlops_modernisation.etl.run_etl import build_dim_patient
+from v2_mlops_modernisation.scripts.benchmark_dim_patient import build_dim_patient_lambda, make_rows
+
+
+def test_dim_patient_mode_attributes_break_ties_like_series_mode():
+    df = pd.DataFrame({
+        "patient_id": ["b", "b", "a", "a", "a", "c", "c", "d"],
+        "gender": ["M", "F", "M", "M", "F", None, None, "F"],
+        "age_band": ["30-44", "18-29", "45-59", "60-74", "60-74", "0-17", "0-17", None],
+        "age": [40, 29, 55, 61, 62, 10, 11, 33],
+        "chronic_conditions_count": 0, "disability_flag": 0, "prior_no_show_count": 0,
+    })
+    mode = lambda s: s.mode().iloc[0] if not s.mode().empty else np.nan
+    expected = df.groupby("patient_id").agg(gender=("gender", mode), age_band=("age_band", mode))
+
+    got = build_dim_patient(df).set_index("patient_id")
+
+    assert got["gender"].to_dict() == {"a": "M", "b": "F", "c": got.loc["c", "gender"], "d": "F"}
+    assert pd.isna(got.loc["c", "gender"]) and pd.isna(got.loc["d", "age_band"])
+    pd.testing.assert_frame_equal(got[["gender", "age_band"]], expected, check_names=False)
+
+
+def test_vectorized_dim_patient_matches_lambda_reference():
+    df = make_rows(n_patients=2000, visits_per_patient=2.5, seed=7)
+
+    pd.testing.assert_frame_equal(build_dim_patient(df), build_dim_patient_lambda(df))
@@ -0,0 +1,166 @@
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from joblib import dump
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from v2_mlops_modernisation.etl import incremental, run_etl, state
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.features.derivations import model_frame
+from v2_mlops_modernisation.ml import feature_cache, score
+from v2_mlops_modernisation.storage import parquet_store, sqlite_store
+from v2_mlops_modernisation.warehouse import queries
+
+
+def _paths(tmp_path):
+    data = tmp_path / "data"
+    return run_etl.Paths(base=tmp_path, raw=data / "raw", staged=data / "staged", curated=data / "curated",
+                         ref=data / "reference", wh=tmp_path / "warehouse")
+
+
+def _write_raw(df, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False)
+
+
+def _history_and_day(tmp_path, monkeypatch, raw_and_reference):
+    """Paths, and RAW rows booked up to / after 2026-01-20."""
+    p = _paths(tmp_path)
+    monkeypatch.setattr(run_etl, "_paths", lambda: p)
+    monkeypatch.setattr(sys, "argv", ["run_etl"])
+    raw, reference = raw_and_reference
+    monkeypatch.setattr(run_etl, "load_reference", lambda: reference)
+
+    booked = pd.to_datetime(raw["booking_datetime"])
+    cutoff = pd.Timestamp("2026-01-20")
+    return p, raw[booked <= cutoff], raw[booked > cutoff].copy()
+
+
+def test_incremental_refresh_matches_full_rebuild(tmp_path, monkeypatch, raw_and_reference):
+    p, history, day = _history_and_day(tmp_path, monkeypatch, raw_and_reference)
+    # one already-loaded appointment is re-booked at another clinic
+    moved = history.iloc[[0]].assign(clinic_id="C01" if history.iloc[0]["clinic_id"] != "C01" else "C02",
+                                     booking_datetime="2026-01-21 09:00:00",
+                                     appointment_datetime="2026-01-30 10:00:00")
+    day = pd.concat([day, moved], ignore_index=True)
+
+    _write_raw(history, p.raw / "appointments_raw.csv")
+    run_etl.main()
+    _write_raw(day, p.raw / "appointments_raw_2026-02-09.csv")
+    summary = incremental.run_incremental(chunk_rows=500)
+
+    # reference: full rebuild over the merged history; later records (the re-booking and
+    # the sample's duplicated appointment_ids) win exactly as in a full run
+    loaded = run_etl.transform_stage(history)["appointment_id"]
+    new = run_etl.transform_stage(day)["appointment_id"]
+    assert summary["rows_replaced"] == new.isin(loaded).sum() > 1
+    expected = run_etl.build_curated(run_etl.transform_stage(pd.concat([history, day])))
+
+    for name in ["kpi_daily", "kpi_clinic_performance", "kpi_neighbourhood_hotspots",
+                 "dim_patient", "dim_clinic", "dim_neighbourhood", "dim_date"]:
+        got = pd.read_csv(p.curated / f"{name}.csv")
+        exp = expected[name].copy()
+        if name == "dim_date":
+            exp["date"] = exp["date"].dt.strftime("%Y-%m-%d")
+        pd.testing.assert_frame_equal(got, exp.reset_index(drop=True), check_dtype=False, obj=name)
+    for name in ["kpi_daily", "dim_date"]:
+        got = parquet_store.read_table("curated", name, root=run_etl.parquet_root(p))
+        pd.testing.assert_frame_equal(got, expected[name], check_dtype=False, check_categorical=False, obj=name)
+
+    # the fact CSV stays month-ordered, with the replaced rows rewritten in place
+    fact = pd.read_csv(p.curated / "fact_appointments.csv")
+    assert fact["date_key"].str.slice(0, 7).is_monotonic_increasing
+    exp = expected["fact_appointments"].astype({"appointment_datetime": str, "booking_datetime": str})
+    pd.testing.assert_frame_equal(fact.sort_values("appointment_id").reset_index(drop=True),
+                                  exp.sort_values("appointment_id").reset_index(drop=True),
+                                  check_dtype=False, obj="fact_appointments.csv")
+    with sqlite3.connect(p.wh / "warehouse.db") as conn:
+        got = pd.read_sql("SELECT appointment_id, clinic_id, lead_time_days FROM fact_appointments "
+                          "ORDER BY appointment_id", conn)
+    exp = expected["fact_appointments"].sort_values("appointment_id")[["appointment_id", "clinic_id", "lead_time_days"]]
+    pd.testing.assert_frame_equal(got, exp.reset_index(drop=True), check_dtype=False, obj="fact_appointments")
+
+    # staged outputs keep one record per appointment (the re-booking replaced its earlier record)
+    staged = pd.read_csv(p.staged / "appointments_staged.csv")
+    staged_parquet = parquet_store.read_table("staged", "appointments_staged", root=run_etl.parquet_root(p))
+    for df in (staged, staged_parquet):
+        assert df["appointment_id"].is_unique
+        assert set(df["appointment_id"]) == set(fact["appointment_id"])
+    assert staged.set_index("appointment_id").loc[moved.iloc[0]["appointment_id"], "clinic_id"] == moved.iloc[0]["clinic_id"]
+
+    # dashboard rollups refreshed for the affected dates equal a full recompute
+    with sqlite3.connect(p.wh / "warehouse.db") as conn:
+        for table, group in queries.ROLLUPS.items():
+            sql = f"SELECT * FROM {table} ORDER BY {', '.join(group)}"
+            refreshed = pd.read_sql(sql, conn)
+            queries.refresh_rollups(conn)
+            pd.testing.assert_frame_equal(refreshed, pd.read_sql(sql, conn), obj=table)
+
+    # nothing new: the second run reads no files and keeps the watermark
+    again = incremental.run_incremental(chunk_rows=500)
+    assert again["files_read"] == 0 and again["rows_upserted"] == 0
+    assert again["watermark"] == summary["watermark"]
+
+
+def test_failed_export_rolls_back_and_the_next_run_applies_the_delta(tmp_path, monkeypatch, raw_and_reference):
+    p, history, day = _history_and_day(tmp_path, monkeypatch, raw_and_reference)
+    _write_raw(history, p.raw / "appointments_raw.csv")
+    run_etl.main()
+    _write_raw(day, p.raw / "appointments_raw_2026-02-09.csv")
+    with sqlite3.connect(p.wh / "warehouse.db") as conn:
+        before = state.read_state(conn), conn.execute("SELECT COUNT(*) FROM fact_appointments").fetchone()
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(incremental, "export_curated", fail)
+        with pytest.raises(OSError):
+            incremental.run_incremental(chunk_rows=500)
+    with sqlite3.connect(p.wh / "warehouse.db") as conn:
+        assert (state.read_state(conn), conn.execute("SELECT COUNT(*) FROM fact_appointments").fetchone()) == before
+
+    summary = incremental.run_incremental(chunk_rows=500)
+
+    assert summary["rows_upserted"] > 0
+    fact = pd.read_csv(p.curated / "fact_appointments.csv")
+    staged = pd.read_csv(p.staged / "appointments_staged.csv")
+    with sqlite3.connect(p.wh / "warehouse.db") as conn:
+        loaded = conn.execute("SELECT COUNT(*) FROM fact_appointments").fetchone()[0]
+    assert fact["appointment_id"].is_unique and staged["appointment_id"].is_unique
+    assert len(fact) == len(staged) == loaded
+
+
+def test_incremental_run_scores_new_rows_of_a_scored_warehouse(tmp_path, monkeypatch, raw_and_reference):
+    p, history, day = _history_and_day(tmp_path, monkeypatch, raw_and_reference)
+    _write_raw(history, p.raw / "appointments_raw.csv")
+    run_etl.main()
+
+    fact = pd.read_csv(p.curated / "fact_appointments.csv")
+    vocabulary = vocab.load(p.ref / vocab.VOCAB_FILE)
+    pipe = Pipeline([("pre", feature_cache.make_preprocessor(feature_cache.encoder_categories(vocabulary, fact))),
+                     ("clf", LogisticRegression(max_iter=5000))])
+    pipe.fit(model_frame(fact), fact["no_show_label"])
+    model_path = tmp_path / "model.joblib"
+    dump(pipe, model_path)
+    # a batch scoring run over the full load
+    predictions = score.score_rows(fact, model_path)
+    sqlite_store.update_columns(p.wh / "warehouse.db", "fact_appointments", [predictions], "appointment_id")
+    predictions.to_csv(p.curated / f"{score.PREDICTIONS_TABLE}.csv", index=False)
+
+    _write_raw(day, p.raw / "appointments_raw_2026-02-09.csv")
+    summary = incremental.run_incremental(chunk_rows=500, model_path=model_path)
+
+    assert summary["rows_scored"] == summary["rows_upserted"] > 0
+    with sqlite3.connect(p.wh / "warehouse.db") as conn:
+        scored = pd.read_sql("SELECT * FROM fact_appointments ORDER BY appointment_id", conn)
+    assert scored["predicted_no_show_proba"].notna().all() and scored["risk_band"].notna().all()
+    np.testing.assert_allclose(scored["predicted_no_show_proba"],
+                               pipe.predict_proba(model_frame(scored))[:, 1])
+    side = pd.read_csv(p.curated / f"{score.PREDICTIONS_TABLE}.csv").sort_values("appointment_id")
+    assert side["appointment_id"].tolist() == scored["appointment_id"].tolist()
+    np.testing.assert_allclose(side["predicted_no_show_proba"], scored["predicted_no_show_proba"])
@@ -0,0 +1,21 @@
+import pandas as pd
+
+from v2_mlops_modernisation.etl import parallel
+from v2_mlops_modernisation.etl.run_etl import build_curated, transform_stage
+
+
+def test_parallel_build_is_identical_to_serial(raw_and_reference):
+    # few patients -> many visits per patient, so modes span partitions and tie often
+    raw, reference = raw_and_reference
+
+    serial_stage = transform_stage(raw, reference)
+    serial = build_curated(serial_stage)
+    par_stage, par = parallel.stage_and_build(raw, reference, workers=2)
+
+    assert len(parallel.split_partitions(raw)) > 2
+    assert par_stage.to_csv(index=False) == serial_stage.to_csv(index=False)
+    assert list(par) == list(serial)
+    for name, df in serial.items():
+        pd.testing.assert_frame_equal(par[name].reset_index(drop=True), df.reset_index(drop=True),
+                                      check_exact=True, obj=name)
+        assert par[name].to_csv(index=False) == df.to_csv(index=False), name
@@ -0,0 +1,27 @@
+import numpy as np
+
+from v2_mlops_modernisation.ml import feature_cache
+
+
+def test_cache_hit_reuses_matrices_and_new_content_misses(tmp_path, fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+    root = tmp_path / "cache"
+    split = "2026-01-15"
+
+    first = feature_cache.get_or_build(fact, split, vocabulary, root)
+    assert not first.hit
+    # prediction columns written back to the fact do not change the key
+    again = feature_cache.get_or_build(fact.assign(predicted_no_show_proba=0.5), split, vocabulary, root)
+    assert again.hit and again.key == first.key
+    assert (again.X_train != first.X_train).nnz == 0
+    np.testing.assert_array_equal(again.y_test, first.y_test)
+    assert first.X_train.shape[0] + first.X_test.shape[0] == len(fact)
+
+    # the cached preprocessor transforms like the freshly fitted one
+    X = feature_cache.model_frame(fact.head(50))
+    assert (again.preprocessor.transform(X) != first.preprocessor.transform(X)).nnz == 0
+
+    changed = fact.copy()
+    changed.loc[changed.index[0], "lead_time_days"] += 1
+    assert not feature_cache.get_or_build(changed, split, vocabulary, root).hit
+    assert not feature_cache.get_or_build(fact, "2026-01-20", vocabulary, root).hit
@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from v1_mca_baseline.src import viz
+from v2_mlops_modernisation.ml import figures
+
+
+def _specs(auc_label="AUC=0.700"):
+    return [
+        figures.line("roc_curve", [{"x": [0, 0.5, 1], "y": [0, 0.7, 1], "label": auc_label}], "ROC", "FPR", "TPR"),
+        figures.bar("rates", ["a", "b"], [0.1, 0.2], "Rates", ylabel="rate"),
+        figures.matrix("confusion_matrix", [[5, 1], [2, 3]], "CM", "Predicted", "Actual"),
+    ]
+
+
+def test_render_skips_unchanged_figures(tmp_path):
+    specs = _specs()
+    figures.write_specs(specs, tmp_path)
+    first = figures.run(tmp_path)
+    assert first["rendered"] == ["confusion_matrix", "rates", "roc_curve"]
+    assert all((tmp_path / f"{s['name']}.png").exists() for s in specs)
+
+    assert figures.run(tmp_path)["rendered"] == []
+
+    figures.write_specs(_specs(auc_label="AUC=0.710")[:1], tmp_path)
+    (tmp_path / "rates.png").unlink()
+    out = figures.run(tmp_path)
+    assert out == {"rendered": ["rates", "roc_curve"], "skipped": ["confusion_matrix"]}
+
+
+def test_parallel_render(tmp_path):
+    figures.write_specs(_specs(), tmp_path)
+    assert len(figures.run(tmp_path, workers=2)["rendered"]) == 3
+    manifest = json.loads((tmp_path / figures.SPEC_DIR / figures.MANIFEST).read_text())
+    assert set(manifest) == {"confusion_matrix", "rates", "roc_curve"}
+
+
+def test_thin_keeps_endpoints_and_bounds_points():
+    x = np.linspace(0, 1, 10_001)
+    xs, ys = figures.thin(x, x ** 2, max_points=100)
+    assert len(xs) == 100 and xs[0] == 0.0 and xs[-1] == 1.0 and ys[-1] == 1.0
+
+
+def test_v1_line_over_dates_keeps_date_labels(tmp_path):
+    days = pd.date_range("2026-01-01", periods=3000, freq="D")
+    by_string = pd.DataFrame({"appointment_date": days.strftime("%Y-%m-%d"), "rate": np.linspace(0, 1, 3000)})
+    by_datetime = by_string.assign(appointment_date=days)
+
+    for name, df in [("by_string", by_string), ("by_datetime", by_datetime)]:
+        spec = viz.line_spec(df, "appointment_date", "rate", "No-show rate", name)
+        s = spec["series"][0]
+        assert s["x_type"] == "datetime" and len(s["x"]) == figures.MAX_POINTS
+        assert s["x"][0] == "2026-01-01T00:00:00" and pd.Timestamp(s["x"][-1]) == days[-1]
+        viz.render_all([spec], tmp_path)
+        assert (tmp_path / f"{name}.png").exists()
+
+    labels = figures.series(["Mon", "Tue", "Wed"], [1, 2, 3])
+    assert labels["x_type"] == "category" and labels["x"] == ["Mon", "Tue", "Wed"]
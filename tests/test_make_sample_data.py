@@ -0,0 +1,56 @@
+from dataclasses import replace
+
+import numpy as np
+
+from v2_mlops_modernisation.scripts.make_sample_data import (
+    Config, _make_reference, _no_show_probability, _no_show_probability_vec,
+    make_raw_chunk, make_raw_dataset_vectorized,
+)
+
+
+def test_vectorized_probability_matches_scalar():
+    rows = [
+        {"lead_time_days": 0, "prior_no_show_count": 0, "chronic_conditions_count": 0, "deprivation_index": 0.1,
+         "sms_reminder_sent": 1, "appointment_type": "General", "booking_channel": "Walk-in",
+         "appointment_hour": 8, "appointment_is_weekend": 0},
+        {"lead_time_days": 90, "prior_no_show_count": 9, "chronic_conditions_count": 5, "deprivation_index": 0.9,
+         "sms_reminder_sent": 0, "appointment_type": "Lab", "booking_channel": "Online",
+         "appointment_hour": 18, "appointment_is_weekend": 1},
+        {"lead_time_days": 12, "prior_no_show_count": 2, "chronic_conditions_count": 1, "deprivation_index": 0.45,
+         "sms_reminder_sent": 0, "appointment_type": "Specialist", "booking_channel": "Phone",
+         "appointment_hour": 12, "appointment_is_weekend": 0},
+    ]
+    cols = {k: np.array([r[k] for r in rows]) for k in rows[0]}
+    expected = [_no_show_probability(r) for r in rows]
+    assert np.allclose(_no_show_probability_vec(cols), expected)
+
+
+def test_chunks_are_seed_reproducible_and_carry_defects(tmp_path):
+    cfg = replace(Config(), n_rows=5000, chunk_rows=2000)
+    df_neigh, df_clinic = _make_reference(cfg, tmp_path)
+
+    a = make_raw_chunk(cfg, 1, 2000, df_neigh, df_clinic)
+    b = make_raw_chunk(cfg, 1, 2000, df_neigh, df_clinic)
+    assert a.equals(b)
+    assert not a.equals(make_raw_chunk(cfg, 2, 2000, df_neigh, df_clinic))
+
+    assert (a["neighbourhood_id"] == "N999").sum() == int(cfg.pct_invalid_neighbourhood * 2000)
+    assert (a["age"] > 120).any() and (a["age"] < 0).any()
+    assert (a["booking_datetime"] > a["appointment_datetime"]).any()
+    assert a["appointment_id"].duplicated().any()
+
+
+def test_single_file_equals_concatenated_shards(tmp_path):
+    cfg = replace(Config(), n_rows=5000, chunk_rows=2000)
+
+    shards = make_raw_dataset_vectorized(cfg, tmp_path / "sharded", shards=True)
+    assert len(shards) == 3
+    single = make_raw_dataset_vectorized(cfg, tmp_path / "single")[0]
+
+    lines = single.read_text().splitlines()
+    shard_lines = []
+    for i, p in enumerate(shards):
+        part = p.read_text().splitlines()
+        shard_lines += part if i == 0 else part[1:]
+    assert len(lines) == cfg.n_rows + 1
+    assert lines == shard_lines
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from v2_mlops_modernisation.ml import incremental
+
+
+def test_updates_ingest_only_new_dates_and_register_versions(tmp_path, monkeypatch, fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+    # a private copy: one day is moved to an unseen clinic below
+    fact = fact.astype({"date_key": str, "clinic_id": object})
+
+    visible = {"until": "2026-01-31"}
+    requested = []
+
+    def load_rows(date_range=None):
+        requested.append(date_range)
+        rows = fact[fact["date_key"] <= visible["until"]]
+        if date_range is not None:
+            rows = rows[(rows["date_key"] >= date_range[0]) & (rows["date_key"] <= date_range[1])]
+        return rows.reset_index(drop=True)
+
+    monkeypatch.setattr(incremental, "_base", lambda: tmp_path)
+    monkeypatch.setattr(incremental, "load_rows", load_rows)
+    monkeypatch.setattr(incremental.parquet_store, "vocabulary", lambda root=None: vocabulary)
+    icfg = incremental.Config(split_date="2026-01-15")
+
+    first = incremental.run_update(icfg)
+    assert first["version"] == 1 and first["watermark"] == "2026-01-14"
+    pipe = incremental.load(first["artifact"])
+    width = pipe.named_steps["clf"].coef_.shape[1]
+
+    second = incremental.run_update(icfg)
+    assert requested[-1][0] == "2026-01-15"
+    assert second["version"] == 2 and second["watermark"] == "2026-01-31"
+    assert second["rows_ingested"] == int(((fact["date_key"] >= "2026-01-15") & (fact["date_key"] <= "2026-01-31")).sum())
+    assert 0.5 < second["metrics"]["roc_auc"] < 1
+
+    # the next day only; the feature space stays fixed even for an unseen clinic
+    visible["until"] = "2026-02-01"
+    fact.loc[fact["date_key"] == "2026-02-01", "clinic_id"] = "C99"
+    third = incremental.run_update(icfg)
+    assert requested[-1][0] == "2026-02-01" and third["dates"] == 1
+    pipe = incremental.load(third["artifact"])
+    assert pipe.named_steps["clf"].coef_.shape[1] == width
+
+    registry = pd.read_csv(tmp_path / "models" / "registry" / "model_registry.csv")
+    assert registry["model"].eq(incremental.MODEL_LABEL).all() and len(registry) == 3
+    assert registry["split_date"].tolist() == ["2026-01-14", "2026-01-31", "2026-02-01"]
+    online = incremental.registry.resolve(incremental.registry.ONLINE, tmp_path / "models")
+    assert online["artifact_path"] == str(third["artifact"]) and online["kind"] == "online"
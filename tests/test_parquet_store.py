@@ -0,0 +1,60 @@
+import pandas as pd
+
+from v2_mlops_modernisation.storage import parquet_store
+
+
+def _fact():
+    return pd.DataFrame({
+        "appointment_id": ["a1", "a2", "a3", "a4"],
+        "date_key": ["2025-12-30", "2026-01-02", "2026-01-20", "2026-02-03"],
+        "appointment_datetime": pd.to_datetime(["2025-12-30 09:00", "2026-01-02 10:00",
+                                                "2026-01-20 11:00", "2026-02-03 12:00"]),
+        "lead_time_days": [1, 2, 3, 4],
+    })
+
+
+def test_read_with_projection_and_date_range(tmp_path):
+    parquet_store.write_table(_fact(), "curated", "fact_appointments", tmp_path)
+    assert sorted(p.name for p in (tmp_path / "curated" / "fact_appointments").iterdir()) == [
+        "date_month=2025-12", "date_month=2026-01", "date_month=2026-02"]
+
+    df = parquet_store.read_table("curated", "fact_appointments", columns=["appointment_id", "appointment_datetime"],
+                                  date_range=("2026-01-01", "2026-01-31"), root=tmp_path)
+    assert list(df.columns) == ["appointment_id", "appointment_datetime"]
+    assert df["appointment_id"].tolist() == ["a2", "a3"]
+    assert pd.api.types.is_datetime64_any_dtype(df["appointment_datetime"])
+
+
+def test_upsert_rewrites_touched_partitions_only(tmp_path):
+    parquet_store.write_table(_fact(), "curated", "fact_appointments", tmp_path)
+    untouched = next((tmp_path / "curated" / "fact_appointments" / "date_month=2026-02").iterdir())
+
+    moved = _fact().iloc[[0]].assign(date_key="2026-01-25", appointment_datetime=pd.Timestamp("2026-01-25 08:00"))
+    parquet_store.upsert_table(moved, "curated", "fact_appointments", "appointment_id",
+                               stale_months={"2025-12"}, root=tmp_path)
+
+    df = parquet_store.read_table("curated", "fact_appointments", root=tmp_path)
+    assert sorted(df["appointment_id"]) == ["a1", "a2", "a3", "a4"]
+    assert df.set_index("appointment_id").loc["a1", "date_key"] == "2026-01-25"
+    assert not (tmp_path / "curated" / "fact_appointments" / "date_month=2025-12").exists()
+    assert untouched.exists()
+
+
+def test_table_writer_swaps_in_frames_and_discards_them_on_error(tmp_path):
+    parquet_store.write_table(_fact().iloc[:1], "curated", "fact_appointments", tmp_path)
+
+    with parquet_store.table_writer("curated", "fact_appointments", tmp_path) as write:
+        write(_fact().iloc[:2])
+        assert parquet_store.read_table("curated", "fact_appointments", root=tmp_path)["appointment_id"].tolist() == ["a1"]
+        write(_fact().iloc[2:])
+    df = parquet_store.read_table("curated", "fact_appointments", root=tmp_path)
+    assert sorted(df["appointment_id"]) == ["a1", "a2", "a3", "a4"]
+
+    try:
+        with parquet_store.table_writer("curated", "fact_appointments", tmp_path) as write:
+            write(_fact().iloc[:1])
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert len(parquet_store.read_table("curated", "fact_appointments", root=tmp_path)) == 4
+    assert [p.name for p in (tmp_path / "curated").iterdir()] == ["fact_appointments"]
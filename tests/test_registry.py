@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from v2_mlops_modernisation.ml import registry
+
+
+def _artifact(root, payload: bytes):
+    tmp = registry.new_artifact_dir(root)
+    (tmp / registry.MODEL_FILE).write_bytes(payload)
+    return registry.commit_artifact(tmp, root)
+
+
+def _run(run_id, auc, **kw):
+    return {"run_id": run_id, "kind": "train", "model": "m", "roc_auc": auc, "split_date": "2026-01-15",
+            "n_train": 10, "n_test": 5, **kw}
+
+
+def test_artifacts_are_content_addressed(tmp_path):
+    sha, path = _artifact(tmp_path, b"model-a")
+    again = _artifact(tmp_path, b"model-a")
+    assert again == (sha, path) and path.name == sha
+    assert _artifact(tmp_path, b"model-b")[0] != sha
+    assert not list(registry.store_dir(tmp_path).glob(".tmp-*"))
+
+
+def test_register_promote_and_lookups(tmp_path):
+    a = _artifact(tmp_path, b"a")
+    b = _artifact(tmp_path, b"b")
+    registry.register(_run("r1", 0.61, timestamp_utc="2026-02-01T00:00:00Z"), a, aliases=(registry.CHAMPION,),
+                      root=tmp_path)
+    registry.register(_run("r2", 0.65, timestamp_utc="2026-02-02T00:00:00Z"), b, root=tmp_path)
+
+    assert registry.resolve(registry.CHAMPION, tmp_path)["run_id"] == "r1"
+    mirror = tmp_path / "artifacts" / "best_model.joblib"
+    assert mirror.read_bytes() == b"a"
+
+    assert registry.best("roc_auc", root=tmp_path)["run_id"].tolist() == ["r2", "r1"]
+    assert registry.runs(since="2026-02-02", root=tmp_path)["run_id"].tolist() == ["r2"]
+
+    record = registry.promote("r2", root=tmp_path)
+    assert record["run_id"] == "r2" and registry.artifact_path(root=tmp_path) == b[1] / registry.MODEL_FILE
+    assert mirror.read_bytes() == b"b"
+
+    with pytest.raises(Exception):
+        registry.register(_run("r2", 0.7), root=tmp_path)  # duplicate run id rolls back
+    assert len(registry.runs(root=tmp_path)) == 2
+
+    csv = pd.read_csv(tmp_path / "registry" / "model_registry.csv")
+    assert csv.columns.tolist() == registry.CSV_COLUMNS and csv["run_id"].tolist() == ["r1", "r2"]
+
+
+def test_legacy_csv_is_imported_and_concurrent_registers(tmp_path):
+    (tmp_path / "registry").mkdir()
+    pd.DataFrame([{c: None for c in registry.CSV_COLUMNS} | {"run_id": "old", "roc_auc": 0.6}]).to_csv(
+        tmp_path / "registry" / "model_registry.csv", index=False)
+    assert registry.resolve(root=tmp_path) is None
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: registry.register(_run(f"r{i}", 0.5 + i / 100), root=tmp_path), range(16)))
+    runs = registry.runs(root=tmp_path)
+    assert len(runs) == 17 and runs.loc[runs["run_id"] == "old", "kind"].item() == "legacy"
+    assert len(pd.read_csv(tmp_path / "registry" / "model_registry.csv")) == 17
@@ -0,0 +1,102 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from v2_mlops_modernisation.storage import sqlite_store
+
+
+SCHEMA = """
+-- test schema
+CREATE TABLE IF NOT EXISTS fact_appointments (
+  appointment_id TEXT PRIMARY KEY,
+  date_key TEXT,
+  patient_id TEXT,
+  clinic_id TEXT,
+  lead_time_days INTEGER
+);
+"""
+
+
+def _fact(n=5):
+    return pd.DataFrame({
+        "appointment_id": [f"A{i}" for i in range(n)],
+        "date_key": "2026-01-05",
+        "patient_id": "P1",
+        "clinic_id": "C01",
+        "lead_time_days": range(n),
+    })
+
+
+def _ddl(conn, name):
+    return conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (name,)).fetchone()[0]
+
+
+def test_bulk_load_keeps_declared_ddl_and_builds_indexes(tmp_path):
+    db = tmp_path / "warehouse.db"
+    fact = _fact().assign(predicted_no_show_proba=0.25)
+
+    stats = sqlite_store.bulk_load(db, {"fact_appointments": fact}, SCHEMA)
+
+    assert stats["fact_appointments"]["rows"] == 5
+    with sqlite3.connect(db) as conn:
+        ddl = _ddl(conn, "fact_appointments")
+        assert "appointment_id TEXT PRIMARY KEY" in ddl and '"predicted_no_show_proba" REAL' in ddl
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "ix_fact_appointments_patient_id" in indexes
+
+
+def test_failed_load_leaves_previous_tables(tmp_path):
+    db = tmp_path / "warehouse.db"
+    sqlite_store.bulk_load(db, {"fact_appointments": _fact(3)}, SCHEMA)
+
+    def fail(conn):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        sqlite_store.bulk_load(db, {"fact_appointments": _fact(10)}, SCHEMA, finalize=fail)
+
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM fact_appointments").fetchone() == (3,)
+        assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name LIKE '_load_%'").fetchall()
+
+
+def test_duplicate_primary_key_is_rejected(tmp_path):
+    db = tmp_path / "warehouse.db"
+    sqlite_store.bulk_load(db, {"fact_appointments": _fact(3)}, SCHEMA)
+    fact = _fact(4)
+    fact = pd.concat([fact, fact.iloc[[1]].assign(lead_time_days=99)], ignore_index=True)
+
+    with pytest.raises(ValueError, match="1 rows repeat the primary key"):
+        sqlite_store.bulk_load(db, {"fact_appointments": fact}, SCHEMA)
+
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM fact_appointments").fetchone() == (3,)
+
+
+def test_update_columns_by_key_adds_missing_columns(tmp_path):
+    db = tmp_path / "warehouse.db"
+    sqlite_store.bulk_load(db, {"fact_appointments": _fact(4)}, SCHEMA)
+    scores = pd.DataFrame({"appointment_id": ["A3", "A1"], "predicted_no_show_proba": [0.9, 0.1],
+                           "risk_band": ["Critical", "Low"]})
+
+    rows = sqlite_store.update_columns(db, "fact_appointments", [scores.iloc[:1], scores.iloc[1:]], "appointment_id")
+
+    assert rows == 2
+    with sqlite3.connect(db) as conn:
+        got = conn.execute("SELECT appointment_id, predicted_no_show_proba, risk_band, lead_time_days "
+                           "FROM fact_appointments ORDER BY appointment_id").fetchall()
+    assert got == [("A0", None, None, 0), ("A1", 0.1, "Low", 1), ("A2", None, None, 2), ("A3", 0.9, "Critical", 3)]
+
+
+def test_bulk_load_streams_frames_and_rejects_keys_repeated_across_them(tmp_path):
+    db = tmp_path / "warehouse.db"
+    fact = _fact(6)
+
+    stats = sqlite_store.bulk_load(db, {"fact_appointments": (fact.iloc[i:i + 2] for i in range(0, 6, 2))}, SCHEMA)
+
+    assert stats["fact_appointments"]["rows"] == 6
+    with pytest.raises(ValueError, match="repeat the primary key"):
+        sqlite_store.bulk_load(db, {"fact_appointments": [fact.iloc[:4], fact.iloc[3:]]}, SCHEMA)
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM fact_appointments").fetchone() == (6,)
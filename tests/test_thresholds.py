@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, confusion_matrix, precision_recall_fscore_support
+
+from v1_mca_baseline.src.evaluation import threshold_metrics
+from v2_mlops_modernisation.ml import thresholds
+
+
+def _data(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, 2, n)
+    # rounded scores: plenty of ties
+    scores = np.round(np.clip(0.3 * y + rng.random(n) * 0.7, 0, 1), 2)
+    return y, scores
+
+
+def test_table_matches_sklearn_at_every_grid_threshold():
+    y, scores = _data()
+    grid = np.linspace(0.05, 0.95, 19)
+    rows = thresholds.at_thresholds(thresholds.threshold_table(y, scores), grid)
+    for t, row in zip(grid, rows.itertuples()):
+        pred = (scores >= t).astype(int)
+        p, r, f1, _ = precision_recall_fscore_support(y, pred, average="binary", zero_division=0)
+        assert row.precision == pytest.approx(p)
+        assert row.recall == pytest.approx(r)
+        assert row.f1 == pytest.approx(f1)
+        assert row.accuracy == pytest.approx(accuracy_score(y, pred))
+        assert row.outreach_rate == pytest.approx(pred.mean())
+
+
+def test_one_row_per_distinct_score_plus_contact_nobody():
+    y, scores = _data()
+    table = thresholds.threshold_table(y, scores)
+    assert len(table) == len(np.unique(scores)) + 1
+    assert np.isinf(table["threshold"].iloc[0]) and table["predicted_positive"].iloc[0] == 0
+    assert table["predicted_positive"].iloc[-1] == len(y)
+    assert (table[["tp", "fp", "fn", "tn"]].sum(axis=1) == len(y)).all()
+
+
+def test_cost_and_capacity_picks():
+    y = np.array([1, 1, 0, 1, 0, 0, 0, 0])
+    scores = np.array([0.9, 0.8, 0.7, 0.6, 0.4, 0.3, 0.2, 0.1])
+    table = thresholds.threshold_table(y, scores, cost_fp=1.0, cost_fn=4.0)
+    # flag down to 0.6: fp=1, fn=0 -> cost 1/8, cheaper than anything else
+    assert thresholds.cost_optimal(table)["threshold"] == 0.6
+    cap = thresholds.capacity_constrained(table, max_outreach_rate=0.25)
+    assert cap["threshold"] == 0.8 and cap["predicted_positive"] == 2
+
+    policy = thresholds.policy_summary(table, 0.25, 1.0, 4.0)
+    assert policy["cost_optimal"]["tp"] == 3 and isinstance(policy["cost_optimal"]["tp"], int)
+    assert thresholds.policy_summary(table, 0.0, 1.0, 4.0)["capacity_constrained"]["threshold"] is None
+
+
+def test_v1_threshold_metrics_uses_engine():
+    y, scores = _data(500, seed=3)
+    tm = threshold_metrics(y, scores, 0.5)
+    pred = (scores >= 0.5).astype(int)
+    assert tm["confusion_matrix"] == confusion_matrix(y, pred).tolist()
+    assert tm["predicted_outreach_rate"] == pytest.approx(pred.mean())
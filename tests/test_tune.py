@@ -0,0 +1,29 @@
+import pandas as pd
+
+from v2_mlops_modernisation.ml import feature_cache, tune
+
+
+def test_rolling_origin_folds_end_before_the_split():
+    assert tune.fold_origins("2026-01-15", 3, 7) == [
+        ("2025-12-25", "2026-01-01"), ("2026-01-01", "2026-01-08"), ("2026-01-08", "2026-01-15")]
+
+
+def test_successive_halving_encodes_folds_once_and_eliminates(tmp_path, monkeypatch, fact_and_vocab):
+    fact, vocabulary = fact_and_vocab
+    fact = fact.assign(date_key=pd.to_datetime(fact["date_key"]))
+
+    monkeypatch.setattr(tune, "SEARCH_SPACE", {"logreg": {"C": [0.01, 0.1, 1.0]},
+                                               "hgb": {"max_leaf_nodes": [7, 15, 31]}})
+    tcfg = tune.Config(n_folds=2, horizon_days=7, eta=3)
+    root = tmp_path / "folds"
+    folds = tune.build_folds(fact, vocabulary, tcfg, {"onehot", "ordinal"}, root)
+    assert len(list(root.iterdir())) == 4  # 2 folds x 2 encodings, reused by every candidate
+
+    results = tune.successive_halving(tune.candidates(["hgb", "logreg"]), folds, root,
+                                      feature_cache.encoder_categories(vocabulary, fact), tcfg, workers=2)
+    assert results.groupby("round").size().tolist() == [6, 2]
+    assert set(results.loc[results["round"] == 1, "candidate"]) <= set(results.loc[results["round"] == 0, "candidate"])
+
+    winner = tune.pick_winner(results)
+    finalists = results[results["round"] == 1].groupby("candidate")["roc_auc"].size()
+    assert winner["candidate"] in finalists.index and winner["folds"] == 2
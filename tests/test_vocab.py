@@ -0,0 +1,43 @@
+import pandas as pd
+
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.storage import parquet_store
+
+
+def _reference():
+    neigh = pd.DataFrame({"neighbourhood_id": ["N02", "N01"], "region": ["North", "East"]})
+    clinic = pd.DataFrame({"clinic_id": ["C02", "C01"], "clinic_type": ["GP", "Dental"], "region": ["North", "East"]})
+    return neigh, clinic
+
+
+def test_codes_stay_stable_when_values_are_appended():
+    v1 = vocab.update(vocab.from_reference(*_reference()), pd.DataFrame({"gender": ["M", "F"]}))
+    assert v1["clinic_id"] == ["C01", "C02"] and v1["gender"] == ["F", "M"]
+
+    neigh, clinic = _reference()
+    clinic = pd.concat([clinic, pd.DataFrame({"clinic_id": ["C00"], "clinic_type": ["GP"], "region": ["West"]})])
+    v2 = vocab.update(vocab.from_reference(neigh, clinic, previous=v1), pd.DataFrame({"gender": ["U", "F"]}))
+    assert v2["clinic_id"] == ["C01", "C02", "C00"]
+    assert v2["gender"] == ["F", "M", "U"]
+    assert v2["risk_band"] == ["Low", "Medium", "High", "Critical"]
+
+
+def test_encode_keeps_unseen_values_and_downcasts_ints():
+    df = pd.DataFrame({"clinic_id": ["C02", "C09", None], "lead_time_days": [1, 2, 3], "age": [30.0, 41.0, 52.0]})
+    out = vocab.encode(df, vocab.from_reference(*_reference()))
+    assert list(out["clinic_id"].cat.categories) == ["C01", "C02", "C09"]
+    assert out["clinic_id"].cat.codes.tolist() == [1, 2, -1]
+    assert out["lead_time_days"].dtype == "int32" and out["age"].dtype == "int16"
+
+
+def test_parquet_round_trip_uses_persisted_codes(tmp_path):
+    vocab.save(vocab.from_reference(*_reference()), tmp_path / "reference" / vocab.VOCAB_FILE)
+    root = tmp_path / "parquet"
+    df = pd.DataFrame({"clinic_id": ["C02", "C02", "C01"], "appointment_dow": ["Sunday", "Monday", "Monday"]})
+    parquet_store.write_table(df, "curated", "dim_clinic", root)
+    got = parquet_store.read_table("curated", "dim_clinic", root=root)
+
+    assert isinstance(got["clinic_id"].dtype, pd.CategoricalDtype)
+    assert got["clinic_id"].cat.codes.tolist() == [1, 1, 0]
+    assert got["appointment_dow"].cat.codes.tolist() == [6, 0, 0]
+    pd.testing.assert_frame_equal(got.astype(str), df)
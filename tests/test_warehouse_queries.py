@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from v2_mlops_modernisation.features.derivations import risk_band
+from v2_mlops_modernisation.storage import sqlite_store
+from v2_mlops_modernisation.warehouse import queries
+
+
+def _scored_fact(fact_and_vocab):
+    # the warehouse holds plain values, not the vocabulary-encoded categoricals
+    fact = fact_and_vocab[0]
+    fact = fact.astype({c: object for c in fact.select_dtypes("category").columns})
+    proba = np.random.default_rng(3).random(len(fact))
+    return fact.assign(predicted_no_show_proba=proba, risk_band=risk_band(proba))
+
+
+def _load(tmp_path, fact):
+    db = tmp_path / "warehouse.db"
+    sqlite_store.bulk_load(db, {"fact_appointments": fact}, finalize=queries.build_query_layer)
+    return queries.connect(db)
+
+
+def test_rollup_queries_match_fact_aggregates(tmp_path, fact_and_vocab):
+    fact = _scored_fact(fact_and_vocab)
+    conn = _load(tmp_path, fact)
+    start, end = "2026-01-05", "2026-01-25"
+    window = fact[(fact["date_key"] >= start) & (fact["date_key"] <= end)]
+
+    heatmap = queries.dow_hour_heatmap(conn, start, end).set_index(["appointment_dow", "appointment_hour"])
+    expected = window.groupby(["appointment_dow", "appointment_hour"]).agg(
+        appointments=("appointment_id", "count"), no_shows=("no_show_label", "sum"))
+    pd.testing.assert_frame_equal(heatmap[["appointments", "no_shows"]], expected, check_dtype=False,
+                                  check_index_type=False)
+
+    lead = queries.lead_band_dow_heatmap(conn, start, end)
+    assert lead["appointments"].sum() == len(window)
+
+    board = queries.clinic_leaderboard(conn, start, end).set_index("clinic_id")
+    rate = window.groupby("clinic_id")["no_show_label"].mean().round(4)
+    pd.testing.assert_series_equal(board["no_show_rate"].sort_index(), rate, check_names=False)
+
+    tiles = queries.summary(conn, start, end)
+    high = window["risk_band"].isin(queries.HIGH_RISK_BANDS).mean()
+    assert tiles["appointments"] == len(window)
+    assert tiles["high_risk_rate"] == round(high, 4)
+
+
+def test_dashboard_queries_use_indexes(tmp_path, fact_and_vocab):
+    fact = _scored_fact(fact_and_vocab)
+    conn = _load(tmp_path, fact)
+
+    plan = " ".join(r[-1] for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT neighbourhood_id, COUNT(*), SUM(no_show_label) FROM fact_appointments "
+        "WHERE date_key >= '2026-01-01' GROUP BY neighbourhood_id"))
+    assert "COVERING INDEX" in plan
+
+    worklist = queries.risk_worklist(conn, limit=20)
+    assert len(worklist) == 20
+    assert worklist["risk_band"].isin(queries.HIGH_RISK_BANDS).all()
+    assert worklist["predicted_no_show_proba"].is_monotonic_decreasing
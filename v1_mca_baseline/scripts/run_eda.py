@@ -2,7 +2,8 @@
 
 This script generates:
 - no-show rate tables by key dimensions
-- a small set of charts for quick review
+- a small set of charts for quick review (rendered in parallel; unchanged charts
+  are skipped, see src/viz.py)
 
 Outputs:
 - outputs/tables/*.csv
@@ -12,11 +13,12 @@ Outputs:
 from __future__ import annotations
 
 from pathlib import Path
+import os
 import pandas as pd
 
 from v1_mca_baseline.src.data_prep import load_staged_sample
 from v1_mca_baseline.src.utils import project_root, ensure_dir
-from v1_mca_baseline.src.viz import save_bar
+from v1_mca_baseline.src.viz import bar_spec, render_all
 
 
 def rate_table(df: pd.DataFrame, col: str) -> pd.DataFrame:
@@ -43,12 +45,14 @@ def main() -> None:
         ("clinic_type", "No-show rate by clinic type"),
     ]
 
+    specs = []
     for col, title in dims:
         t = rate_table(df, col)
         t.to_csv(out_tables / f"no_show_by_{col}.csv", index=False)
-        save_bar(t, col, "no_show_rate", title, out_fig / f"eda_no_show_by_{col}.png")
+        specs.append(bar_spec(t, col, "no_show_rate", title, f"eda_no_show_by_{col}"))
+    out = render_all(specs, out_fig, workers=os.cpu_count() or 1)
 
-    print("EDA exports complete.")
+    print(f"EDA exports complete ({len(out['rendered'])} charts rendered, {len(out['skipped'])} unchanged).")
 
 
 if __name__ == "__main__":
@@ -10,14 +10,11 @@ import pandas as pd
 from sklearn.metrics import (
     roc_auc_score,
     average_precision_score,
-    confusion_matrix,
-    precision_score,
-    recall_score,
-    f1_score,
-    accuracy_score,
 )
 from sklearn.calibration import calibration_curve
 
+from v2_mlops_modernisation.ml import thresholds
+
 
 @dataclass
 class Metrics:
@@ -32,16 +29,23 @@ def compute_metrics(y_true, proba) -> Metrics:
     )
 
 
-def threshold_metrics(y_true, proba, threshold: float) -> Dict[str, Any]:
-    pred = (np.asarray(proba) >= threshold).astype(int)
+def threshold_table(y_true, proba, cost_fp: float = 1.0, cost_fn: float = 1.0) -> pd.DataFrame:
+    """Metrics at every distinct threshold from one sort (shared engine with V2)."""
+    return thresholds.threshold_table(y_true, proba, cost_fp, cost_fn)
+
+
+def threshold_metrics(y_true, proba, threshold: float, table: pd.DataFrame | None = None) -> Dict[str, Any]:
+    if table is None:
+        table = threshold_table(y_true, proba)
+    r = thresholds.at_thresholds(table, [threshold]).iloc[0]
     return {
         "threshold": float(threshold),
-        "precision": float(precision_score(y_true, pred)),
-        "recall": float(recall_score(y_true, pred)),
-        "f1": float(f1_score(y_true, pred)),
-        "accuracy": float(accuracy_score(y_true, pred)),
-        "predicted_outreach_rate": float(pred.mean()),
-        "confusion_matrix": confusion_matrix(y_true, pred).tolist(),
+        "precision": float(r["precision"]),
+        "recall": float(r["recall"]),
+        "f1": float(r["f1"]),
+        "accuracy": float(r["accuracy"]),
+        "predicted_outreach_rate": float(r["outreach_rate"]),
+        "confusion_matrix": [[int(r["tn"]), int(r["fp"])], [int(r["fn"]), int(r["tp"])]],
     }
 
 
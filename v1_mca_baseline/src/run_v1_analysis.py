@@ -14,13 +14,21 @@ Usage:
 from __future__ import annotations
 
 from pathlib import Path
+import json
 import pandas as pd
 
 from .utils import project_root, ensure_dir
 from .data_prep import load_staged_sample, dataset_profile
 from .features import feature_columns
 from .models import logistic_regression_model, gradient_boosting_model, predict_proba
-from .evaluation import compute_metrics, threshold_metrics, calibration_bins, gain_curve
+from .evaluation import compute_metrics, threshold_table, threshold_metrics, calibration_bins, gain_curve
+from v2_mlops_modernisation.ml import thresholds
+
+
+# Outreach policy assumptions (same defaults as V2 ml/train.py Config)
+COST_FP = 1.0
+COST_FN = 4.0
+MAX_OUTREACH_RATE = 0.2
 
 
 def main() -> None:
@@ -66,10 +74,14 @@ def main() -> None:
 
     pd.DataFrame(rows).to_csv(out_tables / "model_metrics_comparison.csv", index=False)
 
-    # Threshold policy export
+    # Threshold policy export (one sort of the scores serves every threshold)
+    table = threshold_table(y_test, best_proba, COST_FP, COST_FN)
+    table.to_csv(out_tables / "threshold_table_full.csv", index=False)
+    policy = thresholds.policy_summary(table, MAX_OUTREACH_RATE, COST_FP, COST_FN)
+    (out_tables / "threshold_policy_optimal.json").write_text(json.dumps(policy, indent=2), encoding="utf-8")
     thr_rows = []
     for th in [0.50, 0.35, 0.25]:
-        tm = threshold_metrics(y_test, best_proba, th)
+        tm = threshold_metrics(y_test, best_proba, th, table=table)
         tm["predicted_outreach_rate"] = round(tm["predicted_outreach_rate"] * 100, 2)
         thr_rows.append(tm)
     pd.DataFrame([{k:v for k,v in r.items() if k not in ("confusion_matrix",)} for r in thr_rows]).to_csv(
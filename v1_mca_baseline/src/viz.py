@@ -1,32 +1,36 @@
-"""Plotting helpers for V1 outputs."""
+"""Plotting helpers for V1 outputs.
+
+Charts are described as small data specs and drawn by the shared figure stage
+(v2_mlops_modernisation/ml/figures.py): Agg backend, process pool, and a chart is
+skipped when its data is unchanged since the last render.
+"""
 
 from __future__ import annotations
 
 from pathlib import Path
-import matplotlib.pyplot as plt
 import pandas as pd
 
+from v2_mlops_modernisation.ml import figures
+
+
+def bar_spec(df: pd.DataFrame, x: str, y: str, title: str, name: str, rotate: int = 45) -> dict:
+    return figures.bar(name, df[x].astype(str), df[y], title, ylabel=y, rotate=rotate)
+
+
+def line_spec(df: pd.DataFrame, x: str, y: str, title: str, name: str) -> dict:
+    return figures.line(name, [figures.series(df[x], df[y])], title, x, y, figsize=(10, 4.5), dpi=160,
+                        legend=False, grid=True)
+
+
+def render_all(specs: list[dict], out_dir: Path, workers: int = 1) -> dict[str, list[str]]:
+    """Serialize the chart data next to the figures and render the changed charts."""
+    figures.write_specs(specs, out_dir)
+    return figures.render_specs(specs, out_dir, workers=workers)
+
 
 def save_bar(df: pd.DataFrame, x: str, y: str, title: str, out_path: Path, rotate: int = 45) -> None:
-    fig = plt.figure(figsize=(10, 5), dpi=160)
-    plt.bar(df[x].astype(str), df[y])
-    plt.xticks(rotation=rotate, ha="right")
-    plt.ylabel(y)
-    plt.title(title)
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    fig.savefig(out_path)
-    plt.close(fig)
+    render_all([bar_spec(df, x, y, title, out_path.stem, rotate)], out_path.parent)
 
 
 def save_line(df: pd.DataFrame, x: str, y: str, title: str, out_path: Path) -> None:
-    fig = plt.figure(figsize=(10, 4.5), dpi=160)
-    plt.plot(df[x], df[y])
-    plt.xlabel(x)
-    plt.ylabel(y)
-    plt.title(title)
-    plt.grid(True, axis="y", alpha=0.25)
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    fig.savefig(out_path)
-    plt.close(fig)
+    render_all([line_spec(df, x, y, title, out_path.stem)], out_path.parent)
@@ -0,0 +1,112 @@
+"""
+Asynchronous micro-batching of concurrent /predict calls (optional, V2_MICROBATCH=1).
+
+Requests put (record, future) on a bounded asyncio queue. One consumer task takes the
+first waiting request, then keeps collecting until max_batch requests are queued or
+max_wait_ms has passed since the first one, scores the batch with one vectorized call
+on a worker thread (so the event loop keeps accepting requests) and resolves every
+future with its row's result (the API returns (probability, model version), so callers
+know which model scored them even across a hot-swap). A burst of N requests costs about N / max_batch
+model calls instead of N; a lone request waits at most max_wait_ms.
+
+When max_queue requests are already waiting, submit raises QueueFull and the API
+answers 503 instead of queueing without bound. metrics() reports the configuration,
+queue depth, batch counts and sizes, flush reasons and the last batch's model time.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Sequence
+import asyncio
+import time
+
+
+class MicroBatcher:
+    def __init__(self, score: Callable[[list[dict]], Sequence[Any]], max_batch: int = 64,
+                 max_wait_ms: float = 2.0, max_queue: int = 1024):
+        self.score = score
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._counts = {"requests": 0, "rejected": 0, "batches": 0, "batched_requests": 0, "errors": 0,
+                        "flush_full": 0, "flush_wait": 0, "max_batch_seen": 0}
+        self._last_batch_ms = 0.0
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="micro-batcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    async def submit(self, record: dict) -> Any:
+        """score's result for one record, scored with whatever else is queued; raises asyncio.QueueFull."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((record, future))
+        except asyncio.QueueFull:
+            self._counts["rejected"] += 1
+            raise
+        self._counts["requests"] += 1
+        return await future
+
+    async def _collect(self) -> list[tuple[dict, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        self._counts["flush_full" if len(batch) >= self.max_batch else "flush_wait"] += 1
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            t0 = time.perf_counter()
+            try:
+                proba = await asyncio.to_thread(self.score, [record for record, _ in batch])
+            except Exception as exc:
+                self._counts["errors"] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            finally:
+                self._last_batch_ms = (time.perf_counter() - t0) * 1000
+                self._counts["batches"] += 1
+                self._counts["batched_requests"] += len(batch)
+                self._counts["max_batch_seen"] = max(self._counts["max_batch_seen"], len(batch))
+            for (_, future), p in zip(batch, proba):
+                if not future.done():  # the client may have gone away
+                    future.set_result(p)
+
+    def metrics(self) -> dict:
+        batches = self._counts["batches"]
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_ms,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            **self._counts,
+            "mean_batch_size": round(self._counts["batched_requests"] / batches, 2) if batches else 0.0,
+            "last_batch_ms": round(self._last_batch_ms, 3),
+        }
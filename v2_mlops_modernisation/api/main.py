@@ -6,21 +6,45 @@ Usage:
 
 Then open:
   http://127.0.0.1:8000/docs
+
+The model is loaded once at startup and hot-reloaded when the registry champion (or the
+shipped artifact) changes; see api/model_store.py. V2_MODEL_POLL_S sets the polling
+interval in seconds (0 disables reloading).
+
+V2_MICROBATCH=1 queues concurrent /predict calls and scores them together
+(api/batcher.py; V2_MICROBATCH_MAX_SIZE, V2_MICROBATCH_MAX_WAIT_MS,
+V2_MICROBATCH_MAX_QUEUE). Pipeline and micro-batched predictions are cached per model
+version (api/prediction_cache.py; V2_PREDICTION_CACHE_SIZE, 0 disables, and
+V2_PREDICTION_CACHE_TTL_S). GET /metrics reports the batcher and cache counters.
 """
 
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Any
+import asyncio
+import os
 
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
-import pandas as pd
-from joblib import load
+import numpy as np
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, model_validator
+
+from v2_mlops_modernisation.api import validation
+from v2_mlops_modernisation.api.batcher import MicroBatcher
+from v2_mlops_modernisation.api.model_store import ModelHolder
+from v2_mlops_modernisation.api.prediction_cache import PredictionCache, request_key
+from v2_mlops_modernisation.features.derivations import model_frame, risk_band
 
 
 APP_ROOT = Path(__file__).resolve().parents[1]
+# Shipped artifact, used until a training run registers a champion
 MODEL_PATH = APP_ROOT / "models" / "artifacts" / "best_model.joblib"
 
+# Registry champion, else MODEL_PATH; loaded at startup and reloaded when it changes
+holder = ModelHolder(MODEL_PATH, poll_s=float(os.environ.get("V2_MODEL_POLL_S", "5")))
+
 
 class PredictionRequest(BaseModel):
     lead_time_days: int = Field(..., ge=0, le=365)
@@ -29,7 +53,7 @@ class PredictionRequest(BaseModel):
     prior_show_count: int = Field(..., ge=0, le=100)
     age: int = Field(..., ge=0, le=110)
     gender: str = Field(..., pattern="^(F|M)$")
-    age_band: str
+    age_band: str | None = Field(None, description="Ignored; derived from age with the same bands as the ETL")
     appointment_type: str
     booking_channel: str
     appointment_hour: int = Field(..., ge=0, le=23)
@@ -46,30 +70,158 @@ class PredictionResponse(BaseModel):
     risk_band: str
 
 
-def risk_band(p: float) -> str:
-    if p >= 0.75:
-        return "Critical"
-    if p >= 0.55:
-        return "High"
-    if p >= 0.35:
-        return "Medium"
-    return "Low"
+class BatchPredictionRequest(BaseModel):
+    """Either records (one object per booking) or columns (one array per field)."""
+    records: list[Any] | None = None
+    columns: dict[str, list[Any]] | None = None
+
+    @model_validator(mode="after")
+    def _one_layout(self):
+        if (self.records is None) == (self.columns is None):
+            raise ValueError("Send exactly one of 'records' or 'columns'")
+        if self.columns is not None and len({len(v) for v in self.columns.values()}) > 1:
+            raise ValueError("All 'columns' arrays must have the same length")
+        return self
+
+
+class BatchPrediction(BaseModel):
+    index: int
+    predicted_no_show_proba: float | None = None
+    risk_band: str | None = None
+    errors: list[dict[str, Any]] = []
+
+
+class BatchPredictionResponse(BaseModel):
+    model_version: str
+    n_rows: int
+    n_valid: int
+    predictions: list[BatchPrediction]
+
+
+REQUEST_RULES = validation.field_rules(PredictionRequest)
+
+
+def score_records(records: list[dict]) -> list[tuple[float, str]]:
+    """(probability, model version) per request record, all scored by the current model in one call.
 
+    The version travels with each probability so a request cached after a hot-swap is
+    keyed by the model that actually scored it.
+    """
+    model = holder.current
+    if model is None:
+        raise RuntimeError("Model not loaded")
+    if model.compiled is not None:
+        proba = model.compiled.predict_proba(records)
+    else:
+        proba = model.pipeline.predict_proba(model_frame(records))[:, 1]
+    return [(float(p), model.version) for p in proba]
 
-app = FastAPI(title="No-Show Risk Prediction API", version="0.1.0")
+
+def _pipeline_proba(model, record: dict) -> float:
+    return float(model.pipeline.predict_proba(model_frame([record]))[:, 1][0])
+
+
+# Optional micro-batching of concurrent /predict calls
+batcher = MicroBatcher(
+    score_records,
+    max_batch=int(os.environ.get("V2_MICROBATCH_MAX_SIZE", "64")),
+    max_wait_ms=float(os.environ.get("V2_MICROBATCH_MAX_WAIT_MS", "2")),
+    max_queue=int(os.environ.get("V2_MICROBATCH_MAX_QUEUE", "1024")),
+) if os.environ.get("V2_MICROBATCH") == "1" else None
+
+
+# Repeat requests skip the model; cleared when a new model is published
+_cache_size = int(os.environ.get("V2_PREDICTION_CACHE_SIZE", "10000"))
+cache = PredictionCache(_cache_size, float(os.environ.get("V2_PREDICTION_CACHE_TTL_S", "300"))) \
+    if _cache_size > 0 else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if cache is not None and cache.clear not in holder.on_swap:
+        holder.on_swap.append(cache.clear)
+    holder.start()
+    if batcher is not None:
+        await batcher.start()
+    yield
+    if batcher is not None:
+        await batcher.stop()
+    holder.stop()
+
+
+app = FastAPI(title="No-Show Risk Prediction API", version="0.1.0", lifespan=lifespan)
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "model_loaded": MODEL_PATH.exists()}
+    status = holder.status()
+    return {"status": "ok" if status["ready"] else "not_ready", **status}
+
+
+@app.get("/metrics")
+def metrics():
+    return {"batcher": None if batcher is None else batcher.metrics(),
+            "cache": None if cache is None else cache.metrics()}
 
 
 @app.post("/predict", response_model=PredictionResponse)
-def predict(req: PredictionRequest):
-    if not MODEL_PATH.exists():
+async def predict(req: PredictionRequest):
+    model = holder.current
+    if model is None:
         return PredictionResponse(predicted_no_show_proba=0.0, risk_band="Low")
 
-    model = load(MODEL_PATH)
-    df = pd.DataFrame([req.model_dump()])
-    proba = float(model.predict_proba(df)[:, 1][0])
+    record = req.model_dump()
+    if batcher is None and model.compiled is not None:
+        # linear model: dictionary lookups + dot product, no DataFrame (cheaper than a cache
+        # lookup; see api/prediction_cache.py)
+        if cache is not None:
+            cache.bypass()
+        proba = model.compiled.predict_one(record)
+        return PredictionResponse(predicted_no_show_proba=proba, risk_band=risk_band(proba))
+
+    key = request_key(record, model.version) if cache is not None else None
+    proba = cache.get(key) if key is not None else None
+    if proba is None:
+        if batcher is not None:
+            # the batch runs later, possibly on a newer model: key by the version that scored it
+            try:
+                proba, version = await batcher.submit(record)
+            except asyncio.QueueFull:
+                raise HTTPException(status_code=503, detail="Prediction queue full")
+        else:
+            proba, version = await run_in_threadpool(_pipeline_proba, model, record), model.version
+        if key is not None:
+            cache.put(key if version == model.version else request_key(record, version), proba)
     return PredictionResponse(predicted_no_show_proba=proba, risk_band=risk_band(proba))
+
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+def predict_batch(req: BatchPredictionRequest):
+    model = holder.current
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    names = [r.name for r in REQUEST_RULES]
+    if req.records is not None:
+        n = len(req.records)
+        columns, not_object = validation.records_to_columns(req.records, names)
+    else:
+        n = len(next(iter(req.columns.values()), []))
+        columns, not_object = req.columns, np.zeros(n, dtype=bool)
+    df, errors = validation.validate_columns(columns, n, REQUEST_RULES)
+    for i in np.flatnonzero(not_object):
+        errors[i] = [{"loc": [], "msg": "Input should be a valid dictionary", "type": "dict_type"}]
+
+    valid = np.array([not e for e in errors], dtype=bool)
+    proba = np.full(n, np.nan)
+    bands = np.full(n, None, dtype=object)
+    if valid.any():
+        proba[valid] = model.pipeline.predict_proba(model_frame(df[valid]))[:, 1]
+        bands[valid] = risk_band(proba[valid])
+
+    predictions = [
+        {"index": i, "predicted_no_show_proba": float(proba[i]), "risk_band": bands[i]} if ok
+        else {"index": i, "errors": errors[i]}
+        for i, ok in enumerate(valid)
+    ]
+    return {"model_version": model.version, "n_rows": n, "n_valid": int(valid.sum()), "predictions": predictions}
@@ -0,0 +1,153 @@
+"""
+Process-wide model holder for the inference API.
+
+The model is loaded once (at application startup) instead of on every request. A
+background thread polls the source every poll_s seconds and reloads when it changes:
+- the registry champion (ml/registry.py): alias target run_id, artifact path and mtime
+- otherwise the shipped artifact file (MODEL_PATH): path, mtime and size
+A new model is loaded and warmed up (one prediction on WARMUP_RECORD) off the request
+path, then published by replacing a single reference. Requests read holder.current
+once and keep using that LoadedModel, so a swap never drops or mixes a request; a
+model that fails to load or warm up is not published and the previous one keeps
+serving. Callbacks in on_swap are called with the new model after it replaced a
+previous one (the API uses this to clear its prediction cache).
+
+Linear pipelines also get a CompiledModel (ml/compiled.py) for the single-row fast
+path; it is only kept if it reproduces the pipeline's warm-up prediction.
+
+Version: the registry run_id, or "file-<sha256 prefix>" for the fallback file.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+import math
+import threading
+import time
+
+from joblib import load
+
+from v2_mlops_modernisation.features.derivations import model_frame
+from v2_mlops_modernisation.ml import registry
+from v2_mlops_modernisation.ml.compiled import CompiledModel, from_pipeline
+
+
+# Largest |compiled - pipeline| warm-up difference that still enables the fast path
+PARITY_TOLERANCE = 1e-9
+# Example booking used to warm up (and sanity-check) a freshly loaded model
+WARMUP_RECORD = {
+    "lead_time_days": 12, "sms_reminder_sent": 1, "prior_no_show_count": 1, "prior_show_count": 4,
+    "age": 42, "gender": "F", "age_band": None, "appointment_type": "General", "booking_channel": "Online",
+    "appointment_hour": 10, "appointment_is_weekend": 0, "deprivation_index": 0.43, "clinic_id": "C01",
+    "neighbourhood_id": "N005", "clinic_type": "Primary Care", "clinic_region": "North",
+}
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    pipeline: object
+    version: str
+    path: Path
+    signature: tuple
+    loaded_utc: str
+    warmup_ms: float
+    compiled: CompiledModel | None = None
+
+
+class ModelHolder:
+    def __init__(self, fallback: Path, root: Path | None = None, poll_s: float = 5.0):
+        self.fallback = Path(fallback)
+        self.root = root
+        self.poll_s = poll_s
+        self.current: LoadedModel | None = None
+        self.last_error: str | None = None
+        self.reloads = 0
+        self.on_swap: list[Callable[[LoadedModel], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # -- source ---------------------------------------------------------------
+
+    def source(self) -> tuple[Path, str | None, tuple] | None:
+        """(artifact path, registry run_id or None, change signature), or None without a model."""
+        champion = registry.resolve(registry.CHAMPION, self.root)
+        if champion is not None and champion["artifact_dir"] is not None:
+            path = Path(champion["artifact_dir"]) / registry.MODEL_FILE
+            if path.exists():
+                return path, champion["run_id"], (champion["run_id"], str(path), path.stat().st_mtime_ns)
+        if self.fallback.exists():
+            st = self.fallback.stat()
+            return self.fallback, None, (None, str(self.fallback), st.st_mtime_ns, st.st_size)
+        return None
+
+    # -- loading --------------------------------------------------------------
+
+    def refresh(self) -> bool:
+        """Load the source if it changed since the current model; True when a new model was published."""
+        with self._lock:
+            try:
+                src = self.source()
+                if src is None or (self.current is not None and self.current.signature == src[2]):
+                    return False
+                previous, self.current = self.current, self._load(*src)
+                self.last_error = None
+                self.reloads += 1
+                if previous is not None:
+                    for callback in self.on_swap:
+                        callback(self.current)
+                return True
+            except Exception as exc:  # keep serving the previous model
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                return False
+
+    def _load(self, path: Path, run_id: str | None, signature: tuple) -> LoadedModel:
+        pipeline = load(path)
+        t0 = time.perf_counter()
+        proba = float(pipeline.predict_proba(model_frame([WARMUP_RECORD]))[:, 1][0])
+        warmup_ms = (time.perf_counter() - t0) * 1000
+        if not (math.isfinite(proba) and 0.0 <= proba <= 1.0):
+            raise ValueError(f"Warm-up prediction out of range: {proba}")
+        fast = from_pipeline(pipeline)
+        if fast is not None and abs(fast.predict_one(WARMUP_RECORD) - proba) > PARITY_TOLERANCE:
+            fast = None
+        version = run_id or f"file-{registry.file_sha256(path)[:12]}"
+        return LoadedModel(pipeline=pipeline, version=version, path=path, signature=signature,
+                           loaded_utc=datetime.utcnow().isoformat() + "Z", warmup_ms=round(warmup_ms, 3),
+                           compiled=fast)
+
+    # -- polling --------------------------------------------------------------
+
+    def start(self) -> None:
+        self.refresh()
+        if self.poll_s > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, name="model-reload", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            self.refresh()
+
+    def status(self) -> dict:
+        model = self.current
+        return {
+            "ready": model is not None,
+            "model_loaded": model is not None,
+            "model_version": None if model is None else model.version,
+            "model_path": None if model is None else str(model.path),
+            "loaded_utc": None if model is None else model.loaded_utc,
+            "warmup_ms": None if model is None else model.warmup_ms,
+            "fast_path": model is not None and model.compiled is not None,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+        }
@@ -12,6 +12,8 @@ from datetime import datetime
 import pandas as pd
 
 from .check_engine import run_checks, _load_expectation
+from v2_mlops_modernisation.monitoring import timings
+from v2_mlops_modernisation.storage import parquet_store
 
 
 def _base() -> Path:
@@ -29,16 +31,20 @@ def load_datasets() -> dict[str, pd.DataFrame]:
     if raw_path.exists():
         datasets["raw_appointments"] = pd.read_csv(raw_path)
 
-    # STAGED
+    # STAGED (typed Parquet when available, CSV otherwise)
     staged_path = data / "staged" / "appointments_staged.csv"
-    if staged_path.exists():
+    if parquet_store.exists("staged", "appointments_staged"):
+        datasets["staged_appointments"] = parquet_store.read_table("staged", "appointments_staged")
+    elif staged_path.exists():
         datasets["staged_appointments"] = pd.read_csv(staged_path)
 
     # CURATED (key tables)
     curated_dir = data / "curated"
     for name in ["fact_appointments", "dim_patient", "dim_clinic", "dim_neighbourhood", "dim_date"]:
         p = curated_dir / f"{name}.csv"
-        if p.exists():
+        if parquet_store.exists("curated", name):
+            datasets[name] = parquet_store.read_table("curated", name)
+        elif p.exists():
             datasets[name] = pd.read_csv(p)
 
     return datasets
@@ -136,19 +142,25 @@ def write_issue_register(results, logs_dir: Path) -> Path:
 
 
 def main() -> None:
+    laps = timings.Laps("run_checks")
     base = _base()
     datasets = load_datasets()
     if not datasets:
         raise RuntimeError("No datasets found. Run make_sample_data.py then etl/run_etl.py first.")
 
+    rows = sum(len(df) for df in datasets.values())
+    laps("load_datasets", rows=rows)
+
     exps = load_expectations()
     results = run_checks(datasets, exps)
+    laps("run_checks", rows=rows)
 
     reports_dir = base / "reports"
     json_path, html_path = write_reports(results, reports_dir)
 
     logs_dir = base / "logs"
     issue_path = write_issue_register(results, logs_dir)
+    laps("write_reports")
 
     print(f"[OK] DQ summary: {json_path}")
     print(f"[OK] DQ HTML report: {html_path}")
@@ -0,0 +1 @@
+# etl package
@@ -0,0 +1,385 @@
+"""
+Incremental ETL (V2): stage only new RAW records and upsert them into the warehouse.
+
+A full run of run_etl.py records a high-water mark (latest loaded booking_datetime)
+and the signature of each RAW file in the warehouse `etl_state` table. An incremental
+run then:
+- skips RAW files whose size/mtime are unchanged since they were ingested
+- stages only rows booked after the watermark (same transform_stage as a full run)
+- upserts them into fact_appointments by appointment_id (delete + insert)
+- recomputes only the affected kpi_daily dates, kpi_clinic_performance clinics and
+  kpi_neighbourhood_hotspots rows, plus the matching dimension rows and the dashboard
+  rollup rows of the affected dates (warehouse/queries.py)
+- scores the upserted rows with the current model when the warehouse fact is already
+  scored (ml/score.py), so no row is left without a prediction
+- moves the watermark, all inside one transaction
+- upserts the staged rows, the curated tables and the scores into the Parquet tables
+  and CSV side outputs before that transaction commits
+
+KPI rows are recomputed from unrounded per-key sums (etl_sums_<kpi>) that are adjusted
+by the delta (new rows minus replaced rows), so even a clinic with years of history
+costs O(delta) to refresh.
+
+The Parquet tables and CSV side outputs follow the same keys: date-keyed tables (fact,
+scores, kpi_daily, dim_date) rewrite only the month partitions, and the month-ordered
+CSV tail, that the delta touches (storage/csv_store.py); clinic and neighbourhood
+tables hold one row per reference key. dim_patient is the exception: the patients of
+a day's bookings are spread over the whole table, so it is streamed from the warehouse
+in batches (cost follows the number of patients, not appointments). Everything else
+follows the day's volume, not the full history.
+
+Reference dimensions (clinic, neighbourhood, date) are only ever extended: their
+attributes are a function of the key, so rows for the delta's keys are rebuilt from
+the delta itself.
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.etl.incremental
+"""
+
+from __future__ import annotations
+
+from contextlib import ExitStack
+from pathlib import Path
+import argparse
+import os
+import sqlite3
+
+import pandas as pd
+
+from v2_mlops_modernisation.etl import run_etl, state
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.ml import score
+from v2_mlops_modernisation.storage import csv_store, parquet_store, sqlite_store
+from v2_mlops_modernisation.warehouse import queries
+
+
+FACT = "fact_appointments"
+EXPORT_BATCH_ROWS = 100_000
+
+# kpi table -> (key, [(output column, fact column, rounding)]); means are sum / appointments
+KPI_SPECS = {
+    "kpi_daily": ("date_key", [
+        ("avg_lead_time", "lead_time_days", 2),
+        ("sms_rate", "sms_reminder_sent", 3),
+        ("avg_prior_no_shows", "prior_no_show_count", 2),
+    ]),
+    "kpi_clinic_performance": ("clinic_id", [
+        ("avg_lead_time", "lead_time_days", 2),
+        ("sms_rate", "sms_reminder_sent", 3),
+    ]),
+    "kpi_neighbourhood_hotspots": ("neighbourhood_id", [
+        ("deprivation_index", "deprivation_index", 3),
+    ]),
+}
+
+# reference dimension -> (key, builder over staged rows)
+REFERENCE_DIMS = {
+    "dim_clinic": ("clinic_id", run_etl.build_dim_clinic),
+    "dim_neighbourhood": ("neighbourhood_id", run_etl.build_dim_neighbourhood),
+    "dim_date": ("date_key", run_etl.build_dim_date),
+}
+
+
+def _insert(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> None:
+    sqlite_store.insert_rows(conn, table, df)
+
+
+def _keys(conn: sqlite3.Connection, values) -> str:
+    """Load key values into a temp table and return a subquery over it.
+
+    Keeps key filters index-driven without hitting SQLite's bound-parameter limit.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _etl_keys (k TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM _etl_keys")
+    conn.executemany("INSERT OR IGNORE INTO _etl_keys VALUES (?)", [(v,) for v in values])
+    return "(SELECT k FROM _etl_keys)"
+
+
+def _delete_keys(conn: sqlite3.Connection, table: str, key: str, values) -> None:
+    conn.execute(f"DELETE FROM {table} WHERE {key} IN {_keys(conn, values)}")
+
+
+def ensure_fact_indexes(conn: sqlite3.Connection) -> None:
+    # appointment_id is the declared PRIMARY KEY; patient_id backs the dim_patient refresh
+    sqlite_store.create_indexes(conn, FACT)
+
+
+def _sums_table(kpi: str) -> str:
+    return state.SUMS_PREFIX + kpi
+
+
+def ensure_kpi_sums(conn: sqlite3.Connection) -> None:
+    """Create the per-key KPI sums from fact_appointments if a full load dropped them.
+
+    A full load builds the KPI tables and the fact from the same deduplicated staged
+    rows, so sums over the fact describe the KPI rows; a KPI table whose counts
+    disagree with them raises instead of being refreshed on a different definition.
+    """
+    for kpi, (key, measures) in KPI_SPECS.items():
+        table = _sums_table(kpi)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+            continue
+        sum_cols = ", ".join(f"sum_{out} REAL" for out, _, _ in measures)
+        conn.execute(f"CREATE TABLE {table} ({key} TEXT PRIMARY KEY, appointments INTEGER, "
+                     f"no_shows INTEGER, {sum_cols})")
+        sums = ", ".join(f"SUM({col})" for _, col, _ in measures)
+        conn.execute(f"INSERT INTO {table} SELECT {key}, COUNT(appointment_id), SUM(no_show_label), {sums} "
+                     f"FROM {FACT} GROUP BY {key}")
+        mismatched = conn.execute(f"SELECT COUNT(*) FROM {kpi} k LEFT JOIN {table} s USING ({key}) "
+                                  f"WHERE s.appointments IS NOT k.appointments").fetchone()[0]
+        if mismatched:
+            raise RuntimeError(f"{kpi}: {mismatched} rows disagree with {FACT}. Run a full ETL (run_etl.py).")
+
+
+def _group_sums(rows: pd.DataFrame, key: str, measures) -> pd.DataFrame:
+    agg = {"appointments": ("appointment_id", "count"), "no_shows": ("no_show_label", "sum")}
+    agg.update({f"sum_{out}": (col, "sum") for out, col, _ in measures})
+    return rows.groupby(key).agg(**agg)
+
+
+def kpi_rows_from_sums(sums: pd.DataFrame, key: str, measures) -> pd.DataFrame:
+    """Finish KPI rows from sums exactly like the full-build KPI functions do."""
+    out = sums[[key, "appointments", "no_shows"]].copy()
+    for name, _, decimals in measures:
+        out[name] = (sums[f"sum_{name}"] / sums["appointments"]).round(decimals)
+    out["no_show_rate"] = (out["no_shows"] / out["appointments"]).round(4)
+    return out.sort_values(key).reset_index(drop=True)
+
+
+def stage_new_records(paths: run_etl.Paths, current: dict[str, str],
+                      chunk_rows: int) -> tuple[pd.DataFrame, list[Path]]:
+    """Stage RAW rows booked after the watermark from files changed since the last load."""
+    watermark = pd.Timestamp(current[state.WATERMARK_KEY])
+    reference = run_etl.load_reference()
+
+    files = [f for f in state.raw_files(paths.raw)
+             if current.get(state.RAW_FILE_PREFIX + f.name) != state.file_signature(f)]
+
+    parts = []
+    for f in files:
+        with pd.read_csv(f, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                booked = pd.to_datetime(chunk["booking_datetime"], errors="coerce")
+                new = chunk[booked > watermark]
+                if len(new):
+                    parts.append(run_etl.transform_stage(new, reference))
+
+    if not parts:
+        return pd.DataFrame(columns=run_etl.STAGED_COLUMNS), files
+    return pd.concat(parts, ignore_index=True), files
+
+
+def upsert_fact(conn: sqlite3.Connection, delta: pd.DataFrame) -> pd.DataFrame:
+    """Replace-or-insert delta rows by appointment_id; returns the replaced rows."""
+    where = f"appointment_id IN {_keys(conn, delta['appointment_id'])}"
+    old = pd.read_sql(f"SELECT * FROM {FACT} WHERE {where}", conn)
+    conn.execute(f"DELETE FROM {FACT} WHERE {where}")
+    _insert(conn, FACT, delta)
+    return old
+
+
+def is_scored(conn: sqlite3.Connection) -> bool:
+    """True once a batch scoring run has added the prediction columns to the fact."""
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_info({FACT})")}
+    return set(score.PREDICTION_COLUMNS) <= cols
+
+
+def _upsert_curated(paths: run_etl.Paths, table: str, rows: pd.DataFrame, key: str,
+                    stale_months: set[str], keys=None) -> None:
+    """Replace rows by key in the Parquet table and the CSV side output that exist."""
+    root = run_etl.parquet_root(paths)
+    if parquet_store.exists("curated", table, root):
+        parquet_store.upsert_table(rows, "curated", table, key, stale_months, root, keys)
+    csv_path = paths.curated / f"{table}.csv"
+    if csv_path.exists():
+        csv_store.upsert_table(rows, csv_path, table, key, stale_months, keys)
+
+
+def export_staged(paths: run_etl.Paths, df_stage: pd.DataFrame, old: pd.DataFrame) -> None:
+    """Upsert the staged rows (last record wins, like the fact) into the staged tables that exist."""
+    root = run_etl.parquet_root(paths)
+    stale = parquet_store.months(old["date_key"])
+    if parquet_store.exists("staged", "appointments_staged", root):
+        parquet_store.upsert_table(df_stage, "staged", "appointments_staged", "appointment_id", stale, root)
+    stage_path = paths.staged / "appointments_staged.csv"
+    if stage_path.exists():
+        csv_store.upsert_table(df_stage, stage_path, "appointments_staged", "appointment_id", stale,
+                               date_format=run_etl.STAGED_DATETIME_FORMAT)
+
+
+def export_predictions(paths: run_etl.Paths, predictions: pd.DataFrame, old: pd.DataFrame) -> None:
+    """Upsert the delta's scores into the fact_predictions side tables that exist."""
+    _upsert_curated(paths, score.PREDICTIONS_TABLE, predictions, score.KEY, parquet_store.months(old["date_key"]))
+
+
+def refresh_kpis(conn: sqlite3.Connection, delta: pd.DataFrame, old: pd.DataFrame) -> None:
+    """Apply (delta - replaced rows) to the KPI sums and rewrite the affected KPI rows."""
+    for kpi, (key, measures) in KPI_SPECS.items():
+        table = _sums_table(kpi)
+        change = _group_sums(delta, key, measures)
+        if len(old):
+            change = change.sub(_group_sums(old, key, measures), fill_value=0)
+        change = change.reset_index()
+
+        keys = change[key]
+        current = pd.read_sql(f"SELECT * FROM {table} WHERE {key} IN {_keys(conn, keys)}", conn)
+        sums = (pd.concat([current, change], ignore_index=True)
+                .groupby(key, as_index=False).sum())
+        sums[["appointments", "no_shows"]] = sums[["appointments", "no_shows"]].astype(int)
+        sums = sums[sums["appointments"] > 0]
+
+        _delete_keys(conn, table, key, keys)
+        _insert(conn, table, sums[current.columns])
+        _delete_keys(conn, kpi, key, keys)
+        _insert(conn, kpi, kpi_rows_from_sums(sums, key, measures))
+
+
+def refresh_dimensions(conn: sqlite3.Connection, df_stage: pd.DataFrame, old: pd.DataFrame) -> None:
+    for dim, (key, build) in REFERENCE_DIMS.items():
+        rows = build(df_stage)
+        _delete_keys(conn, dim, key, rows[key])
+        _insert(conn, dim, rows)
+
+    # dim_patient aggregates each patient's whole history (mode/max/means)
+    patients = set(df_stage["patient_id"]) | set(old.get("patient_id", []))
+    history = pd.read_sql(f"SELECT * FROM {FACT} WHERE patient_id IN {_keys(conn, patients)}", conn)
+    _delete_keys(conn, "dim_patient", "patient_id", patients)
+    if len(history):
+        _insert(conn, "dim_patient", run_etl.build_dim_patient(history))
+
+
+def _rows(conn: sqlite3.Connection, table: str, key: str, values) -> pd.DataFrame:
+    return pd.read_sql(f"SELECT * FROM {table} WHERE {key} IN {_keys(conn, values)} ORDER BY {key}", conn)
+
+
+def _export_dim_patient(conn: sqlite3.Connection, paths: run_etl.Paths) -> None:
+    """Stream dim_patient from the warehouse into the Parquet table and CSV that exist."""
+    root = run_etl.parquet_root(paths)
+    csv_path = paths.curated / "dim_patient.csv"
+    csv_tmp = csv_path.with_name(f".{csv_path.name}.tmp") if csv_path.exists() else None
+    with ExitStack() as stack:
+        write = (stack.enter_context(parquet_store.table_writer("curated", "dim_patient", root))
+                 if parquet_store.exists("curated", "dim_patient", root) else None)
+        for i, batch in enumerate(pd.read_sql("SELECT * FROM dim_patient ORDER BY patient_id", conn,
+                                              chunksize=EXPORT_BATCH_ROWS)):
+            if write is not None:
+                write(batch)
+            if csv_tmp is not None:
+                batch.to_csv(csv_tmp, mode="a" if i else "w", header=not i, index=False)
+    if csv_tmp is not None:
+        os.replace(csv_tmp, csv_path)
+
+
+def export_curated(conn: sqlite3.Connection, paths: run_etl.Paths, delta: pd.DataFrame, old: pd.DataFrame) -> None:
+    """Refresh the Parquet tables and, when enabled, the curated CSV side outputs.
+
+    Rows are read back from the warehouse for the keys the delta touched only; see the
+    module docstring for what each table rewrites.
+    """
+    stale = parquet_store.months(old["date_key"])
+    _upsert_curated(paths, FACT, delta, "appointment_id", stale)
+
+    dates = set(delta["date_key"]) | set(old["date_key"])
+    _upsert_curated(paths, "kpi_daily", _rows(conn, "kpi_daily", "date_key", dates), "date_key",
+                    parquet_store.months(dates), keys=dates)
+    dim_date = _rows(conn, "dim_date", "date_key", set(delta["date_key"]))
+    dim_date["date"] = pd.to_datetime(dim_date["date"])
+    _upsert_curated(paths, "dim_date", dim_date, "date_key", set())
+
+    # one row per clinic / neighbourhood: bounded by the reference masters
+    root = run_etl.parquet_root(paths)
+    keys = {kpi: key for kpi, (key, _) in KPI_SPECS.items() if kpi != "kpi_daily"}
+    keys.update({dim: key for dim, (key, _) in REFERENCE_DIMS.items() if dim != "dim_date"})
+    for table, key in keys.items():
+        df = pd.read_sql(f"SELECT * FROM {table} ORDER BY {key}", conn)
+        if parquet_store.exists("curated", table, root):
+            parquet_store.write_table(df, "curated", table, root)
+        if (paths.curated / f"{table}.csv").exists():
+            csv_store.write_table(df, paths.curated / f"{table}.csv", table)
+
+    _export_dim_patient(conn, paths)
+
+
+def run_incremental(chunk_rows: int = 500_000, model_path: Path | None = None) -> dict[str, int | str]:
+    paths = run_etl._paths()
+    db_path = paths.wh / "warehouse.db"
+    if not db_path.exists():
+        raise FileNotFoundError(f"Missing warehouse: {db_path}. Run a full ETL (run_etl.py) first.")
+
+    with sqlite3.connect(db_path) as conn:
+        current = state.read_state(conn)
+    if state.WATERMARK_KEY not in current:
+        raise RuntimeError("No ETL watermark recorded. Run a full ETL (run_etl.py) first.")
+
+    df_stage, files = stage_new_records(paths, current, chunk_rows)
+    # Upsert semantics: the last record for an appointment_id wins
+    df_stage = run_etl.dedupe_appointments(df_stage).reset_index(drop=True)
+    delta = run_etl.build_fact(df_stage)
+
+    predictions = None
+    with sqlite3.connect(db_path) as conn:
+        scored = is_scored(conn)
+    if scored and len(delta):
+        model_path = Path(model_path or score.default_model_path())
+        if not model_path.exists():
+            raise FileNotFoundError(f"Missing model artifact: {model_path}. The warehouse is scored; "
+                                    "train a model (or pass --model) before loading new rows.")
+        predictions = score.score_rows(delta, model_path)
+
+    old = pd.DataFrame(columns=run_etl.FACT_COLUMNS)
+    with sqlite3.connect(db_path) as conn:
+        ensure_fact_indexes(conn)
+        ensure_kpi_sums(conn)
+        queries.ensure_query_layer(conn)
+        if len(delta):
+            old = upsert_fact(conn, delta)
+            if predictions is not None:
+                sqlite_store.update_rows(conn, FACT, predictions[[score.KEY] + score.PREDICTION_COLUMNS], score.KEY)
+            refresh_kpis(conn, delta, old)
+            refresh_dimensions(conn, df_stage, old)
+            queries.refresh_rollups(conn, set(delta["date_key"]) | set(old["date_key"]))
+        state.write_state(conn, state.load_state_items(df_stage["booking_datetime"], files,
+                                                       previous=current[state.WATERMARK_KEY]))
+
+        # Side outputs are written before the commit. They are upserts by key, so if one
+        # fails the warehouse rolls back with its watermark and the next run applies the
+        # same delta again over whatever was already written.
+        if len(delta):
+            vocab_path = paths.ref / vocab.VOCAB_FILE
+            vocab.save(vocab.update(vocab.load(vocab_path), df_stage), vocab_path)
+            export_staged(paths, df_stage, old)
+            export_curated(conn, paths, delta, old)
+            if predictions is not None:
+                export_predictions(paths, predictions, old)
+        conn.commit()
+
+        watermark = state.read_state(conn)[state.WATERMARK_KEY]
+
+    return {
+        "files_read": len(files),
+        "rows_upserted": len(delta),
+        "rows_replaced": len(old),
+        "rows_scored": 0 if predictions is None else len(predictions),
+        "watermark": watermark,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Incremental ETL: stage new RAW rows and upsert them into the warehouse.")
+    ap.add_argument("--chunk-rows", type=int, default=500_000, help="RAW rows read per batch")
+    ap.add_argument("--model", type=Path, default=None,
+                    help="model that scores new rows of a scored warehouse (default: the registry champion)")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    summary = run_incremental(args.chunk_rows, args.model)
+    print(f"[OK] RAW files read: {summary['files_read']}")
+    print(f"[OK] Rows upserted: {summary['rows_upserted']:,} (replaced {summary['rows_replaced']:,}, "
+          f"scored {summary['rows_scored']:,})")
+    print(f"[OK] Watermark: {summary['watermark']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Process-parallel ETL (V2): partitioned staging and partial aggregation.
+
+RAW rows are split by partition key (appointment month x clinic). Each partition is
+staged with the same transform_stage as a serial run and partially aggregated on a
+process pool:
+- KPI tables and dim_patient: counts, integer sums and maxima per key
+- modes (patient gender / age band): counts per (patient, value)
+- reference dimensions: the distinct rows of the partition
+
+A re-booked appointment_id can fall into another partition than its earlier record,
+so the driver deduplicates the combined staged rows (run_etl.dedupe_appointments) and
+re-aggregates the few partitions that lost rows to a later partition.
+
+The driver merges the partials in partition order. Means are sum / count over integer
+sums, which are exact, so they equal the serial groupby means bit for bit; modes are
+re-selected from the summed counts with the serial tie-break (smallest value). The one
+float mean (kpi_neighbourhood_hotspots.deprivation_index) depends on summation order,
+so it is reduced by the driver over the fact table in RAW order. Staged rows carry
+their RAW row labels and are put back in RAW order, so every output is byte-identical
+to the serial run.
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.etl.run_etl --workers 8
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import pandas as pd
+
+from v2_mlops_modernisation.etl import run_etl
+
+
+PATIENT_MEASURES = [
+    # (output column, staged column, decimals)
+    ("chronic_conditions_avg", "chronic_conditions_count", 2),
+    ("disability_rate", "disability_flag", 3),
+    ("prior_no_show_avg", "prior_no_show_count", 2),
+]
+
+# kpi table -> (key, [(output column, fact column, decimals)]) for means over integer columns
+KPI_MEANS = {
+    "kpi_daily": ("date_key", [
+        ("avg_lead_time", "lead_time_days", 2),
+        ("sms_rate", "sms_reminder_sent", 3),
+        ("avg_prior_no_shows", "prior_no_show_count", 2),
+    ]),
+    "kpi_clinic_performance": ("clinic_id", [
+        ("avg_lead_time", "lead_time_days", 2),
+        ("sms_rate", "sms_reminder_sent", 3),
+    ]),
+    "kpi_neighbourhood_hotspots": ("neighbourhood_id", []),
+}
+
+
+def partition_keys(df_raw: pd.DataFrame) -> pd.Series:
+    """Appointment month x clinic; taken from the RAW text so the driver does no parsing."""
+    month = df_raw["appointment_datetime"].astype(str).str.slice(0, 7)
+    return month + "|" + df_raw["clinic_id"].astype(str)
+
+
+def split_partitions(df_raw: pd.DataFrame) -> list[pd.DataFrame]:
+    return [part for _, part in df_raw.groupby(partition_keys(df_raw), sort=True)]
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _kpi_partial(fact: pd.DataFrame, key: str, measures) -> pd.DataFrame:
+    agg = {"appointments": ("appointment_id", "count"), "no_shows": ("no_show_label", "sum")}
+    agg.update({f"sum_{out}": (col, "sum") for out, col, _ in measures})
+    return fact.groupby(key).agg(**agg)
+
+
+def aggregate_partition(df_stage: pd.DataFrame) -> dict[str, object]:
+    """Partial aggregates of one staged partition."""
+    fact = run_etl.build_fact(df_stage)
+    agg = {"age": ("age", "max")}
+    for out, col, _ in PATIENT_MEASURES:
+        agg[f"sum_{out}"] = (col, "sum")
+        agg[f"n_{out}"] = (col, "count")
+    return {
+        "patient": df_stage.groupby("patient_id").agg(**agg),
+        "patient_modes": {col: df_stage.groupby(["patient_id", col]).size().rename("n").reset_index()
+                          for col in run_etl.PATIENT_MODE_ATTRIBUTES},
+        "dim_clinic": run_etl.build_dim_clinic(df_stage),
+        "dim_neighbourhood": run_etl.build_dim_neighbourhood(df_stage),
+        "dim_date": df_stage[["appointment_date", "appointment_dow"]].drop_duplicates(),
+        "kpi": {kpi: _kpi_partial(fact, key, measures) for kpi, (key, measures) in KPI_MEANS.items()},
+    }
+
+
+def stage_partition(args: tuple[pd.DataFrame, tuple[pd.DataFrame, pd.DataFrame]]) -> tuple[pd.DataFrame, dict]:
+    df_raw, reference = args
+    df_stage = run_etl.transform_stage(df_raw, reference)
+    return df_stage, aggregate_partition(df_stage)
+
+
+# ---------------------------------------------------------------------------
+# Driver side
+# ---------------------------------------------------------------------------
+
+def _patient_sums(partials: list[dict]) -> pd.DataFrame:
+    sums = pd.concat([p["patient"] for p in partials])
+    return sums.groupby(level=0).agg({c: ("max" if c == "age" else "sum") for c in sums.columns})
+
+
+def combine_partials(partials: list[dict]) -> dict[str, object]:
+    """One partial for the rows of all the given partials (folds a stream of chunks)."""
+    def rows(part: str) -> pd.DataFrame:
+        return pd.concat([p[part] for p in partials], ignore_index=True).drop_duplicates()
+
+    return {
+        "patient": _patient_sums(partials),
+        "patient_modes": {col: (pd.concat([p["patient_modes"][col] for p in partials], ignore_index=True)
+                                .groupby(["patient_id", col], as_index=False)["n"].sum())
+                          for col in run_etl.PATIENT_MODE_ATTRIBUTES},
+        "dim_clinic": rows("dim_clinic"),
+        "dim_neighbourhood": rows("dim_neighbourhood"),
+        "dim_date": rows("dim_date"),
+        "kpi": {kpi: pd.concat([p["kpi"][kpi] for p in partials]).groupby(level=0).sum() for kpi in KPI_MEANS},
+    }
+
+
+def merge_dim_patient(partials: list[dict]) -> pd.DataFrame:
+    agg = _patient_sums(partials)
+
+    dim_patient = pd.DataFrame({"patient_id": agg.index.to_numpy(dtype=object)})
+    for col in run_etl.PATIENT_MODE_ATTRIBUTES:
+        counts = pd.concat([p["patient_modes"][col] for p in partials], ignore_index=True)
+        key_codes = agg.index.get_indexer(counts["patient_id"])
+        dim_patient[col] = run_etl._mode_of_codes(key_codes, len(agg), counts[col], counts["n"].to_numpy())
+    dim_patient["age"] = agg["age"].to_numpy()
+    for out, _, decimals in PATIENT_MEASURES:
+        dim_patient[out] = (agg[f"sum_{out}"] / agg[f"n_{out}"]).to_numpy().round(decimals)
+    return dim_patient[["patient_id", "gender", "age", "age_band",
+                        "chronic_conditions_avg", "disability_rate", "prior_no_show_avg"]]
+
+
+def merge_kpi(partials: list[dict], kpi: str) -> pd.DataFrame:
+    key, measures = KPI_MEANS[kpi]
+    sums = pd.concat([p["kpi"][kpi] for p in partials]).groupby(level=0).sum()
+    out = pd.DataFrame({key: sums.index.to_numpy(dtype=object),
+                        "appointments": sums["appointments"].to_numpy(),
+                        "no_shows": sums["no_shows"].to_numpy()})
+    for name, _, decimals in measures:
+        out[name] = (sums[f"sum_{name}"] / sums["appointments"]).to_numpy()
+    out["no_show_rate"] = (out["no_shows"] / out["appointments"]).round(4)
+    for name, _, decimals in measures:
+        out[name] = out[name].round(decimals)
+    return out
+
+
+def merge_partials(partials: list[dict], deprivation: pd.Series, fact) -> dict[str, object]:
+    """Curated tables from partials; deprivation is the (unrounded) mean per neighbourhood
+    and fact is passed through as the fact_appointments entry."""
+    kpi_neigh = merge_kpi(partials, "kpi_neighbourhood_hotspots")
+    kpi_neigh.insert(3, "deprivation_index", deprivation.round(3).reindex(kpi_neigh["neighbourhood_id"]).to_numpy())
+
+    return {
+        "dim_patient": merge_dim_patient(partials),
+        "dim_clinic": run_etl.build_dim_clinic(pd.concat([p["dim_clinic"] for p in partials], ignore_index=True)),
+        "dim_neighbourhood": run_etl.build_dim_neighbourhood(
+            pd.concat([p["dim_neighbourhood"] for p in partials], ignore_index=True)),
+        "dim_date": run_etl.build_dim_date(pd.concat([p["dim_date"] for p in partials], ignore_index=True)),
+        "fact_appointments": fact,
+        "kpi_daily": merge_kpi(partials, "kpi_daily"),
+        "kpi_clinic_performance": merge_kpi(partials, "kpi_clinic_performance"),
+        "kpi_neighbourhood_hotspots": kpi_neigh,
+    }
+
+
+def stage_and_build(df_raw: pd.DataFrame, reference: tuple[pd.DataFrame, pd.DataFrame],
+                    workers: int | None = None) -> tuple[pd.DataFrame, dict[str, pd.DataFrame]]:
+    """Parallel equivalent of transform_stage + build_curated."""
+    workers = workers or os.cpu_count() or 1
+    parts = split_partitions(df_raw)
+    tasks = [(part, reference) for part in parts]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = [(s, p) for s, p in pool.map(stage_partition, tasks,
+                                               chunksize=max(1, len(tasks) // (workers * 4))) if len(s)]
+        if not results:
+            df_stage = run_etl.transform_stage(df_raw, reference)
+            return df_stage, run_etl.build_curated(df_stage)
+
+        # Back to RAW order (staged rows keep their RAW row labels), then keep the last
+        # record of appointment_ids staged in more than one partition
+        df_stage = run_etl.dedupe_appointments(pd.concat([s for s, _ in results]).sort_index(kind="stable"))
+        # ... and re-aggregate the partitions that lost rows that way
+        kept = [(s, p, s.index.isin(df_stage.index)) for s, p in results]
+        kept = [(s, p, mask) for s, p, mask in kept if mask.any()]
+        partials = [p for _, p, _ in kept]
+        stale = [i for i, (_, _, mask) in enumerate(kept) if not mask.all()]
+        for i, partial in zip(stale, pool.map(aggregate_partition, [kept[i][0][kept[i][2]] for i in stale])):
+            partials[i] = partial
+    fact = run_etl.build_fact(df_stage)
+    # Float mean: summation order matters, so reduce it over the fact in RAW order (as serial)
+    deprivation = fact.groupby("neighbourhood_id")["deprivation_index"].mean()
+    return df_stage, merge_partials(partials, deprivation, fact)
@@ -5,17 +5,37 @@ Design goals:
 - Reproducible and portfolio-safe (synthetic only)
 - Explicit transformations
 - Produces datasets used by ML + BI + monitoring
+
+Staged and curated tables are written as typed, month-partitioned Parquet
+(storage/parquet_store.py); CSV copies are kept as a side output for BI unless --no-csv
+(storage/csv_store.py, date-keyed tables in month order).
+The warehouse is bulk loaded with the DDL declared in warehouse/schema.sql
+(storage/sqlite_store.py) and the fact_appointments load time is printed per run.
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.etl.run_etl                      # in-memory staging
+  python -m v2_mlops_modernisation.etl.run_etl --chunk-rows 500000  # streaming, memory bounded by the batch (etl/streaming.py)
+  python -m v2_mlops_modernisation.etl.run_etl --workers 8          # partitions staged/aggregated on 8 processes
+  python -m v2_mlops_modernisation.etl.run_etl --no-csv             # Parquet only
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator
+import argparse
 import sqlite3
 
 import numpy as np
 import pandas as pd
 
+from v2_mlops_modernisation.features import derivations, vocab
+from v2_mlops_modernisation.etl import state
+from v2_mlops_modernisation.monitoring import timings
+from v2_mlops_modernisation.storage import csv_store, parquet_store, sqlite_store
+from v2_mlops_modernisation.warehouse import queries
+
 
 @dataclass
 class Paths:
@@ -27,6 +47,10 @@ class Paths:
     wh: Path
 
 
+def parquet_root(p: Paths) -> Path:
+    return p.staged.parent / "parquet"
+
+
 def _paths() -> Paths:
     base = Path(__file__).resolve().parents[1]
     data = base / "data"
@@ -41,47 +65,48 @@ def _paths() -> Paths:
     )
 
 
-def _age_band(age: float) -> str:
-    if age < 0:
-        return "Unknown"
-    if age < 18:
-        return "0-17"
-    if age < 30:
-        return "18-29"
-    if age < 45:
-        return "30-44"
-    if age < 60:
-        return "45-59"
-    if age < 75:
-        return "60-74"
-    return "75+"
-
-
-def _lead_band(days: int) -> str:
-    if days <= 0:
-        return "0"
-    if days <= 2:
-        return "1-2"
-    if days <= 7:
-        return "3-7"
-    if days <= 14:
-        return "8-14"
-    if days <= 30:
-        return "15-30"
-    return "31+"
+STAGED_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+STAGED_COLUMNS = [
+    "appointment_id","patient_id","clinic_id","neighbourhood_id",
+    "gender","age","age_band","chronic_conditions_count","disability_flag",
+    "appointment_datetime","booking_datetime","appointment_date","appointment_dow","appointment_hour","appointment_is_weekend",
+    "lead_time_days","lead_time_band","appointment_type","booking_channel","sms_reminder_sent",
+    "prior_no_show_count","prior_show_count",
+    "deprivation_index","region","lat","lon","clinic_type","daily_capacity","clinic_region",
+    "no_show_label"
+]
 
-def extract() -> pd.DataFrame:
-    p = _paths()
-    raw_path = p.raw / "appointments_raw.csv"
+
+def _raw_path() -> Path:
+    raw_path = _paths().raw / "appointments_raw.csv"
     if not raw_path.exists():
         raise FileNotFoundError(f"Missing RAW dataset: {raw_path}. Run scripts/make_sample_data.py first.")
-    df = pd.read_csv(raw_path)
+    return raw_path
+
+
+def extract() -> pd.DataFrame:
+    df = pd.read_csv(_raw_path())
     return df
 
 
-def transform_stage(df_raw: pd.DataFrame) -> pd.DataFrame:
+def extract_chunks(chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Yield the RAW dataset in batches of at most chunk_rows rows."""
+    with pd.read_csv(_raw_path(), chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def load_reference() -> tuple[pd.DataFrame, pd.DataFrame]:
     p = _paths()
+    neigh = pd.read_csv(p.ref / "neighbourhood_master.csv")
+    clinic = pd.read_csv(p.ref / "clinic_master.csv")
+    return neigh, clinic
+
+
+def transform_stage(df_raw: pd.DataFrame,
+                    reference: tuple[pd.DataFrame, pd.DataFrame] | None = None) -> pd.DataFrame:
+    neigh, clinic = reference if reference is not None else load_reference()
     df = df_raw.copy()
 
     # Parse datetimes
@@ -92,22 +117,16 @@ def transform_stage(df_raw: pd.DataFrame) -> pd.DataFrame:
     df = df.dropna(subset=["appointment_datetime", "booking_datetime"]).copy()
 
     # Compute lead time
-    df["lead_time_days"] = (df["appointment_datetime"].dt.normalize() - df["booking_datetime"].dt.normalize()).dt.days.astype(int)
-
-
+    df["lead_time_days"] = derivations.lead_time_days(df["appointment_datetime"], df["booking_datetime"])
 
-    # Deduplicate appointment_id (keep earliest booking_datetime)
-    #df = df.sort_values(["appointment_id", "booking_datetime"]).drop_duplicates(subset=["appointment_id"], keep="first")
-
-    # Join neighbourhood master
-    neigh = pd.read_csv(p.ref / "neighbourhood_master.csv")
-    df = df.merge(neigh[["neighbourhood_id", "deprivation_index", "region", "lat", "lon"]],
-                  on="neighbourhood_id", how="left")
+    # Join neighbourhood master (left joins on the master key keep the RAW row labels,
+    # which the parallel mode uses to restore RAW order)
+    df = df.join(neigh.set_index("neighbourhood_id")[["deprivation_index", "region", "lat", "lon"]],
+                 on="neighbourhood_id")
 
     # Join clinic master
-    clinic = pd.read_csv(p.ref / "clinic_master.csv")
-    df = df.merge(clinic[["clinic_id", "clinic_type", "daily_capacity", "region"]].rename(columns={"region":"clinic_region"}),
-                  on="clinic_id", how="left")
+    df = df.join(clinic.set_index("clinic_id")[["clinic_type", "daily_capacity", "region"]].rename(columns={"region":"clinic_region"}),
+                 on="clinic_id")
 
     # Stage filters (cleanliness)
     # Remove invalid neighbourhoods / clinics
@@ -122,13 +141,11 @@ def transform_stage(df_raw: pd.DataFrame) -> pd.DataFrame:
     df = df[df["lead_time_days"] >= 0].copy()
 
     # Engineer time fields
-    df["appointment_date"] = df["appointment_datetime"].dt.date.astype(str)
-    df["appointment_dow"] = df["appointment_datetime"].dt.day_name()
-    df["appointment_hour"] = df["appointment_datetime"].dt.hour
-    df["appointment_is_weekend"] = (df["appointment_datetime"].dt.weekday >= 5).astype(int)
+    for c, values in derivations.time_fields(df["appointment_datetime"]).items():
+        df[c] = values
 
-    df["age_band"] = df["age"].apply(_age_band)
-    df["lead_time_band"] = df["lead_time_days"].apply(_lead_band)
+    df["age_band"] = derivations.age_band(df["age"])
+    df["lead_time_band"] = derivations.lead_time_band(df["lead_time_days"])
 
     df["no_show_label"] = df["no_show"].astype(int)
 
@@ -137,71 +154,117 @@ def transform_stage(df_raw: pd.DataFrame) -> pd.DataFrame:
         df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(int)
 
     # Final column ordering
-    cols = [
-        "appointment_id","patient_id","clinic_id","neighbourhood_id",
-        "gender","age","age_band","chronic_conditions_count","disability_flag",
-        "appointment_datetime","booking_datetime","appointment_date","appointment_dow","appointment_hour","appointment_is_weekend",
-        "lead_time_days","lead_time_band","appointment_type","booking_channel","sms_reminder_sent",
-        "prior_no_show_count","prior_show_count",
-        "deprivation_index","region","lat","lon","clinic_type","daily_capacity","clinic_region",
-        "no_show_label"
-    ]
-    df = df[cols].copy()
-
-    return df
-
-
-def build_curated(df_stage: pd.DataFrame) -> dict[str, pd.DataFrame]:
-    # Dimensions
-    dim_patient = (df_stage.groupby("patient_id")
+    df = df[STAGED_COLUMNS].copy()
+
+    return dedupe_appointments(df)
+
+
+def dedupe_appointments(df_stage: pd.DataFrame) -> pd.DataFrame:
+    """One row per appointment_id: the last valid staged record (in RAW order) wins.
+
+    A duplicated appointment_id is a re-booking, so the later record replaces the
+    earlier one (the same rule the incremental upsert applies). Applied to the whole
+    staged table, every later layer (fact, KPIs, warehouse) sees the same rows. Batches
+    and partitions staged separately must be deduplicated again once combined.
+    """
+    return df_stage[~df_stage["appointment_id"].duplicated(keep="last")]
+
+
+FACT_COLUMNS = [
+    "appointment_id","date_key","patient_id","clinic_id","neighbourhood_id",
+    "appointment_datetime","booking_datetime",
+    "appointment_type","booking_channel",
+    "lead_time_days","lead_time_band","appointment_dow","appointment_hour","appointment_is_weekend",
+    "sms_reminder_sent","prior_no_show_count","prior_show_count",
+    "age","age_band","gender","chronic_conditions_count","disability_flag",
+    "deprivation_index","clinic_type","daily_capacity","region","clinic_region",
+    "no_show_label"
+]
+
+
+def _mode_of_codes(key_codes: np.ndarray, n_keys: int, values: pd.Series,
+                   weights: np.ndarray | None = None) -> np.ndarray:
+    """Most frequent value per key code (0..n_keys-1), NaN where a key has no values.
+
+    weights, when given, are per-row counts (e.g. partial counts from etl/parallel.py).
+    """
+    val_codes, val_values = pd.factorize(values, sort=True)
+    present = val_codes >= 0
+    n_values = max(len(val_values), 1)
+    pairs, inverse = np.unique(key_codes[present].astype(np.int64) * n_values + val_codes[present],
+                               return_inverse=True)
+    counts = np.bincount(inverse, weights=None if weights is None else weights[present], minlength=len(pairs))
+    pair_key, pair_val = pairs // n_values, pairs % n_values
+    order = np.lexsort((pair_val, -counts, pair_key))
+    pair_key, pair_val = pair_key[order], pair_val[order]
+    first = np.ones(len(pair_key), dtype=bool)
+    first[1:] = pair_key[1:] != pair_key[:-1]
+    out = np.full(n_keys, np.nan, dtype=object)
+    out[pair_key[first]] = val_values.take(pair_val[first])
+    return out
+
+
+PATIENT_MODE_ATTRIBUTES = ["gender", "age_band"]
+
+
+def build_dim_patient(df: pd.DataFrame) -> pd.DataFrame:
+    # Factorize patient_id once (sorted, so output order matches groupby) and aggregate on the integer codes
+    codes, patients = pd.factorize(df["patient_id"], sort=True)
+    if (codes < 0).any():
+        df, codes = df[codes >= 0], codes[codes >= 0]
+    dim_patient = (df[["age", "chronic_conditions_count", "disability_flag", "prior_no_show_count"]]
+                   .groupby(codes)
                    .agg(
-                       gender=("gender", lambda s: s.mode().iloc[0] if not s.mode().empty else s.iloc[0]),
                        age=("age","max"),
-                       age_band=("age_band", lambda s: s.mode().iloc[0] if not s.mode().empty else s.iloc[0]),
                        chronic_conditions_avg=("chronic_conditions_count","mean"),
                        disability_rate=("disability_flag","mean"),
                        prior_no_show_avg=("prior_no_show_count","mean"),
                    )
-                   .reset_index())
+                   .reindex(range(len(patients))))
+    dim_patient.insert(0, "patient_id", patients)
+    for col in PATIENT_MODE_ATTRIBUTES:
+        dim_patient[col] = _mode_of_codes(codes, len(patients), df[col])
+    dim_patient = dim_patient.reset_index(drop=True)[[
+        "patient_id", "gender", "age", "age_band", "chronic_conditions_avg", "disability_rate", "prior_no_show_avg"
+    ]]
     dim_patient["chronic_conditions_avg"] = dim_patient["chronic_conditions_avg"].round(2)
     dim_patient["disability_rate"] = dim_patient["disability_rate"].round(3)
     dim_patient["prior_no_show_avg"] = dim_patient["prior_no_show_avg"].round(2)
+    return dim_patient
+
 
-    dim_clinic = (df_stage.groupby(["clinic_id","clinic_type","daily_capacity","clinic_region"])
+def build_dim_clinic(df: pd.DataFrame) -> pd.DataFrame:
+    dim_clinic = (df.groupby(["clinic_id","clinic_type","daily_capacity","clinic_region"])
                   .size().reset_index(name="appointments"))
-    dim_clinic = dim_clinic.drop(columns=["appointments"])
+    return dim_clinic.drop(columns=["appointments"])
 
-    dim_neighbourhood = (df_stage.groupby(["neighbourhood_id","region","lat","lon","deprivation_index"])
+
+def build_dim_neighbourhood(df: pd.DataFrame) -> pd.DataFrame:
+    dim_neighbourhood = (df.groupby(["neighbourhood_id","region","lat","lon","deprivation_index"])
                          .size().reset_index(name="appointments"))
-    dim_neighbourhood = dim_neighbourhood.drop(columns=["appointments"])
-
-    dim_date = (df_stage[["appointment_date","appointment_dow"]]
-                .drop_duplicates()
-                .assign(date=lambda d: pd.to_datetime(d["appointment_date"]))
-                .assign(year=lambda d: d["date"].dt.year,
-                        month=lambda d: d["date"].dt.month,
-                        month_name=lambda d: d["date"].dt.month_name(),
-                        week=lambda d: d["date"].dt.isocalendar().week.astype(int))
-                .rename(columns={"appointment_date":"date_key"})
-                .sort_values("date_key")
-                .reset_index(drop=True))
-
-    # Fact
-    fact = df_stage.copy()
-    fact = fact.rename(columns={"appointment_date":"date_key"})
-    keep_cols = [
-        "appointment_id","date_key","patient_id","clinic_id","neighbourhood_id",
-        "appointment_datetime","booking_datetime",
-        "appointment_type","booking_channel",
-        "lead_time_days","lead_time_band","appointment_dow","appointment_hour","appointment_is_weekend",
-        "sms_reminder_sent","prior_no_show_count","prior_show_count",
-        "age","age_band","gender","chronic_conditions_count","disability_flag",
-        "deprivation_index","clinic_type","daily_capacity","region","clinic_region",
-        "no_show_label"
-    ]
-    fact = fact[keep_cols].copy()
-
-    # KPIs
+    return dim_neighbourhood.drop(columns=["appointments"])
+
+
+def build_dim_date(df: pd.DataFrame) -> pd.DataFrame:
+    """dim_date from rows carrying appointment_date and appointment_dow."""
+    return (df[["appointment_date","appointment_dow"]]
+            .drop_duplicates()
+            .assign(date=lambda d: pd.to_datetime(d["appointment_date"]))
+            .assign(year=lambda d: d["date"].dt.year,
+                    month=lambda d: d["date"].dt.month,
+                    month_name=lambda d: d["date"].dt.month_name(),
+                    week=lambda d: d["date"].dt.isocalendar().week.astype(int))
+            .rename(columns={"appointment_date":"date_key"})
+            .sort_values("date_key")
+            .reset_index(drop=True))
+
+
+def build_fact(df_stage: pd.DataFrame) -> pd.DataFrame:
+    fact = df_stage.rename(columns={"appointment_date":"date_key"})
+    return fact[FACT_COLUMNS].copy()
+
+
+def build_kpi_daily(fact: pd.DataFrame) -> pd.DataFrame:
     kpi_daily = (fact.groupby("date_key")
                  .agg(
                      appointments=("appointment_id","count"),
@@ -215,7 +278,10 @@ def build_curated(df_stage: pd.DataFrame) -> dict[str, pd.DataFrame]:
     kpi_daily["avg_lead_time"] = kpi_daily["avg_lead_time"].round(2)
     kpi_daily["sms_rate"] = kpi_daily["sms_rate"].round(3)
     kpi_daily["avg_prior_no_shows"] = kpi_daily["avg_prior_no_shows"].round(2)
+    return kpi_daily
+
 
+def build_kpi_clinic(fact: pd.DataFrame) -> pd.DataFrame:
     kpi_clinic = (fact.groupby("clinic_id")
                   .agg(
                       appointments=("appointment_id","count"),
@@ -227,7 +293,10 @@ def build_curated(df_stage: pd.DataFrame) -> dict[str, pd.DataFrame]:
     kpi_clinic["no_show_rate"] = (kpi_clinic["no_shows"] / kpi_clinic["appointments"]).round(4)
     kpi_clinic["avg_lead_time"] = kpi_clinic["avg_lead_time"].round(2)
     kpi_clinic["sms_rate"] = kpi_clinic["sms_rate"].round(3)
+    return kpi_clinic
+
 
+def build_kpi_neighbourhood(fact: pd.DataFrame) -> pd.DataFrame:
     kpi_neigh = (fact.groupby("neighbourhood_id")
                  .agg(
                      appointments=("appointment_id","count"),
@@ -240,20 +309,25 @@ def build_curated(df_stage: pd.DataFrame) -> dict[str, pd.DataFrame]:
     kpi_neigh = kpi_neigh.drop(columns=["lat"])
     kpi_neigh["no_show_rate"] = (kpi_neigh["no_shows"] / kpi_neigh["appointments"]).round(4)
     kpi_neigh["deprivation_index"] = kpi_neigh["deprivation_index"].round(3)
+    return kpi_neigh
 
+
+def build_curated(df_stage: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    fact = build_fact(df_stage)
     return {
-        "dim_patient": dim_patient,
-        "dim_clinic": dim_clinic,
-        "dim_neighbourhood": dim_neighbourhood,
-        "dim_date": dim_date,
+        "dim_patient": build_dim_patient(df_stage),
+        "dim_clinic": build_dim_clinic(df_stage),
+        "dim_neighbourhood": build_dim_neighbourhood(df_stage),
+        "dim_date": build_dim_date(df_stage),
         "fact_appointments": fact,
-        "kpi_daily": kpi_daily,
-        "kpi_clinic_performance": kpi_clinic,
-        "kpi_neighbourhood_hotspots": kpi_neigh,
+        "kpi_daily": build_kpi_daily(fact),
+        "kpi_clinic_performance": build_kpi_clinic(fact),
+        "kpi_neighbourhood_hotspots": build_kpi_neighbourhood(fact),
     }
 
 
-def load_to_warehouse(tables: dict[str, pd.DataFrame]) -> Path:
+def load_to_warehouse(tables: dict[str, pd.DataFrame],
+                      state_items: dict[str, str] | None = None) -> tuple[Path, dict[str, dict[str, float]]]:
     p = _paths()
     p.wh.mkdir(parents=True, exist_ok=True)
     db_path = p.wh / "warehouse.db"
@@ -334,36 +408,90 @@ CREATE TABLE IF NOT EXISTS fact_appointments (
 );
 """.strip() + "\n", encoding="utf-8")
 
-    with sqlite3.connect(db_path) as conn:
-        conn.executescript(schema_sql.read_text(encoding="utf-8"))
+    # Bulk load (replace) with the declared DDL; the dashboard query layer and the
+    # watermark for later incremental runs (etl/incremental.py) are built in the same transaction
+    def finalize(conn: sqlite3.Connection) -> None:
+        queries.build_query_layer(conn)
+        if state_items is not None:
+            state.replace_state(conn, state_items)
+
+    stats = sqlite_store.bulk_load(db_path, tables, schema_sql.read_text(encoding="utf-8"), finalize)
+    return db_path, stats
 
-        # Load tables (replace)
-        for name, df in tables.items():
-            df.to_sql(name, conn, if_exists="replace", index=False)
 
-    return db_path
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Run the V2 ETL (raw -> staged -> curated -> warehouse).")
+    ap.add_argument("--chunk-rows", type=int, default=None,
+                    help="stream RAW -> staged -> curated in batches of this many rows (etl/streaming.py; "
+                         "output identical to serial)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="stage and aggregate partitions on this many processes (output identical to serial)")
+    ap.add_argument("--no-csv", action="store_true",
+                    help="skip the staged and curated CSV side outputs (Parquet and the warehouse are always written)")
+    return ap.parse_args()
+
+
+def _stage_and_build(args: argparse.Namespace, p: Paths, root: Path,
+                     laps: timings.Laps) -> tuple[int, pd.Series, dict[str, pd.DataFrame]]:
+    """In-memory (serial or --workers) staging, curated build and Parquet/CSV writes."""
+    df_raw = extract()
+    laps("extract", rows=len(df_raw))
+    tables = None
+    if args.workers > 1:
+        from v2_mlops_modernisation.etl import parallel  # imports this module
+        df_stage, tables = parallel.stage_and_build(df_raw, load_reference(), args.workers)
+    else:
+        df_stage = transform_stage(df_raw)
+    if not args.no_csv:
+        csv_store.write_table(df_stage, p.staged / "appointments_staged.csv", "appointments_staged",
+                              date_format=STAGED_DATETIME_FORMAT)
+    laps("stage", rows=len(df_stage))
+
+    # Category vocabularies: seeded from the masters, extended (append-only) with staged values
+    vocab_path = p.ref / vocab.VOCAB_FILE
+    vocabulary = vocab.from_reference(*load_reference(), previous=vocab.load(vocab_path))
+    vocab.save(vocab.update(vocabulary, df_stage), vocab_path)
+
+    parquet_store.write_table(df_stage, "staged", "appointments_staged", root)
+    laps("vocab_and_staged_parquet", rows=len(df_stage))
+
+    if tables is None:
+        tables = build_curated(df_stage)
+        laps("build_curated", rows=len(df_stage))
+    for name, df in tables.items():
+        parquet_store.write_table(df, "curated", name, root)
+        if not args.no_csv:
+            csv_store.write_table(df, p.curated / f"{name}.csv", name)
+    laps("write_curated", rows=len(tables["fact_appointments"]))
+    return len(df_stage), df_stage["booking_datetime"], tables
 
 
 def main() -> None:
+    args = _parse_args()
+    if args.chunk_rows and args.workers > 1:
+        raise SystemExit("--chunk-rows and --workers are separate modes; use one of them")
+    laps = timings.Laps("run_etl")
     p = _paths()
     p.staged.mkdir(parents=True, exist_ok=True)
     p.curated.mkdir(parents=True, exist_ok=True)
 
-    df_raw = extract()
-    df_stage = transform_stage(df_raw)
-
-    stage_path = p.staged / "appointments_staged.csv"
-    df_stage.to_csv(stage_path, index=False)
-
-    tables = build_curated(df_stage)
-    for name, df in tables.items():
-        df.to_csv(p.curated / f"{name}.csv", index=False)
+    root = parquet_root(p)
+    if args.chunk_rows:
+        from v2_mlops_modernisation.etl import streaming  # imports this module
+        staged_rows, booking_dt, tables = streaming.stage_and_build(args.chunk_rows, p, not args.no_csv, laps)
+    else:
+        staged_rows, booking_dt, tables = _stage_and_build(args, p, root, laps)
 
-    db_path = load_to_warehouse(tables)
+    state_items = state.load_state_items(booking_dt, [_raw_path()])
+    db_path, load_stats = load_to_warehouse(tables, state_items)
+    laps("warehouse_load", rows=load_stats["fact_appointments"]["rows"])
 
-    print(f"[OK] Staged rows: {len(df_stage):,} -> {stage_path}")
-    print(f"[OK] Curated tables: {len(tables)} -> {p.curated}")
+    print(f"[OK] Staged rows: {staged_rows:,} -> {root/'staged'}")
+    print(f"[OK] Curated tables: {len(tables)} -> {root/'curated'}" + ("" if args.no_csv else f" (+ CSV in {p.curated})"))
     print(f"[OK] Warehouse loaded: {db_path}")
+    fact_load = load_stats["fact_appointments"]
+    print(f"[OK] fact_appointments load: {fact_load['rows']:,} rows in {fact_load['seconds']:.2f}s "
+          f"({fact_load['rows'] / max(fact_load['seconds'], 1e-9):,.0f} rows/s)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+"""
+ETL load state kept inside the SQLite warehouse.
+
+The state is a small key/value table written in the same transaction as the data it
+describes, so the watermark can never run ahead of (or lag behind) the loaded rows:
+- watermark_booking_datetime: latest booking_datetime loaded into fact_appointments
+- raw_file:<name>: size/mtime signature of each RAW file already ingested
+
+Incremental runs also keep unrounded per-key KPI sums in `etl_sums_<kpi>` tables; a
+full reload drops them so they are rebuilt from the freshly loaded fact table.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+
+import pandas as pd
+
+
+STATE_TABLE = "etl_state"
+WATERMARK_KEY = "watermark_booking_datetime"
+RAW_FILE_PREFIX = "raw_file:"
+SUMS_PREFIX = "etl_sums_"
+
+
+def raw_files(raw_dir: Path) -> list[Path]:
+    """RAW appointment files: the main extract plus any shards/daily drops next to it."""
+    return sorted(raw_dir.glob("appointments_raw*.csv"))
+
+
+def file_signature(path: Path) -> str:
+    st = path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def ensure_state_table(conn: sqlite3.Connection) -> None:
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def read_state(conn: sqlite3.Connection) -> dict[str, str]:
+    ensure_state_table(conn)
+    return dict(conn.execute(f"SELECT key, value FROM {STATE_TABLE}").fetchall())
+
+
+def write_state(conn: sqlite3.Connection, items: dict[str, str]) -> None:
+    ensure_state_table(conn)
+    conn.executemany(
+        f"INSERT INTO {STATE_TABLE} (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        list(items.items()),
+    )
+
+
+def replace_state(conn: sqlite3.Connection, items: dict[str, str]) -> None:
+    """Reset the state (full reload) and write items."""
+    ensure_state_table(conn)
+    conn.execute(f"DELETE FROM {STATE_TABLE}")
+    sums = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+                        (SUMS_PREFIX + "%",)).fetchall()
+    for (name,) in sums:
+        conn.execute(f"DROP TABLE {name}")
+    write_state(conn, items)
+
+
+def load_state_items(booking_dt: pd.Series, files: list[Path], previous: str | None = None) -> dict[str, str]:
+    """State entries after loading rows with the given booking datetimes from files."""
+    items = {RAW_FILE_PREFIX + f.name: file_signature(f) for f in files}
+    latest = booking_dt.max() if len(booking_dt) else pd.NaT
+    candidates = [pd.Timestamp(v) for v in (previous, latest) if v is not None and not pd.isna(v)]
+    if candidates:
+        items[WATERMARK_KEY] = max(candidates).strftime("%Y-%m-%d %H:%M:%S")
+    return items
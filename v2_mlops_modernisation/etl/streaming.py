@@ -0,0 +1,131 @@
+"""
+Streaming ETL (V2): RAW -> staged -> curated in memory bounded by the batch size.
+
+`run_etl --chunk-rows N` never holds a whole table:
+1. RAW is read N rows at a time; each batch is staged (run_etl.transform_stage) and
+   spilled to a temporary file. A key map (appointment_id -> batch of its last record)
+   marks the batches whose records a later batch re-books, and the category values
+   are collected on the way (the vocabulary is append-only, so a value seen only in a
+   re-booked record is kept, as an incremental run would).
+2. The batches are read back in RAW order without the re-booked records, written to
+   the staged and fact tables (Parquet and CSV table writers: month partitions, whose
+   rows are date-sorted per batch, and month-ordered CSV, byte-identical to a serial
+   run's) and partially aggregated like a parallel partition (etl/parallel.py),
+   folded into one running partial.
+3. The KPI and dimension tables are merged from that partial; the warehouse load
+   streams the fact back from Parquet.
+
+Memory follows the batch size plus the key map and the per-patient partials. The
+tables equal the serial run's: means are integer sums / counts, and the one float mean
+(kpi_neighbourhood_hotspots.deprivation_index) averages a master attribute, so summing
+it per batch gives the same value at the 3 decimals it is rounded to.
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.etl.run_etl --chunk-rows 500000
+"""
+
+from __future__ import annotations
+
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+import tempfile
+
+import pandas as pd
+
+from v2_mlops_modernisation.etl import parallel, run_etl
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.monitoring import timings
+from v2_mlops_modernisation.storage import csv_store, parquet_store
+
+
+STAGED = "appointments_staged"
+FACT = "fact_appointments"
+
+
+@dataclass
+class StagedBatches:
+    files: list[Path] = field(default_factory=list)       # spilled staged batches, RAW order
+    last: dict[str, int] = field(default_factory=dict)    # appointment_id -> batch of its last record
+    stale: set[int] = field(default_factory=set)          # batches with records re-booked later
+    values: dict[str, set] = field(default_factory=lambda: {c: set() for c in vocab.OPEN_VOCABULARIES})
+
+
+def stage_batches(chunk_rows: int, reference: tuple[pd.DataFrame, pd.DataFrame], spill: Path) -> StagedBatches:
+    """Pass 1: stage and spill each RAW batch, keeping only the key map and small summaries."""
+    out = StagedBatches()
+    for i, chunk in enumerate(run_etl.extract_chunks(chunk_rows)):
+        stage = run_etl.transform_stage(chunk, reference)
+        ids = stage["appointment_id"].tolist()
+        out.stale.update(out.last[k] for k in ids if k in out.last)
+        out.last.update(dict.fromkeys(ids, i))
+        for col, seen in out.values.items():
+            if col in stage.columns:
+                seen.update(pd.unique(stage[col]))
+        out.files.append(spill / f"batch-{i:06d}.pkl")
+        stage.to_pickle(out.files[-1])
+    return out
+
+
+def live_batches(staged: StagedBatches):
+    """Pass 2: the staged batches in RAW order, without records re-booked by a later batch."""
+    for i, path in enumerate(staged.files):
+        stage = pd.read_pickle(path)
+        if i in staged.stale:
+            stage = stage[stage["appointment_id"].map(staged.last) == i]
+        if len(stage):
+            yield stage
+
+
+def stage_and_build(chunk_rows: int, p: run_etl.Paths, write_csv: bool,
+                    laps: timings.Laps) -> tuple[int, pd.Series, dict[str, object]]:
+    """Streaming equivalent of staging, build_curated and the Parquet/CSV writes of run_etl.main.
+
+    Returns the staged row count, the latest booking (for the ETL watermark) and the
+    curated tables, whose fact_appointments entry streams the fact back from Parquet.
+    """
+    root = run_etl.parquet_root(p)
+    reference = run_etl.load_reference()
+    with tempfile.TemporaryDirectory(prefix=".spill-", dir=p.staged) as spill:
+        staged = stage_batches(chunk_rows, reference, Path(spill))
+        laps("stage", rows=len(staged.last))
+
+        # Category vocabularies: seeded from the masters, extended (append-only) with staged values
+        vocab_path = p.ref / vocab.VOCAB_FILE
+        vocabulary = vocab.from_reference(*reference, previous=vocab.load(vocab_path))
+        for col, values in staged.values.items():
+            vocabulary = vocab.update(vocabulary, pd.DataFrame({col: list(values)}))
+        vocab.save(vocabulary, vocab_path)
+
+        rows, partial, deprivation, bookings = 0, None, None, []
+        with ExitStack() as stack:
+            write_staged = [stack.enter_context(parquet_store.table_writer("staged", STAGED, root))]
+            write_fact = [stack.enter_context(parquet_store.table_writer("curated", FACT, root))]
+            if write_csv:
+                write_staged.append(stack.enter_context(csv_store.table_writer(
+                    p.staged / f"{STAGED}.csv", STAGED, date_format=run_etl.STAGED_DATETIME_FORMAT)))
+                write_fact.append(stack.enter_context(csv_store.table_writer(p.curated / f"{FACT}.csv", FACT)))
+            for stage in live_batches(staged):
+                fact = run_etl.build_fact(stage)
+                for write in write_staged:
+                    write(stage)
+                for write in write_fact:
+                    write(fact)
+                batch = parallel.aggregate_partition(stage)
+                partial = batch if partial is None else parallel.combine_partials([partial, batch])
+                sums = fact.groupby("neighbourhood_id")["deprivation_index"].agg(["sum", "count"])
+                deprivation = sums if deprivation is None else deprivation.add(sums, fill_value=0)
+                bookings.append(stage["booking_datetime"].max())
+                rows += len(stage)
+        laps("write_staged_and_fact", rows=rows)
+
+    fact_batches = parquet_store.iter_batches("curated", FACT, batch_rows=chunk_rows, root=root)
+    tables = parallel.merge_partials([partial], deprivation["sum"] / deprivation["count"], fact_batches)
+    for name, df in tables.items():
+        if name == FACT:
+            continue
+        parquet_store.write_table(df, "curated", name, root)
+        if write_csv:
+            csv_store.write_table(df, p.curated / f"{name}.csv", name)
+    laps("build_and_write_curated", rows=rows)
+    return rows, pd.Series(bookings, dtype="datetime64[ns]"), tables
@@ -0,0 +1 @@
+# features package
@@ -0,0 +1,118 @@
+"""
+Shared feature derivations (V2).
+
+One definition of every derived field, used by the ETL (staging), training
+(make_features) and the API, so training and serving features cannot diverge.
+
+Every helper works on a whole column (Series / ndarray) and on a single scalar value:
+- bands are computed with np.searchsorted over fixed bin edges (no row-wise apply)
+- time fields come from vectorized datetime accessors
+- model inputs are coerced to the dtypes the model was trained on
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+# Model feature contract (order matters for the training frame)
+NUMERIC_FEATURES = ["lead_time_days", "prior_no_show_count", "prior_show_count", "age", "appointment_hour", "deprivation_index"]
+FLAG_FEATURES = ["sms_reminder_sent", "appointment_is_weekend"]
+CATEGORICAL_FEATURES = [
+    "gender", "age_band", "appointment_type", "booking_channel",
+    "clinic_id", "neighbourhood_id", "clinic_type", "clinic_region",
+]
+MODEL_FEATURES = [
+    "lead_time_days", "sms_reminder_sent",
+    "prior_no_show_count", "prior_show_count",
+    "age", "gender", "age_band",
+    "appointment_type", "booking_channel",
+    "appointment_hour", "appointment_is_weekend",
+    "deprivation_index",
+    "clinic_id", "neighbourhood_id", "clinic_type", "clinic_region",
+]
+
+# age < 0 -> Unknown, [0,18) -> 0-17, ..., >= 75 -> 75+
+AGE_BAND_EDGES = np.array([0, 18, 30, 45, 60, 75])
+AGE_BAND_LABELS = np.array(["Unknown", "0-17", "18-29", "30-44", "45-59", "60-74", "75+"], dtype=object)
+
+# days <= 0 -> 0, (0,2] -> 1-2, ..., > 30 -> 31+
+LEAD_BAND_EDGES = np.array([0, 2, 7, 14, 30])
+LEAD_BAND_LABELS = np.array(["0", "1-2", "3-7", "8-14", "15-30", "31+"], dtype=object)
+
+# p < 0.35 -> Low, [0.35,0.55) -> Medium, [0.55,0.75) -> High, >= 0.75 -> Critical
+RISK_BAND_EDGES = np.array([0.35, 0.55, 0.75])
+RISK_BAND_LABELS = np.array(["Low", "Medium", "High", "Critical"], dtype=object)
+
+
+def _bin(values, edges: np.ndarray, labels: np.ndarray, side: str):
+    arr = np.asarray(values, dtype=float)
+    out = labels[np.searchsorted(edges, arr, side=side)]
+    if arr.ndim == 0:
+        return str(out)
+    if isinstance(values, pd.Series):
+        return pd.Series(out, index=values.index, name=values.name)
+    return out
+
+
+def age_band(age):
+    """Age band for a scalar age or a column of ages."""
+    return _bin(age, AGE_BAND_EDGES, AGE_BAND_LABELS, side="right")
+
+
+def lead_time_band(days):
+    """Lead-time band for a scalar day count or a column of day counts."""
+    return _bin(days, LEAD_BAND_EDGES, LEAD_BAND_LABELS, side="left")
+
+
+def risk_band(proba):
+    """Risk band for a scalar predicted probability or a column of probabilities."""
+    return _bin(proba, RISK_BAND_EDGES, RISK_BAND_LABELS, side="right")
+
+
+def lead_time_days(appointment_dt: pd.Series, booking_dt: pd.Series) -> pd.Series:
+    """Calendar days between booking and appointment (dates, not 24h periods)."""
+    return (appointment_dt.dt.normalize() - booking_dt.dt.normalize()).dt.days.astype(int)
+
+
+def time_fields(appointment_dt) -> dict[str, Any]:
+    """Date key, weekday name, hour and weekend flag for a datetime column or a single datetime."""
+    if not isinstance(appointment_dt, pd.Series):
+        ts = pd.Timestamp(appointment_dt)
+        return {
+            "appointment_date": ts.date().isoformat(),
+            "appointment_dow": ts.day_name(),
+            "appointment_hour": int(ts.hour),
+            "appointment_is_weekend": int(ts.weekday() >= 5),
+        }
+    return {
+        "appointment_date": pd.Series(appointment_dt.values.astype("datetime64[D]").astype(str),
+                                      index=appointment_dt.index),
+        "appointment_dow": appointment_dt.dt.day_name(),
+        "appointment_hour": appointment_dt.dt.hour,
+        "appointment_is_weekend": (appointment_dt.dt.weekday >= 5).astype(int),
+    }
+
+
+def coerce_model_inputs(X: pd.DataFrame) -> pd.DataFrame:
+    """Cast model inputs in place: numerics to numbers (NaN -> 0), flags to 0/1 ints."""
+    for c in NUMERIC_FEATURES:
+        X[c] = pd.to_numeric(X[c], errors="coerce").fillna(0)
+    for c in FLAG_FEATURES:
+        X[c] = pd.to_numeric(X[c], errors="coerce").fillna(0).astype(int)
+    return X
+
+
+def model_frame(records) -> pd.DataFrame:
+    """Model input frame from a DataFrame or a list of request records.
+
+    age_band is always re-derived from age, so callers cannot send a band that
+    disagrees with the age the model sees.
+    """
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+    X = coerce_model_inputs(df.reindex(columns=MODEL_FEATURES).copy())
+    X["age_band"] = age_band(X["age"])
+    return X
@@ -0,0 +1,146 @@
+"""
+Category vocabularies and compact dtypes (V2).
+
+Low-cardinality string columns are stored and loaded as pandas Categorical with
+stable codes, and counts/flags as small integers:
+- fixed vocabularies come from the feature contract (bands, weekdays, risk bands)
+- open vocabularies start from the reference masters and are extended by the ETL;
+  new values are only ever appended, so an existing value keeps its code
+- the vocabularies are persisted next to the masters (data/reference/
+  category_vocabularies.json) and applied by every Parquet reader and writer
+
+The code of a value is its position in the vocabulary, which is also its one-hot
+column in the model encoder (ml/train.py builds the encoder from these categories).
+Values missing from a vocabulary are appended (sorted) when encoding, so encoding
+never turns data into NaN.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import json
+
+import numpy as np
+import pandas as pd
+
+from v2_mlops_modernisation.features.derivations import AGE_BAND_LABELS, LEAD_BAND_LABELS, RISK_BAND_LABELS
+
+
+VOCAB_FILE = "category_vocabularies.json"
+
+FIXED_VOCABULARIES = {
+    "age_band": list(AGE_BAND_LABELS),
+    "lead_time_band": list(LEAD_BAND_LABELS),
+    "appointment_dow": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
+    "risk_band": list(RISK_BAND_LABELS),
+}
+
+# column -> (reference master, master column) it is seeded from; None = ETL-observed only
+OPEN_VOCABULARIES = {
+    "clinic_id": ("clinic", "clinic_id"),
+    "clinic_type": ("clinic", "clinic_type"),
+    "clinic_region": ("clinic", "region"),
+    "neighbourhood_id": ("neighbourhood", "neighbourhood_id"),
+    "region": ("neighbourhood", "region"),
+    "gender": None,
+    "appointment_type": None,
+    "booking_channel": None,
+}
+
+CATEGORY_COLUMNS = list(FIXED_VOCABULARIES) + list(OPEN_VOCABULARIES)
+
+INT_DTYPES = {
+    "sms_reminder_sent": "int8",
+    "appointment_is_weekend": "int8",
+    "disability_flag": "int8",
+    "no_show_label": "int8",
+    "appointment_hour": "int8",
+    "chronic_conditions_count": "int16",
+    "prior_no_show_count": "int16",
+    "prior_show_count": "int16",
+    "age": "int16",
+    "daily_capacity": "int32",
+    "lead_time_days": "int32",
+}
+
+
+def default_path() -> Path:
+    return Path(__file__).resolve().parents[1] / "data" / "reference" / VOCAB_FILE
+
+
+def _extend(values: list[str], observed) -> list[str]:
+    known = set(values)
+    new = sorted({str(v) for v in observed if not pd.isna(v)} - known)
+    return values + new
+
+
+def from_reference(neigh: pd.DataFrame, clinic: pd.DataFrame,
+                   previous: dict[str, list[str]] | None = None) -> dict[str, list[str]]:
+    """Vocabularies seeded from the masters, keeping the codes of a previous version."""
+    masters = {"neighbourhood": neigh, "clinic": clinic}
+    vocab = {col: list(values) for col, values in FIXED_VOCABULARIES.items()}
+    for col, source in OPEN_VOCABULARIES.items():
+        values = list((previous or {}).get(col, []))
+        if source is not None:
+            master, master_col = source
+            values = _extend(values, masters[master][master_col])
+        vocab[col] = values
+    return vocab
+
+
+def update(vocab: dict[str, list[str]], df: pd.DataFrame) -> dict[str, list[str]]:
+    """Append values of df not yet in the open vocabularies."""
+    out = {col: list(values) for col, values in vocab.items()}
+    for col in OPEN_VOCABULARIES:
+        if col in df.columns:
+            out[col] = _extend(out.get(col, []), pd.unique(df[col]))
+    return out
+
+
+def load(path: Path | None = None) -> dict[str, list[str]]:
+    """Persisted vocabularies, or the fixed ones only when none were written yet."""
+    path = Path(path or default_path())
+    vocab = {col: list(values) for col, values in FIXED_VOCABULARIES.items()}
+    if path.exists():
+        vocab.update(json.loads(path.read_text(encoding="utf-8")))
+    return vocab
+
+
+def save(vocab: dict[str, list[str]], path: Path | None = None) -> Path:
+    path = Path(path or default_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(vocab, indent=2) + "\n", encoding="utf-8")
+    return path
+
+
+def categories(vocab: dict[str, list[str]], col: str, values=None) -> list[str]:
+    """Vocabulary of col, extended with any unseen values (appended, sorted)."""
+    known = list(vocab.get(col, []))
+    return _extend(known, pd.unique(values)) if values is not None else known
+
+
+def encode(df: pd.DataFrame, vocab: dict[str, list[str]]) -> pd.DataFrame:
+    """Copy of df with vocabulary columns as Categorical and counts/flags as small ints."""
+    out = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col not in out.columns:
+            continue
+        s = out[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # recode by value (e.g. Parquet dictionaries differ between files)
+            out[col] = s.cat.set_categories(categories(vocab, col, s.cat.categories))
+            continue
+        if not pd.api.types.is_string_dtype(s):
+            s = s.where(s.isna(), s.astype(str))
+        out[col] = pd.Categorical(s, categories=categories(vocab, col, s))
+    for col, dtype in INT_DTYPES.items():
+        if col not in out.columns or not pd.api.types.is_numeric_dtype(out[col]) or out[col].isna().any():
+            continue
+        info = np.iinfo(dtype)
+        values = out[col]
+        if len(values) and (values.min() < info.min or values.max() > info.max):
+            continue
+        if pd.api.types.is_float_dtype(values) and not (values % 1 == 0).all():
+            continue
+        out[col] = values.astype(dtype)
+    return out
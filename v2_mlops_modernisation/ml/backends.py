@@ -0,0 +1,100 @@
+"""
+Estimator backends for training (V2).
+
+A backend pairs a classifier with the categorical encoding it consumes:
+- logreg: LogisticRegression(saga) on one-hot columns (the original V2 model)
+- hgb:    HistGradientBoostingClassifier on ordinal-encoded categoricals, which it
+          splits natively (no one-hot width), with early stopping on a validation
+          fraction of the training rows
+
+The ordinal code of a category is its position in the vocabulary (features/vocab.py),
+the same code Parquet readers return. Histogram categoricals must have fewer than
+max_bins (255) categories; a wider vocabulary column is treated as an ordered code.
+
+Select with python -m v2_mlops_modernisation.ml.train --backend hgb
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.inspection import permutation_importance
+from sklearn.linear_model import LogisticRegression
+
+from v2_mlops_modernisation.features.derivations import NUMERIC_FEATURES, FLAG_FEATURES, CATEGORICAL_FEATURES
+
+
+HGB_MAX_BINS = 255
+IMPORTANCE_ROWS = 5000
+
+
+@dataclass(frozen=True)
+class Backend:
+    name: str
+    encoding: str                  # "onehot" | "ordinal" (ml/feature_cache.py)
+    model_label: str               # model_metrics.json "model"
+    registry_label: str            # model_registry.csv "model"
+    make_estimator: Callable[[list[list[str]], int], object]
+    feature_effects: Callable[..., pd.DataFrame]
+
+
+def _logreg(categories: list[list[str]], random_state: int) -> LogisticRegression:
+    return LogisticRegression(
+        max_iter=800,
+        solver="saga",
+        n_jobs=-1,
+        random_state=random_state
+    )
+
+
+def _hgb(categories: list[list[str]], random_state: int) -> HistGradientBoostingClassifier:
+    offset = len(NUMERIC_FEATURES) + len(FLAG_FEATURES)
+    native = [offset + i for i, cats in enumerate(categories) if len(cats) < HGB_MAX_BINS]
+    return HistGradientBoostingClassifier(
+        learning_rate=0.1,
+        max_iter=500,
+        max_leaf_nodes=31,
+        min_samples_leaf=40,
+        l2_regularization=1.0,
+        categorical_features=native or None,
+        early_stopping=True,
+        validation_fraction=0.1,
+        n_iter_no_change=20,
+        scoring="loss",
+        random_state=random_state,
+    )
+
+
+def _coef_effects(pipe, X_test, y_test) -> pd.DataFrame:
+    # Coefficients per design-matrix column (numeric + flags + one-hot columns)
+    ohe = pipe.named_steps["pre"].named_transformers_["cat"]
+    names = list(NUMERIC_FEATURES) + list(FLAG_FEATURES) + list(ohe.get_feature_names_out(CATEGORICAL_FEATURES))
+    return pd.DataFrame({"feature": names, "coef": pipe.named_steps["clf"].coef_[0]})
+
+
+def _permutation_effects(pipe, X_test, y_test, random_state: int = 0) -> pd.DataFrame:
+    # Mean ROC AUC drop when one input column is shuffled, on a test subsample
+    rng = np.random.default_rng(random_state)
+    rows = rng.choice(X_test.shape[0], size=min(IMPORTANCE_ROWS, X_test.shape[0]), replace=False)
+    result = permutation_importance(pipe.named_steps["clf"], X_test[np.sort(rows)], np.asarray(y_test)[np.sort(rows)],
+                                    scoring="roc_auc", n_repeats=3, random_state=random_state)
+    names = list(NUMERIC_FEATURES) + list(FLAG_FEATURES) + list(CATEGORICAL_FEATURES)
+    return pd.DataFrame({"feature": names, "permutation_importance": result.importances_mean})
+
+
+BACKENDS = {
+    "logreg": Backend("logreg", "onehot", "LogisticRegression(saga) + OneHotEncoder",
+                      "LogisticRegression(saga)+OHE", _logreg, _coef_effects),
+    "hgb": Backend("hgb", "ordinal", "HistGradientBoostingClassifier + OrdinalEncoder (native categoricals)",
+                   "HistGradientBoosting+ordinal", _hgb, _permutation_effects),
+}
+
+
+def get(name: str) -> Backend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; choose one of {sorted(BACKENDS)}")
+    return BACKENDS[name]
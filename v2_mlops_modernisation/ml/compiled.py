@@ -0,0 +1,293 @@
+"""
+Compiled scoring artifact (V2): a linear model as plain arrays + lookup tables.
+
+best_model.joblib is a pickled sklearn Pipeline; loading it unpickles the whole
+ColumnTransformer / estimator graph and scoring goes through pandas. For linear
+pipelines (logreg backend, online SGD model) training also exports compiled/ next to
+model.joblib in the content-addressed artifact directory (ml/registry.py):
+- manifest.json: numeric column order and design-matrix positions (flags truncated to
+  ints), one lookup table per categorical (value -> one-hot index, in vocabulary order),
+  intercept, age-band and risk-band edges/labels
+- coef.npy: the coefficient vector in design-matrix order, loaded with mmap
+
+A StandardScaler on the numerics is folded into the coefficients and intercept, so the
+scorer is a dot product over the numerics plus one coefficient lookup per categorical
+(unknown categories contribute nothing, like OneHotEncoder(handle_unknown="ignore")).
+CompiledModel loads in milliseconds and scores column arrays or records with NumPy only;
+predict_one scores a single record in pure Python (one dict lookup per categorical
+straight to its coefficient, a short dot product over the numerics, math.exp) for the
+API's single-row path. Non-linear pipelines (hgb) are not exported and keep using the
+joblib artifact.
+
+Usage:
+  model = compiled.load(compiled.default_path())
+  proba = model.predict_proba({"lead_time_days": [3, 10], ..., "clinic_id": ["C01", "C07"]})
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Sequence
+import bisect
+import json
+import math
+import os
+import shutil
+import uuid
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+
+from v2_mlops_modernisation.features.derivations import (
+    AGE_BAND_EDGES, AGE_BAND_LABELS, FLAG_FEATURES, RISK_BAND_EDGES, RISK_BAND_LABELS,
+)
+from v2_mlops_modernisation.ml import registry
+
+
+FORMAT_VERSION = 1
+
+
+def default_path() -> Path:
+    """Compiled artifact of the registry champion (ml/registry.py)."""
+    champion = registry.resolve(registry.CHAMPION)
+    if champion is None or champion["artifact_dir"] is None:
+        raise FileNotFoundError("No champion model in the registry. Run training first.")
+    return Path(champion["artifact_dir"]) / registry.COMPILED_DIR
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _passthrough(transformer) -> bool:
+    # fitted ColumnTransformers store "passthrough" as an identity FunctionTransformer
+    return transformer == "passthrough" or (isinstance(transformer, FunctionTransformer) and transformer.func is None)
+
+
+def _blocks(pre: ColumnTransformer):
+    return [(name, t, cols) for name, t, cols in pre.transformers_ if not (isinstance(t, str) and t == "drop")]
+
+
+def supports(pipe) -> bool:
+    """Pipelines of passthrough / StandardScaler numerics + OneHotEncoder and a log-loss linear model."""
+    steps = getattr(pipe, "named_steps", {})
+    pre, clf = steps.get("pre"), steps.get("clf")
+    if not isinstance(pre, ColumnTransformer):
+        return False
+    if not (isinstance(clf, LogisticRegression) or (isinstance(clf, SGDClassifier) and clf.loss == "log_loss")):
+        return False
+    if getattr(clf, "coef_", None) is None or clf.coef_.shape[0] != 1:
+        return False
+    return all(_passthrough(t) or isinstance(t, (StandardScaler, OneHotEncoder)) for _, t, _ in _blocks(pre))
+
+
+def compile_pipeline(pipe) -> tuple[dict, np.ndarray]:
+    """Manifest + coefficient vector equivalent to pipe.predict_proba."""
+    if not supports(pipe):
+        raise ValueError("Only linear pipelines (StandardScaler/passthrough + OneHotEncoder + "
+                         "log-loss linear model) can be compiled")
+    pre, clf = pipe.named_steps["pre"], pipe.named_steps["clf"]
+    coef = np.asarray(clf.coef_[0], dtype=np.float64).copy()
+    intercept = float(clf.intercept_[0])
+
+    numeric: list[str] = []
+    numeric_index: list[int] = []
+    categorical: list[dict] = []
+    pos = 0
+    for _, transformer, cols in _blocks(pre):
+        if isinstance(transformer, OneHotEncoder):
+            for col, cats in zip(cols, transformer.categories_):
+                categorical.append({"name": col, "offset": pos,
+                                    "lookup": {str(v): i for i, v in enumerate(cats)}})
+                pos += len(cats)
+            continue
+        block = slice(pos, pos + len(cols))
+        if isinstance(transformer, StandardScaler):
+            # coef * (x - mean) / scale = (coef / scale) * x - coef * mean / scale
+            mean = transformer.mean_ if transformer.with_mean else np.zeros(len(cols))
+            scale = transformer.scale_ if transformer.with_std else np.ones(len(cols))
+            coef[block] = coef[block] / scale
+            intercept -= float(np.dot(coef[block], mean))
+        numeric.extend(cols)
+        numeric_index.extend(range(pos, pos + len(cols)))
+        pos += len(cols)
+    if pos != len(coef):
+        raise ValueError(f"Design matrix width {pos} does not match {len(coef)} coefficients")
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "model": type(clf).__name__,
+        "numeric": numeric,
+        "numeric_index": numeric_index,
+        "flags": [c for c in numeric if c in FLAG_FEATURES],
+        "categorical": categorical,
+        "intercept": intercept,
+        "n_coef": int(len(coef)),
+        "age_band_edges": AGE_BAND_EDGES.tolist(),
+        "age_band_labels": AGE_BAND_LABELS.tolist(),
+        "risk_band_edges": RISK_BAND_EDGES.tolist(),
+        "risk_band_labels": RISK_BAND_LABELS.tolist(),
+    }
+    return manifest, coef
+
+
+def export(pipe, path: Path | None = None) -> Path:
+    """Write the compiled artifact to a scratch directory and swap it into place."""
+    manifest, coef = compile_pipeline(pipe)
+    path = Path(path or default_path())
+    tmp = path.parent / f".tmp-{path.name}-{uuid.uuid4().hex}"
+    tmp.mkdir(parents=True)
+    np.save(tmp / "coef.npy", coef)
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    remove(path)
+    os.replace(tmp, path)
+    return path
+
+
+def remove(path: Path | None = None) -> None:
+    """Drop a compiled artifact (e.g. when the new model cannot be compiled)."""
+    path = Path(path or default_path())
+    if path.exists():
+        old = path.parent / f".old-{path.name}-{uuid.uuid4().hex}"
+        os.replace(path, old)
+        shutil.rmtree(old, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+
+def _as_float(values) -> np.ndarray:
+    """Numbers as float64; missing or non-numeric values -> 0 (same as coerce_model_inputs)."""
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        arr = np.array([_to_float(v) for v in values], dtype=np.float64)
+    return np.nan_to_num(arr, nan=0.0)
+
+
+def _to_float(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _scalar(v) -> float:
+    x = _to_float(v)
+    return 0.0 if x != x else x
+
+
+@dataclass
+class CompiledModel:
+    numeric: list[str]
+    numeric_index: np.ndarray
+    flags: set[str]
+    categorical: list[dict]
+    coef: np.ndarray
+    intercept: float
+    age_band_edges: np.ndarray
+    age_band_labels: np.ndarray
+    risk_band_edges: np.ndarray
+    risk_band_labels: np.ndarray
+    path: Path | None = None
+
+    def __post_init__(self):
+        # plain-Python copies for predict_one: (feature, coefficient, is_flag) and value -> coefficient
+        coef = np.asarray(self.coef, dtype=np.float64)
+        self._numeric_terms = [(c, float(coef[i]), c in self.flags) for c, i in zip(self.numeric, self.numeric_index)]
+        self._category_terms = [(cat["name"], {v: float(coef[cat["offset"] + i]) for v, i in cat["lookup"].items()})
+                                for cat in self.categorical]
+        self._age_edges = [float(e) for e in self.age_band_edges]
+        self._age_labels = list(self.age_band_labels)
+
+    def predict_one(self, record: Mapping) -> float:
+        """Predicted no-show probability for one record, without NumPy or pandas."""
+        z = self.intercept
+        for name, w, is_flag in self._numeric_terms:
+            x = _scalar(record.get(name))
+            z += w * (math.trunc(x) if is_flag else x)
+        for name, weights in self._category_terms:
+            if name == "age_band":
+                value = self._age_labels[bisect.bisect_right(self._age_edges, _scalar(record.get("age")))]
+            else:
+                value = record.get(name)
+            z += weights.get(value, 0.0)
+        # numerically stable sigmoid
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def _columns(self, data) -> Mapping[str, Sequence]:
+        if isinstance(data, Mapping):
+            return data
+        records = list(data)
+        names = self.numeric + [c["name"] for c in self.categorical]
+        return {c: [r.get(c) for r in records] for c in names}
+
+    def decision_function(self, data) -> np.ndarray:
+        """Logits for column arrays ({feature: values}) or a list of records."""
+        cols = self._columns(data)
+        n = len(next(iter(cols.values())))
+        X = np.empty((n, len(self.numeric)), dtype=np.float64)
+        for j, c in enumerate(self.numeric):
+            X[:, j] = _as_float(cols[c]) if c in cols else 0.0
+            if c in self.flags:
+                X[:, j] = np.trunc(X[:, j])
+        z = X @ self.coef[self.numeric_index] + self.intercept
+
+        for cat in self.categorical:
+            if cat["name"] == "age_band":
+                # always re-derived from age, as in model_frame
+                ages = _as_float(cols["age"]) if "age" in cols else np.zeros(n)
+                values = self.age_band_labels[np.searchsorted(self.age_band_edges, ages, side="right")]
+            else:
+                values = cols.get(cat["name"], [None] * n)
+            lookup = cat["lookup"]
+            idx = np.fromiter((lookup.get(v, -1) for v in values), dtype=np.int64, count=n)
+            known = idx >= 0
+            z[known] += self.coef[cat["offset"] + idx[known]]
+        return z
+
+    def predict_proba(self, data) -> np.ndarray:
+        """Predicted no-show probability per row (1-D)."""
+        return 1.0 / (1.0 + np.exp(-self.decision_function(data)))
+
+    def risk_band(self, proba) -> np.ndarray:
+        return self.risk_band_labels[np.searchsorted(self.risk_band_edges, np.asarray(proba, dtype=float), side="right")]
+
+
+def load(path: Path | None = None) -> CompiledModel:
+    """Load a compiled artifact; the coefficient vector is memory-mapped."""
+    path = Path(path or default_path())
+    manifest = json.loads((path / "manifest.json").read_text(encoding="utf-8"))
+    return from_manifest(manifest, np.load(path / "coef.npy", mmap_mode="r"), path)
+
+
+def from_pipeline(pipe) -> CompiledModel | None:
+    """In-memory CompiledModel for a linear pipeline, None for anything else."""
+    if not supports(pipe):
+        return None
+    return from_manifest(*compile_pipeline(pipe))
+
+
+def from_manifest(manifest: dict, coef: np.ndarray, path: Path | None = None) -> CompiledModel:
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled artifact version {manifest['format_version']} at {path}")
+    return CompiledModel(
+        numeric=manifest["numeric"],
+        numeric_index=np.asarray(manifest["numeric_index"], dtype=np.int64),
+        flags=set(manifest["flags"]),
+        categorical=manifest["categorical"],
+        coef=coef,
+        intercept=float(manifest["intercept"]),
+        age_band_edges=np.asarray(manifest["age_band_edges"], dtype=float),
+        age_band_labels=np.asarray(manifest["age_band_labels"], dtype=object),
+        risk_band_edges=np.asarray(manifest["risk_band_edges"], dtype=float),
+        risk_band_labels=np.asarray(manifest["risk_band_labels"], dtype=object),
+        path=path,
+    )
@@ -0,0 +1,213 @@
+"""
+Content-addressed feature-matrix cache for training (V2).
+
+make_features + the categorical encoding are deterministic given the model input
+columns, the split date, the encoding and the encoder categories, so their output is
+cached under a key derived from exactly those:
+- the feature contract (features/derivations.py) and the split date
+- the encoding of the training backend (ml/backends.py): one-hot or ordinal
+- the encoder categories (features/vocab.py, in vocabulary order)
+- a content hash of the input columns (hash_pandas_object), so re-writing the fact
+  with new prediction columns or re-running the ETL on the same data keeps the key
+
+An entry holds the train/test design matrices (one-hot: uncompressed CSR .npz; ordinal:
+dense .npy, memory-mapped on load), the labels (.npy, memory-mapped on load), the
+fitted preprocessor and a manifest with the feature names and categories. A retrain
+with new hyperparameters reuses the entry and only fits the classifier.
+
+Entries live in v2_mlops_modernisation/data/feature_cache/<key>/; the most recently
+used MAX_ENTRIES are kept.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+from joblib import dump, load
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.features.derivations import (
+    NUMERIC_FEATURES, FLAG_FEATURES, CATEGORICAL_FEATURES, MODEL_FEATURES, model_frame,
+)
+
+
+CACHE_VERSION = 1
+MAX_ENTRIES = 4
+ENCODINGS = ("onehot", "ordinal")
+
+LABEL = "no_show_label"
+SPLIT_COLUMN = "date_key"
+INPUT_COLUMNS = MODEL_FEATURES + [LABEL, SPLIT_COLUMN]
+
+
+@dataclass
+class FeatureMatrices:
+    key: str
+    X_train: sparse.csr_matrix | np.ndarray
+    X_test: sparse.csr_matrix | np.ndarray
+    y_train: np.ndarray
+    y_test: np.ndarray
+    preprocessor: ColumnTransformer
+    feature_names: list[str]
+    hit: bool = False
+
+
+def default_root() -> Path:
+    return Path(__file__).resolve().parents[1] / "data" / "feature_cache"
+
+
+def encoder_categories(vocabulary: dict[str, list[str]], df: pd.DataFrame) -> list[list[str]]:
+    """One-hot categories per categorical feature, in vocabulary (code) order."""
+    return [vocab.categories(vocabulary, c, df[c]) for c in CATEGORICAL_FEATURES]
+
+
+def make_preprocessor(categories: list[list[str]], encoding: str = "onehot") -> ColumnTransformer:
+    if encoding == "onehot":
+        # One-hot columns in vocabulary order: category code k of a feature is its k-th column
+        encoder = OneHotEncoder(categories=categories, handle_unknown="ignore")
+    elif encoding == "ordinal":
+        # Ordinal value = vocabulary code; unseen categories become missing (NaN)
+        encoder = OrdinalEncoder(categories=categories, handle_unknown="use_encoded_value", unknown_value=np.nan)
+    else:
+        raise ValueError(f"Unknown encoding {encoding!r}; choose one of {ENCODINGS}")
+    return ColumnTransformer(
+        transformers=[
+            ("num", "passthrough", list(NUMERIC_FEATURES) + list(FLAG_FEATURES)),
+            ("cat", encoder, list(CATEGORICAL_FEATURES)),
+        ],
+        remainder="drop"
+    )
+
+
+def feature_spec(split_date: str, categories: list[list[str]], encoding: str = "onehot") -> dict:
+    return {
+        "version": CACHE_VERSION,
+        "encoding": encoding,
+        "numeric": list(NUMERIC_FEATURES),
+        "flags": list(FLAG_FEATURES),
+        "categorical": list(CATEGORICAL_FEATURES),
+        "model_features": list(MODEL_FEATURES),
+        "split_date": str(split_date),
+        "categories": [list(map(str, c)) for c in categories],
+    }
+
+
+def cache_key(df: pd.DataFrame, spec: dict) -> str:
+    h = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8"))
+    inputs = df[INPUT_COLUMNS]
+    h.update(",".join(f"{c}:{inputs[c].dtype}" for c in INPUT_COLUMNS).encode("utf-8"))
+    h.update(str(len(inputs)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(inputs, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:32]
+
+
+def split_mask(df: pd.DataFrame, split_date: str) -> np.ndarray:
+    """True for training rows (date_key before the split date)."""
+    return (pd.to_datetime(df[SPLIT_COLUMN]) < pd.to_datetime(split_date)).to_numpy()
+
+
+def _design(Z, encoding: str):
+    return sparse.csr_matrix(Z) if encoding == "onehot" else np.ascontiguousarray(Z, dtype=np.float64)
+
+
+def build(df: pd.DataFrame, split_date: str, categories: list[list[str]], key: str = "",
+          encoding: str = "onehot") -> FeatureMatrices:
+    """Fit the preprocessor on the training rows and transform both splits."""
+    train = split_mask(df, split_date)
+    X_train, X_test = model_frame(df[train]), model_frame(df[~train])
+    pre = make_preprocessor(categories, encoding)
+    Z_train = _design(pre.fit_transform(X_train), encoding)
+    Z_test = _design(pre.transform(X_test), encoding)
+    return FeatureMatrices(
+        key=key,
+        X_train=Z_train,
+        X_test=Z_test,
+        y_train=df.loc[train, LABEL].astype(int).to_numpy(),
+        y_test=df.loc[~train, LABEL].astype(int).to_numpy(),
+        preprocessor=pre,
+        feature_names=list(pre.get_feature_names_out()),
+    )
+
+
+def save(fm: FeatureMatrices, spec: dict, root: Path | None = None) -> Path:
+    """Write an entry to a scratch directory and rename it into place (readers never see a partial entry)."""
+    root = Path(root or default_root())
+    path = root / fm.key
+    tmp = root / f".tmp-{fm.key}-{uuid.uuid4().hex}"
+    tmp.mkdir(parents=True)
+    for name, X in (("X_train", fm.X_train), ("X_test", fm.X_test)):
+        if sparse.issparse(X):
+            sparse.save_npz(tmp / f"{name}.npz", X, compressed=False)
+        else:
+            np.save(tmp / f"{name}.npy", X)
+    np.save(tmp / "y_train.npy", fm.y_train)
+    np.save(tmp / "y_test.npy", fm.y_test)
+    dump(fm.preprocessor, tmp / "preprocessor.joblib")
+    manifest = {"key": fm.key, "spec": spec, "feature_names": fm.feature_names,
+                "n_train": int(fm.X_train.shape[0]), "n_test": int(fm.X_test.shape[0])}
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # another run stored the same key first; its content is identical
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def _load_matrix(path: Path, name: str):
+    if (path / f"{name}.npz").exists():
+        return sparse.load_npz(path / f"{name}.npz").tocsr()
+    return np.load(path / f"{name}.npy", mmap_mode="r")
+
+
+def load_entry(key: str, root: Path | None = None) -> FeatureMatrices | None:
+    path = Path(root or default_root()) / key
+    if not (path / "manifest.json").exists():
+        return None
+    manifest = json.loads((path / "manifest.json").read_text(encoding="utf-8"))
+    os.utime(path)  # most recently used
+    return FeatureMatrices(
+        key=key,
+        X_train=_load_matrix(path, "X_train"),
+        X_test=_load_matrix(path, "X_test"),
+        y_train=np.load(path / "y_train.npy", mmap_mode="r"),
+        y_test=np.load(path / "y_test.npy", mmap_mode="r"),
+        preprocessor=load(path / "preprocessor.joblib"),
+        feature_names=manifest["feature_names"],
+        hit=True,
+    )
+
+
+def prune(root: Path | None = None, keep: int = MAX_ENTRIES) -> None:
+    root = Path(root or default_root())
+    if not root.exists():
+        return
+    entries = sorted((p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")),
+                     key=lambda p: p.stat().st_mtime, reverse=True)
+    for p in entries[keep:]:
+        shutil.rmtree(p, ignore_errors=True)
+
+
+def get_or_build(df: pd.DataFrame, split_date: str, vocabulary: dict[str, list[str]],
+                 root: Path | None = None, encoding: str = "onehot", keep: int = MAX_ENTRIES) -> FeatureMatrices:
+    """Cached train/test design matrices for df, built and stored on a miss (keeping `keep` entries)."""
+    categories = encoder_categories(vocabulary, df)
+    spec = feature_spec(split_date, categories, encoding)
+    key = cache_key(df, spec)
+    fm = load_entry(key, root)
+    if fm is None:
+        fm = build(df, split_date, categories, key, encoding)
+        save(fm, spec, root)
+        prune(root, keep)
+    return fm
@@ -0,0 +1,223 @@
+"""
+Report figure rendering stage (shared by V1 and V2).
+
+Producers (training, EDA) do not plot. They write each figure's small input data (curve
+points, bar values, a confusion matrix) as a JSON spec in <out_dir>/figure_data/; this
+stage renders the specs to <out_dir>/<name>.png on a process pool (Agg backend, one
+figure per task). The sha256 of each spec is recorded in figure_data/_rendered.json
+and a figure whose spec hash is unchanged (and whose PNG exists) is skipped, so a
+rerun only renders the charts whose data changed.
+
+Spec kinds:
+- line:   series of {x, y, label, linestyle, x_type}; x_type "datetime" x values are ISO
+          strings drawn on a date axis, "category" x values are drawn as labels
+- bar:    categories x / values y (horizontal=True for barh)
+- matrix: a small matrix drawn with its cell values (confusion matrix)
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.ml.figures v2_mlops_modernisation/reports --workers 4
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+
+SPEC_DIR = "figure_data"
+MANIFEST = "_rendered.json"
+MAX_POINTS = 1000
+# bump when the renderers change so every figure is drawn again
+RENDER_VERSION = 2
+
+
+def x_type(x) -> str:
+    """"number", "datetime" (datetimes or date strings) or "category"."""
+    x = pd.Series(x)
+    if pd.api.types.is_bool_dtype(x) or not (pd.api.types.is_numeric_dtype(x)
+                                             or pd.api.types.is_datetime64_any_dtype(x)):
+        if x.dtype == object and len(x) and pd.to_datetime(x, errors="coerce").notna().all():
+            return "datetime"
+        return "category"
+    return "datetime" if pd.api.types.is_datetime64_any_dtype(x) else "number"
+
+
+def thin(x, y, max_points: int = MAX_POINTS) -> tuple[list, list[float]]:
+    """At most max_points evenly spaced points of a curve (endpoints kept), JSON-ready.
+
+    Points are picked by position, so x keeps its values: numbers are rounded, dates
+    become ISO strings and anything else is kept as labels.
+    """
+    x, y = pd.Series(x).reset_index(drop=True), np.asarray(y, dtype=float)
+    idx = np.arange(len(x))
+    if len(x) > max_points:
+        idx = np.unique(np.linspace(0, len(x) - 1, max_points).round().astype(int))
+    kind = x_type(x)
+    if kind == "number":
+        xs = np.round(x.to_numpy(dtype=float)[idx], 6).tolist()
+    elif kind == "datetime":
+        xs = [ts.isoformat() for ts in pd.to_datetime(x.iloc[idx])]
+    else:
+        xs = x.iloc[idx].astype(str).tolist()
+    return xs, np.round(y[idx], 6).tolist()
+
+
+def series(x, y, label: str | None = None, linestyle: str = "-", max_points: int = MAX_POINTS) -> dict:
+    """One thinned line series with the x_type the renderer needs."""
+    xs, ys = thin(x, y, max_points)
+    return {"x": xs, "y": ys, "label": label, "linestyle": linestyle, "x_type": x_type(x)}
+
+
+def line(name: str, series: list[dict], title: str, xlabel: str, ylabel: str,
+         figsize=(6, 5), dpi: int = 140, legend: bool = True, grid: bool = False) -> dict:
+    return {"name": name, "kind": "line", "series": series, "title": title, "xlabel": xlabel, "ylabel": ylabel,
+            "figsize": list(figsize), "dpi": dpi, "legend": legend, "grid": grid}
+
+
+def bar(name: str, x, y, title: str, xlabel: str = "", ylabel: str = "", figsize=(10, 5), dpi: int = 160,
+        rotate: int = 45, horizontal: bool = False) -> dict:
+    return {"name": name, "kind": "bar", "x": [str(v) for v in x], "y": np.round(np.asarray(y, dtype=float), 6).tolist(),
+            "title": title, "xlabel": xlabel, "ylabel": ylabel, "figsize": list(figsize), "dpi": dpi,
+            "rotate": rotate, "horizontal": horizontal}
+
+
+def matrix(name: str, values, title: str, xlabel: str, ylabel: str, figsize=(6, 5), dpi: int = 140) -> dict:
+    return {"name": name, "kind": "matrix", "values": np.asarray(values).tolist(), "title": title,
+            "xlabel": xlabel, "ylabel": ylabel, "figsize": list(figsize), "dpi": dpi}
+
+
+def spec_hash(spec: dict) -> str:
+    payload = json.dumps({"render_version": RENDER_VERSION, **spec}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def write_specs(specs: list[dict], out_dir: Path) -> Path:
+    """Serialize figure specs for the render stage; returns the spec directory."""
+    spec_dir = Path(out_dir) / SPEC_DIR
+    spec_dir.mkdir(parents=True, exist_ok=True)
+    for spec in specs:
+        (spec_dir / f"{spec['name']}.json").write_text(json.dumps(spec, sort_keys=True), encoding="utf-8")
+    return spec_dir
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _draw_line(ax, spec: dict) -> None:
+    for s in spec["series"]:
+        x = pd.to_datetime(s["x"]) if s.get("x_type") == "datetime" else s["x"]
+        ax.plot(x, s["y"], label=s.get("label"), linestyle=s.get("linestyle", "-"))
+    if any(s.get("x_type") == "datetime" for s in spec["series"]):
+        ax.figure.autofmt_xdate()
+    if spec["legend"]:
+        ax.legend()
+    if spec["grid"]:
+        ax.grid(True, axis="y", alpha=0.25)
+
+
+def _draw_bar(ax, spec: dict) -> None:
+    if spec["horizontal"]:
+        ax.barh(spec["x"], spec["y"])
+    else:
+        ax.bar(spec["x"], spec["y"])
+        plt.setp(ax.get_xticklabels(), rotation=spec["rotate"], ha="right")
+
+
+def _draw_matrix(ax, spec: dict) -> None:
+    values = np.asarray(spec["values"])
+    ax.imshow(values, interpolation="nearest")
+    for (i, j), v in np.ndenumerate(values):
+        ax.text(j, i, str(v), ha="center", va="center")
+
+
+RENDERERS = {"line": _draw_line, "bar": _draw_bar, "matrix": _draw_matrix}
+
+
+def render(spec: dict, path: Path) -> Path:
+    fig = plt.figure(figsize=tuple(spec["figsize"]), dpi=spec["dpi"])
+    ax = fig.add_subplot(111)
+    RENDERERS[spec["kind"]](ax, spec)
+    ax.set_title(spec["title"])
+    ax.set_xlabel(spec["xlabel"])
+    ax.set_ylabel(spec["ylabel"])
+    fig.tight_layout()
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(path)
+    plt.close(fig)
+    return Path(path)
+
+
+def _render_task(task: tuple[dict, str]) -> str:
+    spec, path = task
+    return str(render(spec, Path(path)))
+
+
+# ---------------------------------------------------------------------------
+# Driver side
+# ---------------------------------------------------------------------------
+
+def render_specs(specs: list[dict], out_dir: Path, workers: int = 1, force: bool = False) -> dict[str, list[str]]:
+    """Render the specs whose hash changed since the last render into out_dir."""
+    out_dir = Path(out_dir)
+    manifest_path = out_dir / SPEC_DIR / MANIFEST
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+
+    hashes = {spec["name"]: spec_hash(spec) for spec in specs}
+    todo = [spec for spec in specs
+            if force or manifest.get(spec["name"]) != hashes[spec["name"]]
+            or not (out_dir / f"{spec['name']}.png").exists()]
+    tasks = [(spec, str(out_dir / f"{spec['name']}.png")) for spec in todo]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            list(pool.map(_render_task, tasks))
+    else:
+        for task in tasks:
+            _render_task(task)
+
+    manifest.update({spec["name"]: hashes[spec["name"]] for spec in todo})
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    rendered = {spec["name"] for spec in todo}
+    return {"rendered": sorted(rendered), "skipped": sorted(set(hashes) - rendered)}
+
+
+def load_specs(out_dir: Path) -> list[dict]:
+    spec_dir = Path(out_dir) / SPEC_DIR
+    return [json.loads(p.read_text(encoding="utf-8")) for p in sorted(spec_dir.glob("*.json")) if p.name != MANIFEST]
+
+
+def run(out_dir: Path, workers: int = 1, force: bool = False) -> dict[str, list[str]]:
+    return render_specs(load_specs(out_dir), out_dir, workers=workers, force=force)
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Render report figures from their serialized data.")
+    ap.add_argument("out_dirs", nargs="*", type=Path,
+                    default=[Path(__file__).resolve().parents[1] / "reports"],
+                    help="directories holding figure_data/ (default: V2 reports)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--force", action="store_true", help="render every figure even if its data is unchanged")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    for out_dir in args.out_dirs:
+        out = run(out_dir, workers=args.workers, force=args.force)
+        print(f"[OK] {out_dir}: rendered {len(out['rendered'])} figures, "
+              f"{len(out['skipped'])} unchanged")
+
+
+if __name__ == "__main__":
+    main()
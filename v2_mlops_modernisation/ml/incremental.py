@@ -0,0 +1,227 @@
+"""
+Incremental model updates (V2): SGD logistic regression refreshed from new fact dates.
+
+The online model is a Pipeline of a FROZEN preprocessor and an SGDClassifier
+(log loss, averaged SGD) that is only ever updated with partial_fit:
+- numerics are standardised with a scaler fitted once at bootstrap
+- categoricals are one-hot encoded against the vocabularies (features/vocab.py) as
+  they were at bootstrap; values added to a vocabulary later are ignored by this
+  model until it is bootstrapped again
+so the feature space never changes and earlier weights keep their meaning.
+
+The first run bootstraps on the fact history before Config.split_date. Later runs read
+only the dates after the stored watermark (Parquet date-range read: month partitions and
+row groups outside it are skipped) and, day by day:
+- score the day with the current model (prequential evaluation: the model has not
+  seen these rows)
+- partial_fit on the day
+The cost of a refresh therefore follows the new days' volume, not the history. Every
+update stores the model (plus its compiled scorer, ml/compiled.py) by content hash and
+registers it as a new version under the "online" alias of the model registry
+(ml/registry.py), with the prequential metrics of the rows it learned from. A date is ingested once; rows that arrive later for an
+already-ingested date wait for the next bootstrap.
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.ml.incremental
+  python -m v2_mlops_modernisation.ml.incremental --bootstrap   # start a new online model
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+from joblib import dump, load
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import average_precision_score, precision_recall_fscore_support, roc_auc_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.features.derivations import (
+    NUMERIC_FEATURES, FLAG_FEATURES, CATEGORICAL_FEATURES, model_frame,
+)
+from v2_mlops_modernisation.ml import compiled, feature_cache, registry
+from v2_mlops_modernisation.storage import parquet_store
+
+
+MODEL_LABEL = "SGDClassifier(log_loss, partial_fit)+OHE"
+STATE_FILE = "online_state.json"
+CLASSES = np.array([0, 1])
+
+
+@dataclass
+class Config:
+    split_date: str = "2026-01-15"
+    random_state: int = 20260209
+    alpha: float = 1e-4
+    bootstrap_epochs: int = 5
+    batch_rows: int = 50_000
+
+
+def _base() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def _state_dir() -> Path:
+    models_dir = _base() / "models" / "artifacts" / "online"
+    models_dir.mkdir(parents=True, exist_ok=True)
+    return models_dir
+
+
+def load_state(models_dir: Path) -> dict | None:
+    path = models_dir / STATE_FILE
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+
+
+def load_rows(date_range: tuple[str, str] | None = None) -> pd.DataFrame:
+    """Model inputs + label + date_key, only for the requested dates when Parquet exists."""
+    cols = feature_cache.INPUT_COLUMNS
+    if parquet_store.exists("curated", "fact_appointments"):
+        df = parquet_store.read_table("curated", "fact_appointments", columns=cols, date_range=date_range)
+    else:
+        p = _base() / "data" / "curated" / "fact_appointments.csv"
+        if not p.exists():
+            raise FileNotFoundError(f"Missing curated fact table: {p}. Run ETL first.")
+        df = pd.read_csv(p, usecols=cols)
+        if date_range is not None:
+            df = df[(df["date_key"] >= date_range[0]) & (df["date_key"] <= date_range[1])]
+    return df[df["no_show_label"].notna()].reset_index(drop=True)
+
+
+def make_pipeline(history: pd.DataFrame, vocabulary: dict[str, list[str]], cfg: Config) -> Pipeline:
+    """Preprocessor fitted once on the bootstrap history (frozen afterwards) + a fresh SGD model."""
+    categories = [vocab.categories(vocabulary, c) for c in CATEGORICAL_FEATURES]
+    pre = ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), list(NUMERIC_FEATURES)),
+            ("flags", "passthrough", list(FLAG_FEATURES)),
+            ("cat", OneHotEncoder(categories=categories, handle_unknown="ignore"), list(CATEGORICAL_FEATURES)),
+        ],
+        remainder="drop"
+    )
+    pre.fit(model_frame(history))
+    clf = SGDClassifier(loss="log_loss", alpha=cfg.alpha, average=True, random_state=cfg.random_state)
+    return Pipeline([("pre", pre), ("clf", clf)])
+
+
+def partial_fit(pipe: Pipeline, df: pd.DataFrame, batch_rows: int) -> None:
+    clf = pipe.named_steps["clf"]
+    for start in range(0, len(df), batch_rows):
+        part = df.iloc[start:start + batch_rows]
+        clf.partial_fit(pipe.named_steps["pre"].transform(model_frame(part)),
+                        part["no_show_label"].astype(int).to_numpy(), classes=CLASSES)
+
+
+def _metrics(y: np.ndarray, proba: np.ndarray) -> dict[str, float]:
+    if len(y) == 0 or len(np.unique(y)) < 2:
+        return {k: float("nan") for k in ["roc_auc", "avg_precision", "precision_at_0.5", "recall_at_0.5", "f1_at_0.5"]}
+    p, r, f1, _ = precision_recall_fscore_support(y, (proba >= 0.5).astype(int), average="binary", zero_division=0)
+    return {"roc_auc": float(roc_auc_score(y, proba)), "avg_precision": float(average_precision_score(y, proba)),
+            "precision_at_0.5": float(p), "recall_at_0.5": float(r), "f1_at_0.5": float(f1)}
+
+
+def _models_root() -> Path:
+    return _base() / "models"
+
+
+def _save(pipe: Pipeline, models_dir: Path, state: dict, metrics: dict[str, float],
+          n_train: int, n_test: int) -> Path:
+    """Store the model by content hash, register it as the "online" alias, then the state."""
+    tmp = registry.new_artifact_dir(_models_root())
+    dump(pipe, tmp / registry.MODEL_FILE)
+    compiled.export(pipe, tmp / registry.COMPILED_DIR)
+    artifact = registry.commit_artifact(tmp, _models_root())
+    run_id = f"online-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-v{state['version']:04d}"
+    run = registry.register({
+        "run_id": run_id,
+        "kind": "online",
+        "model": MODEL_LABEL,
+        **{k: round(v, 4) for k, v in metrics.items()},
+        "split_date": state["watermark"],
+        "n_train": int(n_train),
+        "n_test": int(n_test),
+        "version": state["version"],
+    }, artifact, aliases=(registry.ONLINE,), root=_models_root())
+    state["artifact"] = run["artifact_path"]
+    state["run_id"] = run_id
+    (models_dir / STATE_FILE).write_text(json.dumps(state, indent=2), encoding="utf-8")
+    return Path(run["artifact_path"])
+
+
+def bootstrap(cfg: Config) -> dict[str, object]:
+    """New online model from the history before split_date (a few shuffled passes)."""
+    models_dir = _state_dir()
+    split = pd.Timestamp(cfg.split_date)
+    history = load_rows(("0000-01-01", (split - pd.Timedelta(days=1)).strftime("%Y-%m-%d")))
+    if history.empty:
+        raise ValueError(f"No fact rows before {cfg.split_date} to bootstrap from.")
+    pipe = make_pipeline(history, parquet_store.vocabulary(), cfg)
+    rng = np.random.default_rng(cfg.random_state)
+    for _ in range(cfg.bootstrap_epochs):
+        partial_fit(pipe, history.iloc[rng.permutation(len(history))], cfg.batch_rows)
+
+    watermark = str(history["date_key"].astype(str).max())
+    state = {"version": 1, "watermark": watermark, "rows_seen": int(len(history))}
+    # nothing held out at bootstrap: the registry row has no metrics
+    artifact = _save(pipe, models_dir, state, _metrics(np.array([]), np.array([])), len(history), 0)
+    return {"version": 1, "rows_ingested": int(len(history)), "dates": int(history["date_key"].nunique()),
+            "watermark": watermark, "artifact": artifact, "metrics": None}
+
+
+def run_update(cfg: Config) -> dict[str, object]:
+    """Learn from the dates after the watermark; bootstraps when there is no online model yet."""
+    models_dir = _state_dir()
+    state = load_state(models_dir)
+    if state is None:
+        return bootstrap(cfg)
+
+    start = (pd.Timestamp(state["watermark"]) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    new = load_rows((start, "9999-12-31"))
+    if new.empty:
+        return {"version": state["version"], "rows_ingested": 0, "dates": 0, "watermark": state["watermark"],
+                "artifact": Path(state["artifact"]), "metrics": None}
+
+    pipe = load(registry.artifact_path(registry.ONLINE, _models_root()) or state["artifact"])
+    new = new.assign(date_key=new["date_key"].astype(str)).sort_values("date_key", kind="stable")
+    y_all, proba_all = [], []
+    for _, day in new.groupby("date_key", sort=True):
+        proba_all.append(pipe.predict_proba(model_frame(day))[:, 1])
+        y_all.append(day["no_show_label"].astype(int).to_numpy())
+        partial_fit(pipe, day, cfg.batch_rows)
+
+    metrics = _metrics(np.concatenate(y_all), np.concatenate(proba_all))
+    state = {"version": state["version"] + 1, "watermark": str(new["date_key"].max()),
+             "rows_seen": int(state["rows_seen"] + len(new))}
+    artifact = _save(pipe, models_dir, state, metrics, len(new), len(new))
+    return {"version": state["version"], "rows_ingested": int(len(new)), "dates": int(new["date_key"].nunique()),
+            "watermark": state["watermark"], "artifact": artifact, "metrics": metrics}
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Update the online no-show model with new fact dates.")
+    ap.add_argument("--bootstrap", action="store_true",
+                    help="start a new online model from the history before the split date")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    cfg = Config()
+    summary = bootstrap(cfg) if args.bootstrap else run_update(cfg)
+    print(f"[OK] Online model v{summary['version']}: {summary['rows_ingested']:,} rows "
+          f"from {summary['dates']} dates")
+    if summary["metrics"]:
+        print(f"[OK] Prequential ROC AUC on ingested rows: {summary['metrics']['roc_auc']:.4f}")
+    print(f"[OK] Watermark: {summary['watermark']}")
+    print(f"[OK] Artifact: {summary['artifact']}")
+
+
+if __name__ == "__main__":
+    main()
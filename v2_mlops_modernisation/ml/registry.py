@@ -0,0 +1,350 @@
+"""
+Model registry (V2): SQLite run log, content-addressed artifacts and aliases.
+
+models/registry/registry.db (WAL journal, so readers never wait for a writer):
+- runs:      one row per training / online update / tuning run (metrics, split date,
+             sizes, artifact hash); indexed by ROC AUC and by timestamp for lookups
+- aliases:   named pointers to runs ("champion" = the model the API and batch scoring
+             serve, "online" = the latest online SGD model)
+- artifacts: content hash -> stored artifact
+
+Artifacts are immutable directories models/artifacts/store/<sha256 of model.joblib>/
+holding model.joblib (+ compiled/, ml/compiled.py, for linear models). A run writes its
+artifact to a scratch directory and renames it into place, so concurrent runs never
+overwrite each other and a reader that resolved an alias always finds a complete file.
+A run is registered, and optionally promoted, in ONE transaction (BEGIN IMMEDIATE):
+an insert is O(1) whatever the history length.
+
+model_registry.csv is kept as an append-only mirror for the BI exports (one appended
+line per run, no rewrite); an existing CSV is imported into an empty registry once.
+models/artifacts/best_model.joblib is refreshed (atomic rename) on promotion for
+consumers that read the fixed path.
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.ml.registry                 # champion + latest runs
+  python -m v2_mlops_modernisation.ml.registry --promote <run_id>
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+CHAMPION = "champion"
+ONLINE = "online"
+MODEL_FILE = "model.joblib"
+COMPILED_DIR = "compiled"
+
+# model_registry.csv columns (the mirror keeps its original layout)
+CSV_COLUMNS = ["run_id", "timestamp_utc", "model", "roc_auc", "avg_precision", "precision_at_0.5",
+               "recall_at_0.5", "f1_at_0.5", "split_date", "n_train", "n_test", "artifact_path"]
+METRICS = ["roc_auc", "avg_precision", "precision_at_0.5", "recall_at_0.5", "f1_at_0.5"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    timestamp_utc TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT,
+    roc_auc REAL,
+    avg_precision REAL,
+    precision_at_0_5 REAL,
+    recall_at_0_5 REAL,
+    f1_at_0_5 REAL,
+    split_date TEXT,
+    n_train INTEGER,
+    n_test INTEGER,
+    artifact_sha256 TEXT REFERENCES artifacts(sha256),
+    artifact_path TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_roc_auc ON runs(roc_auc);
+CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs(timestamp_utc);
+CREATE INDEX IF NOT EXISTS idx_runs_kind_timestamp ON runs(kind, timestamp_utc);
+CREATE TABLE IF NOT EXISTS artifacts (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created_utc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    updated_utc TEXT NOT NULL
+);
+"""
+
+
+def _column(metric: str) -> str:
+    # "precision_at_0.5" -> "precision_at_0_5"
+    return metric.replace(".", "_")
+
+
+def default_root() -> Path:
+    return Path(__file__).resolve().parents[1] / "models"
+
+
+def db_path(root: Path | None = None) -> Path:
+    return Path(root or default_root()) / "registry" / "registry.db"
+
+
+def store_dir(root: Path | None = None) -> Path:
+    return Path(root or default_root()) / "artifacts" / "store"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def connect(root: Path | None = None, readonly: bool = False) -> sqlite3.Connection:
+    """Registry connection (autocommit; writers use _transaction). Read-only skips the schema setup."""
+    path = db_path(root)
+    if readonly:
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fresh = not path.exists()
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    if fresh:
+        _import_csv(conn, root)
+    return conn
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    # IMMEDIATE takes the write lock up front: concurrent writers queue on busy_timeout
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+# ---------------------------------------------------------------------------
+# Artifacts
+# ---------------------------------------------------------------------------
+
+def new_artifact_dir(root: Path | None = None) -> Path:
+    """Scratch directory to write model.joblib (+ compiled/) into before commit_artifact."""
+    tmp = store_dir(root) / f".tmp-{uuid.uuid4().hex}"
+    tmp.mkdir(parents=True)
+    return tmp
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def commit_artifact(tmp: Path, root: Path | None = None) -> tuple[str, Path]:
+    """Rename a scratch artifact to store/<sha256 of model.joblib>; returns (sha, directory)."""
+    sha = file_sha256(tmp / MODEL_FILE)
+    dest = store_dir(root) / sha
+    try:
+        os.replace(tmp, dest)
+    except OSError:
+        # the same content is already stored
+        shutil.rmtree(tmp, ignore_errors=True)
+    return sha, dest
+
+
+# ---------------------------------------------------------------------------
+# Runs and aliases
+# ---------------------------------------------------------------------------
+
+def _csv_row(run: dict) -> dict:
+    return {c: run.get(c, np.nan) for c in CSV_COLUMNS}
+
+
+def _append_csv(row: dict, root: Path | None) -> None:
+    path = Path(root or default_root()) / "registry" / "model_registry.csv"
+    pd.DataFrame([_csv_row(row)]).to_csv(path, mode="a", header=not path.exists(), index=False)
+
+
+def _insert(conn: sqlite3.Connection, run: dict, or_ignore: bool = False) -> None:
+    details = {k: v for k, v in run.items() if k not in CSV_COLUMNS + ["kind", "artifact_sha256"]}
+    conn.execute(
+        f"INSERT {'OR IGNORE ' if or_ignore else ''}INTO runs (run_id, timestamp_utc, kind, model, roc_auc, "
+        "avg_precision, precision_at_0_5, recall_at_0_5, f1_at_0_5, split_date, n_train, n_test, "
+        "artifact_sha256, artifact_path, details) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (run["run_id"], _text(run.get("timestamp_utc")) or _now(), run.get("kind", "train"), _text(run.get("model")),
+         *[_num(run.get(m)) for m in METRICS], _text(run.get("split_date")), _int(run.get("n_train")),
+         _int(run.get("n_test")), run.get("artifact_sha256"), _text(run.get("artifact_path")),
+         json.dumps(details, default=str) if details else None),
+    )
+
+
+def _text(v) -> str | None:
+    # CSV rows carry NaN for empty cells
+    return None if v is None or (isinstance(v, float) and pd.isna(v)) else str(v)
+
+
+def _num(v) -> float | None:
+    return None if v is None or pd.isna(v) else float(v)
+
+
+def _int(v) -> int | None:
+    return None if v is None or pd.isna(v) else int(v)
+
+
+def register(run: dict, artifact: tuple[str, Path] | None = None, aliases: tuple[str, ...] = (),
+             root: Path | None = None) -> dict:
+    """Insert a run (and its artifact) and point aliases at it, in one transaction."""
+    run = {"timestamp_utc": _now(), **run}
+    if artifact is not None:
+        sha, path = artifact
+        run.update(artifact_sha256=sha, artifact_path=str((path / MODEL_FILE).as_posix()))
+    conn = connect(root)
+    try:
+        with _transaction(conn):
+            if artifact is not None:
+                conn.execute("INSERT OR IGNORE INTO artifacts (sha256, path, bytes, created_utc) VALUES (?, ?, ?, ?)",
+                             (sha, str(path.as_posix()), (path / MODEL_FILE).stat().st_size, _now()))
+            _insert(conn, run)
+            for alias in aliases:
+                _set_alias(conn, alias, run["run_id"])
+    finally:
+        conn.close()
+    _append_csv(run, root)
+    if CHAMPION in aliases and artifact is not None:
+        _mirror_champion(artifact[1], root)
+    return run
+
+
+def _set_alias(conn: sqlite3.Connection, alias: str, run_id: str) -> None:
+    conn.execute("INSERT INTO aliases (alias, run_id, updated_utc) VALUES (?, ?, ?) "
+                 "ON CONFLICT(alias) DO UPDATE SET run_id = excluded.run_id, updated_utc = excluded.updated_utc",
+                 (alias, run_id, _now()))
+
+
+def _mirror_champion(artifact_dir: Path, root: Path | None) -> None:
+    dest = Path(root or default_root()) / "artifacts" / "best_model.joblib"
+    tmp = dest.parent / f".tmp-best_model-{uuid.uuid4().hex}.joblib"
+    shutil.copyfile(artifact_dir / MODEL_FILE, tmp)
+    os.replace(tmp, dest)
+
+
+def promote(run_id: str, alias: str = CHAMPION, root: Path | None = None) -> dict:
+    conn = connect(root)
+    try:
+        row = conn.execute("SELECT run_id, artifact_sha256 FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None or row["artifact_sha256"] is None:
+            raise ValueError(f"Run {run_id!r} does not exist or has no artifact")
+        _set_alias(conn, alias, run_id)
+    finally:
+        conn.close()
+    record = resolve(alias, root)
+    if alias == CHAMPION:
+        _mirror_champion(Path(record["artifact_dir"]), root)
+    return record
+
+
+def resolve(alias: str = CHAMPION, root: Path | None = None) -> dict | None:
+    """The run an alias points at (with its artifact directory), or None; one indexed lookup."""
+    if not db_path(root).exists():
+        return None
+    conn = connect(root, readonly=True)
+    try:
+        row = conn.execute(
+            "SELECT r.*, a.path AS artifact_dir, al.updated_utc AS alias_updated_utc FROM aliases al "
+            "JOIN runs r ON r.run_id = al.run_id LEFT JOIN artifacts a ON a.sha256 = r.artifact_sha256 "
+            "WHERE al.alias = ?", (alias,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row is not None else None
+
+
+def artifact_path(alias: str = CHAMPION, root: Path | None = None) -> Path | None:
+    """model.joblib of the aliased run, or None when the registry has no such alias."""
+    record = resolve(alias, root)
+    if record is None or record["artifact_dir"] is None:
+        return None
+    return Path(record["artifact_dir"]) / MODEL_FILE
+
+
+def best(metric: str = "roc_auc", since: str | None = None, kind: str | None = None, limit: int = 5,
+         root: Path | None = None) -> pd.DataFrame:
+    """Top runs by a metric (optionally since a timestamp / of one kind)."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; choose one of {METRICS}")
+    where, params = [f"{_column(metric)} IS NOT NULL"], []
+    if since is not None:
+        where.append("timestamp_utc >= ?")
+        params.append(since)
+    if kind is not None:
+        where.append("kind = ?")
+        params.append(kind)
+    conn = connect(root)
+    try:
+        return pd.read_sql_query(f"SELECT * FROM runs WHERE {' AND '.join(where)} "
+                                 f"ORDER BY {_column(metric)} DESC LIMIT ?", conn, params=[*params, limit])
+    finally:
+        conn.close()
+
+
+def runs(since: str | None = None, until: str | None = None, root: Path | None = None) -> pd.DataFrame:
+    """Runs registered in [since, until] (timestamps), oldest first."""
+    conn = connect(root)
+    try:
+        return pd.read_sql_query("SELECT * FROM runs WHERE timestamp_utc >= ? AND timestamp_utc <= ? "
+                                 "ORDER BY timestamp_utc", conn, params=[since or "", until or "9999"])
+    finally:
+        conn.close()
+
+
+def _import_csv(conn: sqlite3.Connection, root: Path | None) -> None:
+    """Carry the rows of an existing model_registry.csv into a new registry (no artifacts)."""
+    path = Path(root or default_root()) / "registry" / "model_registry.csv"
+    if not path.exists():
+        return
+    legacy = pd.read_csv(path)
+    with _transaction(conn):
+        for rec in legacy.to_dict("records"):
+            _insert(conn, {**rec, "kind": "legacy", "artifact_sha256": None}, or_ignore=True)
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Inspect the model registry or move the champion alias.")
+    ap.add_argument("--promote", metavar="RUN_ID", help="point the champion alias at this run")
+    ap.add_argument("--top", type=int, default=5, help="show the best runs by ROC AUC")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    if args.promote:
+        promote(args.promote)
+    champion = resolve(CHAMPION)
+    if champion is None:
+        print("[OK] No champion registered yet (run training first)")
+    else:
+        print(f"[OK] Champion: {champion['run_id']} {champion['model']} ROC AUC={champion['roc_auc']} "
+              f"-> {champion['artifact_dir']}")
+    print(best(limit=args.top)[["run_id", "kind", "model", "roc_auc", "split_date"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
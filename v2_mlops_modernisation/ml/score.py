@@ -0,0 +1,195 @@
+"""
+Batch scoring (V2): score the curated fact table with the trained model.
+
+- streams the fact table in chunks (model inputs + appointment_id and date_key only)
+- scores chunks on a process pool; each worker loads the model once and at most
+  2 x workers chunks are in flight, so memory stays bounded by the chunk size
+- assigns risk bands with one vectorized binning per chunk
+- writes ONLY appointment_id, date_key, predicted_no_show_proba and risk_band, chunk by
+  chunk as each one is scored (memory stays bounded by the chunk size):
+  - Parquet side table curated/fact_predictions, month-partitioned like the fact
+    (+ data/curated/fact_predictions.csv when the curated CSV side output is enabled);
+    both are written aside and swapped in once every chunk is written
+  - warehouse: UPDATE fact_appointments ... WHERE appointment_id = ? (primary key),
+    then the dashboard rollups are rebuilt, all in one transaction
+
+The incremental ETL (etl/incremental.py) scores the rows it upserts with score_rows
+and upserts them into the side table, so a scored warehouse stays fully scored
+between batch runs.
+
+The fact table itself is not rewritten. Readers of the scored fact (monitoring) join
+the side table on appointment_id, which is unique (duplicates are resolved at staging).
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.ml.score --workers 4 --chunk-rows 200000
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from joblib import load
+
+from v2_mlops_modernisation.features.derivations import MODEL_FEATURES, model_frame, risk_band
+from v2_mlops_modernisation.ml import registry
+from v2_mlops_modernisation.storage import parquet_store, sqlite_store
+from v2_mlops_modernisation.warehouse import queries
+
+
+KEY = "appointment_id"
+# Carried with every score: the key and the fact's month partition column
+ID_COLUMNS = [KEY, "date_key"]
+PREDICTION_COLUMNS = ["predicted_no_show_proba", "risk_band"]
+PREDICTIONS_TABLE = "fact_predictions"
+CHUNK_ROWS = 100_000
+
+_MODEL = None
+
+
+def _base() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def default_model_path() -> Path:
+    """The registry champion's artifact (ml/registry.py); best_model.joblib before any registered run."""
+    return registry.artifact_path(registry.CHAMPION) or _base() / "models" / "artifacts" / "best_model.joblib"
+
+
+def iter_fact(chunk_rows: int = CHUNK_ROWS):
+    """Fact chunks with the key, the date and the model inputs only."""
+    columns = ID_COLUMNS + MODEL_FEATURES
+    if parquet_store.exists("curated", "fact_appointments"):
+        yield from parquet_store.iter_batches("curated", "fact_appointments", columns=columns, batch_rows=chunk_rows)
+        return
+    p = _base() / "data" / "curated" / "fact_appointments.csv"
+    if not p.exists():
+        raise FileNotFoundError(f"Missing curated fact table: {p}. Run ETL first.")
+    yield from pd.read_csv(p, usecols=columns, chunksize=chunk_rows)
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _init_worker(model_path: str) -> None:
+    global _MODEL
+    _MODEL = load(model_path)
+
+
+def _predict(chunk: pd.DataFrame) -> np.ndarray:
+    return _MODEL.predict_proba(model_frame(chunk))[:, 1]
+
+
+# ---------------------------------------------------------------------------
+# Driver side
+# ---------------------------------------------------------------------------
+
+def predictions_frame(ids: pd.DataFrame, proba: np.ndarray) -> pd.DataFrame:
+    """ids (ID_COLUMNS of the scored rows) with their probabilities and risk bands."""
+    out = pd.DataFrame({c: ids[c].to_numpy(dtype=object) for c in ID_COLUMNS})
+    out["predicted_no_show_proba"] = proba
+    out["risk_band"] = risk_band(proba)
+    return out
+
+
+def score_chunks(chunks, model_path: Path, workers: int = 1):
+    """Yield a predictions frame per fact chunk, in input order."""
+    if workers <= 1:
+        _init_worker(str(model_path))
+        for chunk in chunks:
+            yield predictions_frame(chunk, _predict(chunk))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(model_path),)) as pool:
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append((chunk[ID_COLUMNS], pool.submit(_predict, chunk.drop(columns=ID_COLUMNS))))
+            if len(pending) >= 2 * workers:
+                ids, fut = pending.popleft()
+                yield predictions_frame(ids, fut.result())
+        while pending:
+            ids, fut = pending.popleft()
+            yield predictions_frame(ids, fut.result())
+
+
+def score_rows(rows: pd.DataFrame, model_path: Path) -> pd.DataFrame:
+    """Score a small frame in process (e.g. the rows of an incremental ETL run)."""
+    return predictions_frame(rows, load(model_path).predict_proba(model_frame(rows))[:, 1])
+
+
+def load_predictions() -> pd.DataFrame | None:
+    """Latest batch scores (one row per appointment_id), or None before the first scoring run."""
+    if parquet_store.exists("curated", PREDICTIONS_TABLE):
+        return parquet_store.read_table("curated", PREDICTIONS_TABLE)
+    p = _base() / "data" / "curated" / f"{PREDICTIONS_TABLE}.csv"
+    return pd.read_csv(p) if p.exists() else None
+
+
+def attach_predictions(fact: pd.DataFrame, predictions: pd.DataFrame | None) -> pd.DataFrame:
+    """fact with the side-table scores joined on appointment_id (row order kept)."""
+    if predictions is None:
+        return fact
+    fact = fact.drop(columns=[c for c in PREDICTION_COLUMNS if c in fact.columns])
+    return fact.merge(predictions[[KEY] + PREDICTION_COLUMNS], on=KEY, how="left", validate="many_to_one")
+
+
+def run(model_path: Path | None = None, workers: int = 1, chunk_rows: int = CHUNK_ROWS) -> dict[str, object]:
+    model_path = Path(model_path or default_model_path())
+    if not model_path.exists():
+        raise FileNotFoundError(f"Missing model artifact: {model_path}. Run training first.")
+    base = _base()
+    wh_db = base / "warehouse" / "warehouse.db"
+    csv_path = base / "data" / "curated" / f"{PREDICTIONS_TABLE}.csv"
+    # the CSV side output follows the curated fact CSV; written aside, swapped in at the end
+    csv_tmp = csv_path.with_name(f".{csv_path.name}.tmp") if (base / "data" / "curated" / "fact_appointments.csv").exists() else None
+    rows = 0
+
+    with parquet_store.table_writer("curated", PREDICTIONS_TABLE) as write_parquet:
+        def written():
+            nonlocal rows
+            for pred in score_chunks(iter_fact(chunk_rows), model_path, workers):
+                write_parquet(pred)
+                if csv_tmp is not None:
+                    pred.to_csv(csv_tmp, mode="a" if rows else "w", header=not rows, index=False)
+                rows += len(pred)
+                yield pred[[KEY] + PREDICTION_COLUMNS]
+
+        if wh_db.exists():
+            sqlite_store.update_columns(wh_db, "fact_appointments", written(), KEY, finalize=queries.build_query_layer)
+        else:
+            for _ in written():
+                pass
+    if csv_tmp is not None:
+        os.replace(csv_tmp, csv_path)
+
+    return {"rows_scored": rows, "predictions": parquet_store.table_path("curated", PREDICTIONS_TABLE),
+            "warehouse": wh_db if wh_db.exists() else None}
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Score the curated fact table with the trained model.")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="score chunks on this many processes")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                    help="rows per scoring chunk (bounds memory)")
+    ap.add_argument("--model", type=Path, default=None, help="model artifact (default: the registry champion)")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    summary = run(args.model, workers=args.workers, chunk_rows=args.chunk_rows)
+    print(f"[OK] Scored rows: {summary['rows_scored']:,}")
+    print(f"[OK] Predictions: {summary['predictions']}")
+    if summary["warehouse"] is not None:
+        print(f"[OK] Updated warehouse scores: {summary['warehouse']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Threshold metrics engine (shared by V1 and V2).
+
+Scores are sorted once (O(n log n)); cumulative sums of the sorted labels then give the
+confusion counts at every distinct score used as a threshold (predict positive when
+score >= threshold), so the full table costs one sort plus O(n):
+- tp, fp, fn, tn, precision, recall, f1, accuracy
+- outreach_rate: share of appointments flagged (contacted)
+- expected_cost: (cost_fp * fp + cost_fn * fn) / n, i.e. per appointment
+
+The first row (threshold = +inf) is the "contact nobody" policy. Precision with no
+flagged rows is 0 (sklearn's zero_division=0). Metrics at arbitrary thresholds are
+looked up in the table (at_thresholds) instead of recomputing a confusion matrix.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+COUNT_COLUMNS = ("predicted_positive", "tp", "fp", "fn", "tn")
+
+
+def threshold_table(y_true, scores, cost_fp: float = 1.0, cost_fn: float = 1.0) -> pd.DataFrame:
+    """Metrics at every distinct score (descending thresholds)."""
+    y = np.asarray(y_true).astype(np.int64)
+    s = np.asarray(scores, dtype=float)
+    order = np.argsort(-s, kind="stable")
+    s_sorted, y_sorted = s[order], y[order]
+
+    # last position of each run of equal scores = everything >= that score is flagged
+    last = np.flatnonzero(np.r_[s_sorted[1:] != s_sorted[:-1], True]) if len(s) else np.array([], dtype=int)
+    tp = np.r_[0, np.cumsum(y_sorted)[last]]
+    flagged = np.r_[0, last + 1]
+    n, pos = len(y), int(y.sum())
+    fp = flagged - tp
+    fn = pos - tp
+    tn = n - flagged - fn
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(flagged > 0, tp / np.maximum(flagged, 1), 0.0)
+        recall = tp / pos if pos else np.zeros_like(tp, dtype=float)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return pd.DataFrame({
+        "threshold": np.r_[np.inf, s_sorted[last]],
+        "predicted_positive": flagged,
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "accuracy": (tp + tn) / max(n, 1),
+        "outreach_rate": flagged / max(n, 1),
+        "expected_cost": (cost_fp * fp + cost_fn * fn) / max(n, 1),
+    })
+
+
+def at_thresholds(table: pd.DataFrame, thresholds) -> pd.DataFrame:
+    """Rows of the table for arbitrary thresholds (score >= t flagged)."""
+    t = np.asarray(thresholds, dtype=float)
+    # distinct thresholds ascending: the smallest one >= t flags exactly the scores >= t
+    asc = table["threshold"].to_numpy()[::-1]
+    idx = np.searchsorted(asc, t, side="left")
+    rows = table.iloc[len(table) - 1 - idx].reset_index(drop=True)
+    return rows.assign(threshold=t)
+
+
+def cost_optimal(table: pd.DataFrame) -> pd.Series:
+    """Row with the lowest expected cost (the higher threshold on ties: less outreach)."""
+    return table.iloc[int(np.argmin(table["expected_cost"].to_numpy()))]
+
+
+def capacity_constrained(table: pd.DataFrame, max_outreach_rate: float) -> pd.Series:
+    """Lowest threshold whose outreach fits the capacity (most no-shows caught within it)."""
+    fits = table[table["outreach_rate"] <= max_outreach_rate]
+    return fits.iloc[-1]
+
+
+def policy_summary(table: pd.DataFrame, max_outreach_rate: float, cost_fp: float, cost_fn: float) -> dict:
+    def row(r: pd.Series) -> dict:
+        out = {k: (int(v) if k in COUNT_COLUMNS else float(v)) for k, v in r.items()}
+        out["threshold"] = None if np.isinf(r["threshold"]) else float(r["threshold"])
+        return out
+
+    return {
+        "cost_fp": cost_fp,
+        "cost_fn": cost_fn,
+        "max_outreach_rate": max_outreach_rate,
+        "cost_optimal": row(cost_optimal(table)),
+        "capacity_constrained": row(capacity_constrained(table, max_outreach_rate)),
+        "max_f1": row(table.iloc[int(np.argmax(table["f1"].to_numpy()))]),
+    }
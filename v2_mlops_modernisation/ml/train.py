@@ -3,10 +3,19 @@ Train the no-show prediction model (V2).
 
 - Reads curated fact_appointments
 - Creates a time-aware train/test split
-- Trains a model (Logistic Regression with one-hot encoding)
-- Writes model artifact + metrics + plots
-- Writes predictions back to curated fact table (predicted probability + risk band)
-- Updates SQLite warehouse fact_appointments table
+- Reuses the encoded train/test matrices from the feature cache when the inputs and
+  feature spec are unchanged (ml/feature_cache.py)
+- Trains a model with the selected backend (ml/backends.py): Logistic Regression on
+  one-hot columns (default) or histogram gradient boosting on native categoricals
+- Stores the model (+ the compiled NumPy scoring artifact for linear models,
+  ml/compiled.py) by content hash in the model registry (ml/registry.py) and makes
+  the run the champion, unless --no-promote
+- Writes metrics + figure data (rendered to PNGs by the figure stage, ml/figures.py,
+  not by training), the threshold table (every distinct threshold, ml/thresholds.py)
+  and the cost-optimal / capacity-constrained thresholds
+- Scores the full fact table with the new champion using the batch-scoring stage
+  (ml/score.py): predicted probability + risk band go to the fact_predictions side
+  table and the warehouse
 """
 
 from __future__ import annotations
@@ -14,8 +23,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
+import argparse
 import json
-import sqlite3
 
 import numpy as np
 import pandas as pd
@@ -26,178 +35,133 @@ from sklearn.metrics import (
     roc_auc_score, average_precision_score,
     confusion_matrix, precision_recall_fscore_support, roc_curve, precision_recall_curve
 )
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LogisticRegression
-import matplotlib.pyplot as plt
+
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.features.derivations import model_frame
+from v2_mlops_modernisation.ml import backends, compiled, feature_cache, figures, registry, score
+from v2_mlops_modernisation.ml import thresholds as thresholds_engine
+from v2_mlops_modernisation.monitoring import timings
+from v2_mlops_modernisation.storage import parquet_store
 
 
 @dataclass
 class Config:
     split_date: str = "2026-01-15"
     random_state: int = 20260209
+    backend: str = "logreg"
+    params: dict | None = None
+    # outreach policy: cost of contacting a patient who attends vs missing a no-show,
+    # and the share of appointments the outreach team can contact
+    cost_fp: float = 1.0
+    cost_fn: float = 4.0
+    max_outreach_rate: float = 0.2
+    score_workers: int = 1
+    promote: bool = True
 
 
 def _base() -> Path:
     return Path(__file__).resolve().parents[1]
 
 
-def load_fact() -> pd.DataFrame:
+def load_fact(columns: list[str] | None = None) -> pd.DataFrame:
+    if parquet_store.exists("curated", "fact_appointments"):
+        return parquet_store.read_table("curated", "fact_appointments", columns=columns)
     p = _base() / "data" / "curated" / "fact_appointments.csv"
     if not p.exists():
         raise FileNotFoundError(f"Missing curated fact table: {p}. Run ETL first.")
-    df = pd.read_csv(p)
+    df = pd.read_csv(p, usecols=columns)
     return df
 
 
-def risk_band(p: float) -> str:
-    if p >= 0.75:
-        return "Critical"
-    if p >= 0.55:
-        return "High"
-    if p >= 0.35:
-        return "Medium"
-    return "Low"
-
-
 def make_features(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
     y = df["no_show_label"].astype(int)
 
-    # Select features that are operationally plausible
-    X = df[[
-        "lead_time_days", "sms_reminder_sent",
-        "prior_no_show_count", "prior_show_count",
-        "age", "gender", "age_band",
-        "appointment_type", "booking_channel",
-        "appointment_hour", "appointment_is_weekend",
-        "deprivation_index",
-        "clinic_id", "neighbourhood_id", "clinic_type", "clinic_region"
-    ]].copy()
-
-    # ensure types
-    num_cols = ["lead_time_days","prior_no_show_count","prior_show_count","age","appointment_hour","deprivation_index"]
-    for c in num_cols:
-        X[c] = pd.to_numeric(X[c], errors="coerce").fillna(0)
-
-    for c in ["sms_reminder_sent","appointment_is_weekend"]:
-        X[c] = pd.to_numeric(X[c], errors="coerce").fillna(0).astype(int)
+    # Select features that are operationally plausible (shared contract with the API)
+    X = model_frame(df)
 
     return X, y
 
 
-def plot_confusion(cm, path: Path):
-    fig = plt.figure(figsize=(6,5), dpi=140)
-    ax = fig.add_subplot(111)
-    ax.imshow(cm, interpolation="nearest")
-    ax.set_title("Confusion Matrix")
-    ax.set_xlabel("Predicted")
-    ax.set_ylabel("Actual")
-    for (i,j), v in np.ndenumerate(cm):
-        ax.text(j, i, str(v), ha="center", va="center")
-    fig.tight_layout()
-    fig.savefig(path)
-    plt.close(fig)
+def confusion_spec(cm) -> dict:
+    return figures.matrix("confusion_matrix", cm, "Confusion Matrix", "Predicted", "Actual")
 
 
-def plot_roc(y_true, y_prob, path: Path):
+def roc_spec(y_true, y_prob) -> dict:
     fpr, tpr, _ = roc_curve(y_true, y_prob)
     auc = roc_auc_score(y_true, y_prob)
-    fig = plt.figure(figsize=(6,5), dpi=140)
-    ax = fig.add_subplot(111)
-    ax.plot(fpr, tpr, label=f"AUC={auc:.3f}")
-    ax.plot([0,1],[0,1], linestyle="--")
-    ax.set_xlabel("False Positive Rate")
-    ax.set_ylabel("True Positive Rate")
-    ax.set_title("ROC Curve")
-    ax.legend()
-    fig.tight_layout()
-    fig.savefig(path)
-    plt.close(fig)
-
-
-def plot_pr(y_true, y_prob, path: Path):
+    x, y = figures.thin(fpr, tpr)
+    return figures.line("roc_curve", [
+        {"x": x, "y": y, "label": f"AUC={auc:.3f}"},
+        {"x": [0, 1], "y": [0, 1], "linestyle": "--"},
+    ], "ROC Curve", "False Positive Rate", "True Positive Rate")
+
+
+def pr_spec(y_true, y_prob) -> dict:
     prec, rec, _ = precision_recall_curve(y_true, y_prob)
     ap = average_precision_score(y_true, y_prob)
-    fig = plt.figure(figsize=(6,5), dpi=140)
-    ax = fig.add_subplot(111)
-    ax.plot(rec, prec, label=f"AP={ap:.3f}")
-    ax.set_xlabel("Recall")
-    ax.set_ylabel("Precision")
-    ax.set_title("Precision-Recall Curve")
-    ax.legend()
-    fig.tight_layout()
-    fig.savefig(path)
-    plt.close(fig)
-
-
-def plot_threshold_tuning(y_true, y_prob, path: Path):
+    x, y = figures.thin(rec, prec)
+    return figures.line("pr_curve", [{"x": x, "y": y, "label": f"AP={ap:.3f}"}],
+                        "Precision-Recall Curve", "Recall", "Precision")
+
+
+def threshold_tuning_spec(table: pd.DataFrame) -> dict:
     thresholds = np.linspace(0.05, 0.95, 19)
-    f1s = []
-    recalls = []
-    precisions = []
-    for t in thresholds:
-        y_pred = (y_prob >= t).astype(int)
-        p, r, f1, _ = precision_recall_fscore_support(y_true, y_pred, average="binary", zero_division=0)
-        f1s.append(f1); recalls.append(r); precisions.append(p)
-
-    fig = plt.figure(figsize=(8,5), dpi=140)
-    ax = fig.add_subplot(111)
-    ax.plot(thresholds, f1s, label="F1")
-    ax.plot(thresholds, recalls, label="Recall")
-    ax.plot(thresholds, precisions, label="Precision")
-    ax.set_xlabel("Threshold")
-    ax.set_ylabel("Score")
-    ax.set_title("Threshold tuning (binary class)")
-    ax.legend()
-    fig.tight_layout()
-    fig.savefig(path)
-    plt.close(fig)
+    grid = thresholds_engine.at_thresholds(table, thresholds)
+    x = np.round(thresholds, 6).tolist()
+    return figures.line("threshold_tuning_f1", [
+        {"x": x, "y": np.round(grid[col], 6).tolist(), "label": label}
+        for col, label in [("f1", "F1"), ("recall", "Recall"), ("precision", "Precision")]
+    ], "Threshold tuning (binary class)", "Threshold", "Score", figsize=(8, 5))
+
+
+def feature_importance_spec(fi: pd.DataFrame, effect: str) -> dict:
+    return figures.bar("feature_importance_top40", fi["feature"][::-1], fi[f"abs_{effect}"][::-1],
+                       f"Top 40 feature effects (|{effect}|)", xlabel=f"|{effect}|", figsize=(10, 7), dpi=140,
+                       horizontal=True)
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Train the V2 no-show model.")
+    ap.add_argument("--backend", choices=sorted(backends.BACKENDS), default=None,
+                    help=f"estimator backend (ml/backends.py, default {Config.backend})")
+    ap.add_argument("--params", type=Path, default=None,
+                    help="tuning record from ml/tune.py (models/registry/tuning_<run_id>.json): its backend and parameters")
+    ap.add_argument("--no-promote", action="store_true",
+                    help="register the run without making it the champion (no batch scoring)")
+    return ap.parse_args()
 
 
 def main() -> None:
-    cfg = Config()
+    args = _parse_args()
+    laps = timings.Laps("train")
+    tuned = json.loads(args.params.read_text(encoding="utf-8")) if args.params else {}
+    cfg = Config(backend=args.backend or tuned.get("backend", Config.backend), params=tuned.get("params"),
+                 promote=not args.no_promote)
+    backend = backends.get(cfg.backend)
     base = _base()
     reports = base / "reports"
     reports.mkdir(parents=True, exist_ok=True)
-    models_dir = base / "models" / "artifacts"
-    models_dir.mkdir(parents=True, exist_ok=True)
-    registry_dir = base / "models" / "registry"
-    registry_dir.mkdir(parents=True, exist_ok=True)
 
-    df = load_fact()
+    # Vocabulary columns as Categorical with the persisted codes (the CSV fallback is encoded here)
+    vocabulary = parquet_store.vocabulary()
+    df = vocab.encode(load_fact(columns=feature_cache.INPUT_COLUMNS), vocabulary)
     df["date_key"] = pd.to_datetime(df["date_key"])
+    laps("load_fact", rows=len(df))
 
-    split_dt = pd.to_datetime(cfg.split_date)
-    train_df = df[df["date_key"] < split_dt].copy()
-    test_df = df[df["date_key"] >= split_dt].copy()
-
-    X_train, y_train = make_features(train_df)
-    X_test, y_test = make_features(test_df)
-
-    num_features = ["lead_time_days","prior_no_show_count","prior_show_count","age","appointment_hour","deprivation_index"]
-    cat_features = [c for c in X_train.columns if c not in num_features and c not in ["sms_reminder_sent","appointment_is_weekend"]]
-    passthrough_features = ["sms_reminder_sent","appointment_is_weekend"]
-
-    pre = ColumnTransformer(
-        transformers=[
-            ("num", "passthrough", num_features + passthrough_features),
-            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_features),
-        ],
-        remainder="drop"
-    )
+    # Design matrices from the content-addressed cache (built and stored on a miss)
+    fm = feature_cache.get_or_build(df, cfg.split_date, vocabulary, encoding=backend.encoding)
+    y_train, y_test = fm.y_train, fm.y_test
+    laps("feature_cache_hit" if fm.hit else "encode", rows=len(df))
 
-    clf = LogisticRegression(
-        max_iter=800,
-        solver="saga",
-        n_jobs=-1,
-        random_state=cfg.random_state
-    )
+    clf = backend.make_estimator(feature_cache.encoder_categories(vocabulary, df), cfg.random_state)
+    if cfg.params:
+        clf.set_params(**cfg.params)
+    clf.fit(fm.X_train, y_train)
+    pipe = Pipeline([("pre", fm.preprocessor), ("clf", clf)])
+    laps("fit", rows=len(y_train))
 
-    pipe = Pipeline([("pre", pre), ("clf", clf)])
-    pipe.fit(X_train, y_train)
-
-    y_prob = pipe.predict_proba(X_test)[:, 1]
+    y_prob = clf.predict_proba(fm.X_test)[:, 1]
     y_pred = (y_prob >= 0.5).astype(int)
 
     auc = roc_auc_score(y_test, y_prob)
@@ -207,96 +171,83 @@ def main() -> None:
 
     metrics = {
         "split_date": cfg.split_date,
-        "n_train": int(len(train_df)),
-        "n_test": int(len(test_df)),
+        "n_train": int(len(y_train)),
+        "n_test": int(len(y_test)),
         "roc_auc": float(auc),
         "avg_precision": float(ap),
         "precision_at_0.5": float(p),
         "recall_at_0.5": float(r),
         "f1_at_0.5": float(f1),
         "confusion_matrix": cm.tolist(),
-        "model": "LogisticRegression(saga) + OneHotEncoder",
+        "model": backend.model_label,
         "generated_at_utc": datetime.utcnow().isoformat() + "Z"
     }
 
     (reports / "model_metrics.json").write_text(json.dumps(metrics, indent=2), encoding="utf-8")
 
-    plot_roc(y_test, y_prob, reports / "roc_curve.png")
-    plot_pr(y_test, y_prob, reports / "pr_curve.png")
-    plot_confusion(cm, reports / "confusion_matrix.png")
-    plot_threshold_tuning(y_test, y_prob, reports / "threshold_tuning_f1.png")
+    specs = [roc_spec(y_test, y_prob), pr_spec(y_test, y_prob), confusion_spec(cm)]
+    # Every distinct threshold from one sort: full table + cost-optimal / capacity thresholds
+    table = thresholds_engine.threshold_table(y_test, y_prob, cfg.cost_fp, cfg.cost_fn)
+    table.to_csv(reports / "threshold_table.csv", index=False)
+    policy = thresholds_engine.policy_summary(table, cfg.max_outreach_rate, cfg.cost_fp, cfg.cost_fn)
+    (reports / "threshold_policy.json").write_text(json.dumps(policy, indent=2), encoding="utf-8")
+    specs.append(threshold_tuning_spec(table))
+    laps("evaluate", rows=len(y_test))
 
     run_id = f"run-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
-    model_path = models_dir / "best_model.joblib"
-    dump(pipe, model_path)
-
-    # Write registry append
-    reg_path = registry_dir / "model_registry.csv"
-    row = {
+    # Immutable, content-addressed artifact (ml/registry.py); linear models also get the
+    # NumPy-only scorer (ml/compiled.py), hgb does not
+    tmp = registry.new_artifact_dir()
+    dump(pipe, tmp / registry.MODEL_FILE)
+    if compiled.supports(pipe):
+        compiled.export(pipe, tmp / registry.COMPILED_DIR)
+    artifact = registry.commit_artifact(tmp)
+    model_path = artifact[1] / registry.MODEL_FILE
+
+    # One transaction: run row + artifact + champion alias (when promoted)
+    registry.register({
         "run_id": run_id,
-        "timestamp_utc": datetime.utcnow().isoformat() + "Z",
-        "model": "LogisticRegression(saga)+OHE",
+        "kind": "train",
+        "model": backend.registry_label,
         "roc_auc": round(float(auc), 4),
         "avg_precision": round(float(ap), 4),
         "precision_at_0.5": round(float(p), 4),
         "recall_at_0.5": round(float(r), 4),
         "f1_at_0.5": round(float(f1), 4),
         "split_date": cfg.split_date,
-        "n_train": int(len(train_df)),
-        "n_test": int(len(test_df)),
-        "artifact_path": str(model_path.as_posix()),
-    }
-    if reg_path.exists():
-        reg = pd.read_csv(reg_path)
-        reg = pd.concat([reg, pd.DataFrame([row])], ignore_index=True)
-    else:
-        reg = pd.DataFrame([row])
-    reg.to_csv(reg_path, index=False)
-
-    # Score full dataset for BI/monitoring
-    X_all, _ = make_features(df.assign(no_show_label=df["no_show_label"]))
-    all_prob = pipe.predict_proba(X_all)[:, 1]
-    df_scored = df.copy()
-    df_scored["predicted_no_show_proba"] = all_prob
-    df_scored["risk_band"] = df_scored["predicted_no_show_proba"].apply(risk_band)
-
-    # Persist back to curated
-    out_fact = base / "data" / "curated" / "fact_appointments.csv"
-    df_scored_out = df_scored.copy()
-    df_scored_out["date_key"] = df_scored_out["date_key"].dt.date.astype(str)
-    df_scored_out.to_csv(out_fact, index=False)
-
-    # Update warehouse fact table
-    wh_db = base / "warehouse" / "warehouse.db"
-    if wh_db.exists():
-        with sqlite3.connect(wh_db) as conn:
-            df_scored_out.to_sql("fact_appointments", conn, if_exists="replace", index=False)
-
-    # Write a small feature importance proxy (coefficients)
-    # We'll export top coefficients for interpretability.
-    ohe = pipe.named_steps["pre"].named_transformers_["cat"]
-    cat_feature_names = list(ohe.get_feature_names_out(cat_features))
-    feature_names = num_features + passthrough_features + cat_feature_names
-    coefs = pipe.named_steps["clf"].coef_[0]
-    fi = pd.DataFrame({"feature": feature_names, "coef": coefs})
-    fi["abs_coef"] = fi["coef"].abs()
-    fi = fi.sort_values("abs_coef", ascending=False).head(40)
+        "n_train": int(len(y_train)),
+        "n_test": int(len(y_test)),
+        "params": cfg.params,
+    }, artifact, aliases=(registry.CHAMPION,) if cfg.promote else ())
+    laps("register")
+
+    # Score the full fact table for BI/monitoring (writes the prediction columns only)
+    scored = score.run(model_path, workers=cfg.score_workers) if cfg.promote else None
+    laps("batch_score", rows=scored["rows_scored"] if scored else 0)
+
+    # Write a small feature importance proxy for interpretability
+    # (coefficients for logreg, permutation importance for hgb)
+    fi = backend.feature_effects(pipe, fm.X_test, y_test)
+    effect = fi.columns[1]
+    fi[f"abs_{effect}"] = fi[effect].abs()
+    fi = fi.sort_values(f"abs_{effect}", ascending=False).head(40)
     fi.to_csv(reports / "feature_importance_top40.csv", index=False)
 
-    fig = plt.figure(figsize=(10,7), dpi=140)
-    ax = fig.add_subplot(111)
-    ax.barh(fi["feature"][::-1], fi["abs_coef"][::-1])
-    ax.set_title("Top 40 feature effects (|coef|)")
-    ax.set_xlabel("|coef|")
-    fig.tight_layout()
-    fig.savefig(reports / "feature_importance_top40.png")
-    plt.close(fig)
+    specs.append(feature_importance_spec(fi, effect))
+
+    # Figures are rendered by the figure stage (ml/figures.py), outside training
+    spec_dir = figures.write_specs(specs, reports)
+    laps("feature_effects")
 
     print(f"[OK] Model artifact: {model_path}")
     print(f"[OK] Metrics: {reports/'model_metrics.json'}")
-    print(f"[OK] Registry: {reg_path}")
-    print(f"[OK] Scored fact updated: {out_fact}")
-    print(f"[OK] Updated warehouse: {wh_db}")
+    print(f"[OK] Registry: {run_id} -> {registry.db_path()}" + (" (champion)" if cfg.promote else ""))
+    print(f"[OK] Figure data: {spec_dir} (render with: python -m v2_mlops_modernisation.ml.figures)")
+    if scored is None:
+        return
+    print(f"[OK] Scored rows: {scored['rows_scored']:,} -> {scored['predictions']}")
+    if scored["warehouse"] is not None:
+        print(f"[OK] Updated warehouse scores: {scored['warehouse']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,238 @@
+"""
+Time-aware hyperparameter search (V2): rolling-origin folds + successive halving.
+
+Folds are rolling origins over date_key, inside the training period only (dates before
+Config.split_date, so the train.py test window is never used for selection):
+  fold k trains on every date before origin_k and validates on [origin_k, origin_k + horizon)
+with the last fold's window ending the day before the split date.
+
+Each fold is encoded ONCE per encoding (one-hot / ordinal) into the feature cache
+(ml/feature_cache.py); candidates only load the cached matrices, so no candidate
+re-encodes data. Candidates (backend x parameter grid, SEARCH_SPACE) are evaluated on
+a process pool, one task per (candidate, fold), with successive halving over folds:
+- round r evaluates the surviving candidates on fold r (folds in date order, so the
+  early rounds, which see the most candidates, train on the least data)
+- after each round only the best 1/eta by mean ROC AUC so far survive
+The winner (best mean AUC over all folds) and its per-fold metrics are written to
+models/registry/tuning_<run_id>.json and registered in the model registry; the whole
+search is in reports/tuning_results.csv. Train with the winner:
+  python -m v2_mlops_modernisation.ml.train --params models/registry/tuning_<run_id>.json
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.ml.tune --workers 8
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import math
+import os
+
+import pandas as pd
+from sklearn.metrics import average_precision_score, roc_auc_score
+from sklearn.model_selection import ParameterGrid
+from threadpoolctl import threadpool_limits
+
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.ml import backends, feature_cache, registry, train
+from v2_mlops_modernisation.storage import parquet_store
+
+
+SEARCH_SPACE = {
+    "logreg": {"C": [0.1, 1.0, 10.0]},
+    "hgb": {
+        "learning_rate": [0.05, 0.1],
+        "max_leaf_nodes": [15, 31],
+        "min_samples_leaf": [20, 80],
+        "l2_regularization": [0.0, 1.0],
+    },
+}
+
+
+@dataclass
+class Config:
+    split_date: str = train.Config.split_date
+    random_state: int = train.Config.random_state
+    n_folds: int = 3
+    horizon_days: int = 14
+    eta: int = 3
+
+
+@dataclass(frozen=True)
+class Fold:
+    index: int
+    origin: str
+    end: str            # exclusive
+    keys: dict          # encoding -> feature cache key
+
+
+def _base() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def fold_root() -> Path:
+    return feature_cache.default_root() / "folds"
+
+
+def candidates(names: list[str]) -> list[dict]:
+    out = []
+    for name in names:
+        for params in ParameterGrid(SEARCH_SPACE[name]):
+            out.append({"id": f"{name}:" + ",".join(f"{k}={v}" for k, v in sorted(params.items())),
+                        "backend": name, "params": dict(params)})
+    return out
+
+
+def fold_origins(split_date: str, n_folds: int, horizon_days: int) -> list[tuple[str, str]]:
+    split = pd.Timestamp(split_date)
+    bounds = [split - pd.Timedelta(days=horizon_days * (n_folds - k)) for k in range(n_folds + 1)]
+    return [(a.strftime("%Y-%m-%d"), b.strftime("%Y-%m-%d")) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def build_folds(df: pd.DataFrame, vocabulary: dict[str, list[str]], cfg: Config,
+                encodings: set[str], root: Path) -> list[Fold]:
+    """Encode every fold once per encoding into the fold cache."""
+    folds = []
+    keep = max(feature_cache.MAX_ENTRIES, cfg.n_folds * len(encodings))
+    for i, (origin, end) in enumerate(fold_origins(cfg.split_date, cfg.n_folds, cfg.horizon_days)):
+        rows = df[df["date_key"] < pd.Timestamp(end)]
+        keys = {enc: feature_cache.get_or_build(rows, origin, vocabulary, root, encoding=enc, keep=keep).key
+                for enc in sorted(encodings)}
+        folds.append(Fold(i, origin, end, keys))
+    return folds
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+_FOLDS: dict[tuple[str, str], feature_cache.FeatureMatrices] = {}
+
+
+def _init_worker() -> None:
+    # one process per core: keep BLAS / OpenMP in each worker single-threaded
+    threadpool_limits(1)
+
+
+def evaluate(task: tuple[dict, Fold, str, list[list[str]], int]) -> dict:
+    cand, fold, root, categories, random_state = task
+    backend = backends.get(cand["backend"])
+    key = fold.keys[backend.encoding]
+    if (root, key) not in _FOLDS:
+        _FOLDS[(root, key)] = feature_cache.load_entry(key, Path(root))
+    fm = _FOLDS[(root, key)]
+
+    clf = backend.make_estimator(categories, random_state).set_params(**cand["params"])
+    clf.fit(fm.X_train, fm.y_train)
+    proba = clf.predict_proba(fm.X_test)[:, 1]
+    return {"candidate": cand["id"], "backend": cand["backend"], "params": json.dumps(cand["params"], sort_keys=True),
+            "fold": fold.index, "origin": fold.origin, "n_train": int(len(fm.y_train)),
+            "n_valid": int(len(fm.y_test)), "roc_auc": float(roc_auc_score(fm.y_test, proba)),
+            "avg_precision": float(average_precision_score(fm.y_test, proba))}
+
+
+# ---------------------------------------------------------------------------
+# Driver side
+# ---------------------------------------------------------------------------
+
+def successive_halving(cands: list[dict], folds: list[Fold], root: Path, categories: list[list[str]],
+                       cfg: Config, workers: int) -> pd.DataFrame:
+    survivors = list(cands)
+    results: list[dict] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for r, fold in enumerate(folds):
+            tasks = [(c, fold, str(root), categories, cfg.random_state) for c in survivors]
+            for row in pool.map(evaluate, tasks):
+                results.append({**row, "round": r})
+            if r == len(folds) - 1 or len(survivors) == 1:
+                break
+            mean_auc = pd.DataFrame(results).groupby("candidate")["roc_auc"].mean()
+            ranked = sorted(survivors, key=lambda c: (-mean_auc[c["id"]], c["id"]))
+            survivors = ranked[:max(1, math.ceil(len(survivors) / cfg.eta))]
+    return pd.DataFrame(results)
+
+
+def pick_winner(results: pd.DataFrame) -> pd.Series:
+    """Best mean ROC AUC among the candidates evaluated on the most folds."""
+    per_cand = results.groupby(["candidate", "backend", "params"]).agg(
+        folds=("fold", "count"), roc_auc=("roc_auc", "mean"), avg_precision=("avg_precision", "mean")).reset_index()
+    finalists = per_cand[per_cand["folds"] == per_cand["folds"].max()]
+    return finalists.sort_values(["roc_auc", "candidate"], ascending=[False, True]).iloc[0]
+
+
+def run(cfg: Config, backend_names: list[str], workers: int) -> dict[str, object]:
+    base = _base()
+    vocabulary = parquet_store.vocabulary()
+    df = vocab.encode(train.load_fact(columns=feature_cache.INPUT_COLUMNS), vocabulary)
+    df["date_key"] = pd.to_datetime(df["date_key"])
+    df = df[df["date_key"] < pd.Timestamp(cfg.split_date)]
+
+    cands = candidates(backend_names)
+    root = fold_root()
+    folds = build_folds(df, vocabulary, cfg, {backends.get(n).encoding for n in backend_names}, root)
+    results = successive_halving(cands, folds, root, feature_cache.encoder_categories(vocabulary, df), cfg, workers)
+    winner = pick_winner(results)
+
+    run_id = f"tune-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
+    reports = base / "reports"
+    reports.mkdir(parents=True, exist_ok=True)
+    results.to_csv(reports / "tuning_results.csv", index=False)
+
+    per_fold = results[results["candidate"] == winner["candidate"]].sort_values("fold")
+    registry_dir = base / "models" / "registry"
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    record = {
+        "run_id": run_id,
+        "backend": winner["backend"],
+        "params": json.loads(winner["params"]),
+        "cv_roc_auc": float(winner["roc_auc"]),
+        "cv_avg_precision": float(winner["avg_precision"]),
+        "folds": per_fold[["fold", "origin", "n_train", "n_valid", "roc_auc", "avg_precision"]].to_dict("records"),
+        "split_date": cfg.split_date,
+        "candidates": len(cands),
+        "fits": len(results),
+    }
+    tuning_path = registry_dir / f"tuning_{run_id}.json"
+    tuning_path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+
+    registry.register({
+        "run_id": run_id,
+        "kind": "tune",
+        "model": f"{backends.get(winner['backend']).registry_label} (tuned, rolling-origin CV)",
+        "roc_auc": round(float(winner["roc_auc"]), 4),
+        "avg_precision": round(float(winner["avg_precision"]), 4),
+        "split_date": cfg.split_date,
+        "n_train": int(per_fold["n_train"].max()),
+        "n_test": int(per_fold["n_valid"].sum()),
+        "artifact_path": str(tuning_path.as_posix()),
+    })
+    return {"run_id": run_id, "winner": record, "tuning_path": tuning_path, "results": results}
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Rolling-origin hyperparameter search with successive halving.")
+    ap.add_argument("--backends", nargs="+", choices=sorted(SEARCH_SPACE), default=sorted(SEARCH_SPACE))
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--folds", type=int, default=Config.n_folds)
+    ap.add_argument("--horizon-days", type=int, default=Config.horizon_days)
+    ap.add_argument("--eta", type=int, default=Config.eta, help="keep the best 1/eta candidates per round")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    cfg = Config(n_folds=args.folds, horizon_days=args.horizon_days, eta=args.eta)
+    out = run(cfg, args.backends, args.workers)
+    winner = out["winner"]
+    print(f"[OK] Candidates: {winner['candidates']} ({winner['fits']} fold fits with successive halving)")
+    print(f"[OK] Winner: {winner['backend']} {winner['params']} cv ROC AUC={winner['cv_roc_auc']:.4f}")
+    print(f"[OK] Tuning record: {out['tuning_path']}")
+
+
+if __name__ == "__main__":
+    main()
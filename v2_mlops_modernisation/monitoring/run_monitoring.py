@@ -19,6 +19,10 @@ import random
 import numpy as np
 import pandas as pd
 
+from v2_mlops_modernisation.ml import registry, score
+from v2_mlops_modernisation.monitoring import timings
+from v2_mlops_modernisation.storage import parquet_store
+
 
 @dataclass
 class Config:
@@ -99,11 +103,32 @@ def _status(psi: float, warn: float, alert: float) -> str:
     return "OK"
 
 
-def load_fact() -> pd.DataFrame:
-    p = _base() / "data" / "curated" / "fact_appointments.csv"
-    if not p.exists():
-        raise FileNotFoundError(f"Missing fact_appointments.csv: {p}. Run ETL + train first.")
-    df = pd.read_csv(p)
+NUMERIC_DRIFT = ["lead_time_days","age","deprivation_index","predicted_no_show_proba","prior_no_show_count"]
+CATEGORICAL_DRIFT = ["clinic_id","booking_channel","appointment_type","risk_band","clinic_region","age_band"]
+
+
+def load_fact(columns: list[str] | None = None, date_range: tuple[str, str] | None = None) -> pd.DataFrame:
+    """Scored fact table; Parquet reads only the requested columns and date range.
+
+    Scores come from the batch-scoring side table (ml/score.py), joined on appointment_id.
+    """
+    wants_scores = columns is None or any(c in score.PREDICTION_COLUMNS for c in columns)
+    predictions = score.load_predictions() if wants_scores else None
+    fact_cols = columns
+    if columns is not None and predictions is not None:
+        fact_cols = [c for c in columns if c not in score.PREDICTION_COLUMNS]
+        if score.KEY not in fact_cols:
+            fact_cols.append(score.KEY)
+    if parquet_store.exists("curated", "fact_appointments"):
+        df = parquet_store.read_table("curated", "fact_appointments", columns=fact_cols, date_range=date_range)
+    else:
+        p = _base() / "data" / "curated" / "fact_appointments.csv"
+        if not p.exists():
+            raise FileNotFoundError(f"Missing fact_appointments.csv: {p}. Run ETL + train first.")
+        df = pd.read_csv(p, usecols=fact_cols)
+    df = score.attach_predictions(df, predictions)
+    if columns is not None:
+        df = df[columns]
     df["date_key"] = pd.to_datetime(df["date_key"])
     return df
 
@@ -126,15 +151,12 @@ def build_drift_report(df: pd.DataFrame, cfg: Config) -> pd.DataFrame:
     ref = df[(df["date_key"] >= pd.to_datetime(cfg.reference_start)) & (df["date_key"] <= pd.to_datetime(cfg.reference_end))]
     cur = df[(df["date_key"] >= pd.to_datetime(cfg.current_start)) & (df["date_key"] <= pd.to_datetime(cfg.current_end))]
 
-    numeric = ["lead_time_days","age","deprivation_index","predicted_no_show_proba","prior_no_show_count"]
-    categorical = ["clinic_id","booking_channel","appointment_type","risk_band","clinic_region","age_band"]
-
     rows = []
-    for col in numeric:
+    for col in NUMERIC_DRIFT:
         psi = _psi_numeric(ref[col], cur[col], cfg.psi_bins)
         rows.append({"feature": col, "feature_type": "numeric", "psi": psi, "status": _status(psi, cfg.warn_threshold, cfg.alert_threshold)})
 
-    for col in categorical:
+    for col in CATEGORICAL_DRIFT:
         psi = _psi_categorical(ref[col], cur[col])
         rows.append({"feature": col, "feature_type": "categorical", "psi": psi, "status": _status(psi, cfg.warn_threshold, cfg.alert_threshold)})
 
@@ -232,7 +254,8 @@ def alerts_from_monitoring(drift: pd.DataFrame, fresh: dict, latency: pd.DataFra
     return pd.DataFrame(alerts)
 
 
-def monitoring_snapshot(drift: pd.DataFrame, fresh: dict, latency: pd.DataFrame) -> pd.DataFrame:
+def monitoring_snapshot(drift: pd.DataFrame, fresh: dict, latency: pd.DataFrame,
+                        champion: dict | None = None) -> pd.DataFrame:
     # summarise
     n_alert = int((drift["status"] == "ALERT").sum())
     n_warn = int((drift["status"] == "WARN").sum())
@@ -246,32 +269,43 @@ def monitoring_snapshot(drift: pd.DataFrame, fresh: dict, latency: pd.DataFrame)
         "freshness_lag_days": fresh["lag_days"],
         "api_p95_ms": float(last["p95_ms"]),
         "api_error_rate": float(last["error_rate"]),
+        # the model whose scores were monitored (registry champion, ml/registry.py)
+        "model_run_id": champion["run_id"] if champion else None,
+        "model": champion["model"] if champion else None,
     }
     return pd.DataFrame([row])
 
 
 def main() -> None:
+    laps = timings.Laps("run_monitoring")
     cfg = Config()
     base = _base()
     reports = base / "reports"
     reports.mkdir(parents=True, exist_ok=True)
 
-    df = load_fact()
+    # Only the drift columns over the reference..current windows are read
+    drift_cols = ["date_key"] + NUMERIC_DRIFT + CATEGORICAL_DRIFT
+    df = load_fact(columns=drift_cols, date_range=(cfg.reference_start, cfg.current_end))
+    laps("load_drift_window", rows=len(df))
 
     drift = build_drift_report(df, cfg)
     drift.to_csv(reports / "drift_report.csv", index=False)
     (reports / "drift_report.json").write_text(drift.to_json(orient="records", indent=2), encoding="utf-8")
+    laps("drift", rows=len(df))
 
-    fresh = freshness_snapshot(df, cfg)
+    dates = load_fact(columns=["date_key"])
+    fresh = freshness_snapshot(dates, cfg)
+    laps("freshness", rows=len(dates))
 
     latency = simulate_latency(cfg)
     latency.to_csv(reports / "api_latency_daily.csv", index=False)
 
-    snapshot = monitoring_snapshot(drift, fresh, latency)
+    snapshot = monitoring_snapshot(drift, fresh, latency, registry.resolve(registry.CHAMPION))
     snapshot.to_csv(reports / "monitoring_snapshot.csv", index=False)
 
     alerts = alerts_from_monitoring(drift, fresh, latency, cfg)
     alerts.to_csv(reports / "alerts_register.csv", index=False)
+    laps("latency_and_alerts")
 
     print(f"[OK] Drift report: {reports/'drift_report.csv'}")
     print(f"[OK] Monitoring snapshot: {reports/'monitoring_snapshot.csv'}")
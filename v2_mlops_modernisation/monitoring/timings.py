@@ -0,0 +1,65 @@
+"""
+Sub-step timings for pipeline stages (read by scripts/benchmark_pipeline.py).
+
+A stage creates one Laps() at the start of main() and calls it after each sub-step:
+
+    laps = timings.Laps("run_etl")
+    df_raw = extract()
+    laps("extract", rows=len(df_raw))
+
+Each call records the wall and CPU time since the previous call, the rows handled and
+the process peak RSS so far, as one JSON line appended to the file named by the
+V2_STEP_TIMINGS environment variable. Without the variable nothing is measured or
+written, so normal runs pay one environment lookup.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import json
+import os
+import resource
+import sys
+import time
+
+
+ENV_VAR = "V2_STEP_TIMINGS"
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB on Linux
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class Laps:
+    def __init__(self, stage: str):
+        self.stage = stage
+        target = os.environ.get(ENV_VAR)
+        self.path = Path(target) if target else None
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def __call__(self, step: str, rows: int | None = None) -> None:
+        if self.path is None:
+            return
+        wall, cpu = time.perf_counter(), time.process_time()
+        record = {
+            "stage": self.stage,
+            "step": step,
+            "wall_s": round(wall - self._wall, 4),
+            "cpu_s": round(cpu - self._cpu, 4),
+            "rows": None if rows is None else int(rows),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        # the write itself is not part of the next step
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+
+
+def read(path: Path) -> list[dict]:
+    path = Path(path)
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
@@ -0,0 +1,254 @@
+"""
+Benchmark: end-to-end pipeline scaling with stored baselines and a regression gate.
+
+`run` executes make_sample_data -> run_etl -> run_checks -> train -> run_monitoring at
+each scale (rows of synthetic RAW data) in a scratch copy of the package, so the repo's
+data, warehouse and models are never touched. Per stage it records, from the stage
+process (os.wait4, so worker processes the stage waited for are included):
+- wall_s, cpu_s (user + system), peak_rss_mb, rows_per_s (scale / wall time)
+and per sub-step the timings the stage reports itself (monitoring/timings.py: wall,
+CPU, rows, peak RSS so far). Results go to a JSON file; --save-baseline also stores
+them as the baseline to compare later runs with.
+
+`compare` matches stages and sub-steps of two result files by (scale, stage, step) and
+flags a regression when a metric grows by more than --tolerance AND by more than an
+absolute noise floor (--min-seconds for times, --min-mb for memory); it exits with
+status 1 when anything regressed.
+
+Both commands print rows/s per stage and scale: a stage whose rows/s falls as the
+scale grows is where the pipeline stops scaling.
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.scripts.benchmark_pipeline run --scales 55000 1000000 10000000 --save-baseline
+  python -m v2_mlops_modernisation.scripts.benchmark_pipeline run --scales 55000
+  python -m v2_mlops_modernisation.scripts.benchmark_pipeline compare
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from v2_mlops_modernisation.monitoring import timings
+from v2_mlops_modernisation.scripts.make_sample_data import Config as SampleConfig
+
+
+PACKAGE = Path(__file__).resolve().parents[1]
+BENCH_DIR = PACKAGE / "reports" / "benchmarks"
+DEFAULT_SCALES = [55_000, 1_000_000, 10_000_000]
+METRICS = {"wall_s": "s", "cpu_s": "s", "peak_rss_mb": "mb"}
+
+# Generated outputs that are not copied into the scratch workspace
+_IGNORE = shutil.ignore_patterns("__pycache__", "raw", "staged", "curated", "parquet", "feature_cache",
+                                 "store", "figure_data", "*.db", "*.db-wal", "*.db-shm", "benchmarks")
+
+
+def stage_commands(rows: int, args: argparse.Namespace) -> list[tuple[str, list[str]]]:
+    sample = SampleConfig()
+    patients = max(1, round(rows * sample.n_patients / sample.n_rows))
+    return [
+        ("make_sample_data", ["-m", "v2_mlops_modernisation.scripts.make_sample_data", "--engine", "vectorized",
+                              "--rows", str(rows), "--patients", str(patients), "--workers", str(args.workers)]),
+        ("run_etl", ["-m", "v2_mlops_modernisation.etl.run_etl", *shlex.split(args.etl_args)]),
+        ("run_checks", ["-m", "v2_mlops_modernisation.dq_data_quality.run_checks"]),
+        ("train", ["-m", "v2_mlops_modernisation.ml.train", *shlex.split(args.train_args)]),
+        ("run_monitoring", ["-m", "v2_mlops_modernisation.monitoring.run_monitoring"]),
+    ]
+
+
+def make_workspace(root: Path) -> Path:
+    shutil.copytree(PACKAGE, root / PACKAGE.name, ignore=_IGNORE)
+    return root
+
+
+def run_stage(name: str, argv: list[str], workspace: Path, rows: int, log_path: Path, timeout: float | None) -> dict:
+    steps_path = workspace / f"steps-{name}.jsonl"
+    env = {**os.environ, "PYTHONPATH": str(workspace), timings.ENV_VAR: str(steps_path), "MPLBACKEND": "Agg"}
+    with open(log_path, "ab") as log:
+        log.write(f"\n=== {name}: {' '.join(argv)}\n".encode("utf-8"))
+        log.flush()
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, *argv], cwd=workspace, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # the timer only kills: the child must be reaped by wait4 below to get its rusage
+        killed = threading.Event()
+        timer = threading.Timer(timeout, lambda: (killed.set(), proc.kill())) if timeout else None
+        if timer is not None:
+            timer.start()
+        try:
+            # rusage of this stage's process (and the children it waited for)
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            if timer is not None:
+                timer.cancel()
+        wall = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    steps = []
+    for rec in timings.read(steps_path):
+        rec = {k: v for k, v in rec.items() if k != "stage"}
+        rec["rows_per_s"] = round(rec["rows"] / rec["wall_s"], 1) if rec.get("rows") and rec["wall_s"] > 0 else None
+        steps.append(rec)
+    peak_kib = usage.ru_maxrss if sys.platform != "darwin" else usage.ru_maxrss / 1024
+    return {
+        "stage": name,
+        "returncode": proc.returncode,
+        "timed_out": killed.is_set(),
+        "wall_s": round(wall, 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_mb": round(peak_kib / 1024, 1),
+        "rows": rows,
+        "rows_per_s": round(rows / wall, 1) if wall > 0 else None,
+        "steps": steps,
+    }
+
+
+def run_scale(rows: int, args: argparse.Namespace) -> list[dict]:
+    root = Path(tempfile.mkdtemp(prefix=f"bench-{rows}-", dir=args.workdir))
+    workspace = make_workspace(root)
+    log_path = root / "benchmark.log"
+    results = []
+    try:
+        for name, argv in stage_commands(rows, args):
+            result = {"scale": rows, **run_stage(name, argv, workspace, rows, log_path, args.timeout)}
+            results.append(result)
+            print(json.dumps({k: v for k, v in result.items() if k != "steps"}))
+            if result["returncode"] != 0:
+                # later stages need this one's outputs
+                reason = "timed out" if result["timed_out"] else "failed"
+                print(f"[WARN] {name} {reason} at {rows:,} rows; see {log_path}")
+                args.keep = True
+                break
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+        else:
+            print(f"[OK] Workspace kept: {root}")
+    return results
+
+
+def scaling_table(results: list[dict]) -> str:
+    """rows/s per stage (rows) and scale (columns)."""
+    scales = sorted({r["scale"] for r in results})
+    stages = list(dict.fromkeys(r["stage"] for r in results))
+    by_key = {(r["scale"], r["stage"]): r for r in results}
+    lines = [f"{'stage':<18}" + "".join(f"{s:>14,}" for s in scales)]
+    for stage in stages:
+        cells = []
+        for s in scales:
+            r = by_key.get((s, stage))
+            cell = "-" if r is None or r["returncode"] else f"{r['rows_per_s']:,.0f}"
+            cells.append(f"{cell:>14}")
+        lines.append(f"{stage:<18}" + "".join(cells))
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+def flatten(doc: dict) -> dict[tuple[int, str, str], dict]:
+    """(scale, stage, step) -> metrics; the whole stage is step "_total"."""
+    out = {}
+    for r in doc["results"]:
+        if r["returncode"] != 0:
+            continue
+        out[(r["scale"], r["stage"], "_total")] = r
+        for step in r["steps"]:
+            out[(r["scale"], r["stage"], step["step"])] = step
+    return out
+
+
+def compare(baseline: dict, current: dict, tolerance: float, min_seconds: float, min_mb: float) -> list[dict]:
+    base, cur = flatten(baseline), flatten(current)
+    floors = {"s": min_seconds, "mb": min_mb}
+    rows = []
+    for key in sorted(set(base) & set(cur), key=lambda k: (k[0], k[1], k[2] != "_total", k[2])):
+        for metric, unit in METRICS.items():
+            b, c = base[key].get(metric), cur[key].get(metric)
+            if b is None or c is None:
+                continue
+            ratio = c / b if b > 0 else float("inf") if c > 0 else 1.0
+            regressed = ratio > 1 + tolerance and c - b > floors[unit]
+            rows.append({"scale": key[0], "stage": key[1], "step": key[2], "metric": metric,
+                         "baseline": b, "current": c, "ratio": round(ratio, 3), "regressed": regressed})
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="End-to-end pipeline scaling benchmark and regression gate.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="benchmark every stage at each scale")
+    run.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES, help="RAW rows per run")
+    run.add_argument("--out", type=Path, default=BENCH_DIR / "pipeline_latest.json")
+    run.add_argument("--save-baseline", action="store_true", help="also write the results as the baseline")
+    run.add_argument("--baseline", type=Path, default=BENCH_DIR / "pipeline_baseline.json")
+    run.add_argument("--workers", type=int, default=1, help="make_sample_data worker processes")
+    run.add_argument("--etl-args", default="", help='extra run_etl arguments, e.g. "--chunk-rows 500000"')
+    run.add_argument("--train-args", default="", help='extra train arguments, e.g. "--backend hgb"')
+    run.add_argument("--workdir", type=Path, default=None, help="parent directory of the scratch workspaces")
+    run.add_argument("--timeout", type=float, default=None, help="seconds per stage before it is killed")
+    run.add_argument("--keep", action="store_true", help="keep the scratch workspaces")
+
+    cmp_ = sub.add_parser("compare", help="flag regressions of a run against the baseline")
+    cmp_.add_argument("--baseline", type=Path, default=BENCH_DIR / "pipeline_baseline.json")
+    cmp_.add_argument("--current", type=Path, default=BENCH_DIR / "pipeline_latest.json")
+    cmp_.add_argument("--tolerance", type=float, default=0.2, help="allowed relative growth (0.2 = +20%%)")
+    cmp_.add_argument("--min-seconds", type=float, default=0.5, help="ignore time growth below this")
+    cmp_.add_argument("--min-mb", type=float, default=64.0, help="ignore memory growth below this")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    if args.command == "compare":
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        current = json.loads(args.current.read_text(encoding="utf-8"))
+        rows = compare(baseline, current, args.tolerance, args.min_seconds, args.min_mb)
+        for r in rows:
+            if r["regressed"]:
+                print(f"[REGRESSION] {r['scale']:>11,} {r['stage']}/{r['step']} {r['metric']}: "
+                      f"{r['baseline']} -> {r['current']} (x{r['ratio']})")
+        print(scaling_table(current["results"]))
+        n_bad = sum(r["regressed"] for r in rows)
+        print(f"[{'FAIL' if n_bad else 'OK'}] {n_bad} regressions in {len(rows)} comparisons "
+              f"(tolerance +{args.tolerance:.0%})")
+        raise SystemExit(1 if n_bad else 0)
+
+    results = []
+    for rows in args.scales:
+        results.extend(run_scale(rows, args))
+    doc = {
+        "created_utc": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scales": args.scales,
+        "results": results,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+    print(scaling_table(results))
+    print(f"[OK] Results: {args.out}" + (f" (baseline: {args.baseline})" if args.save_baseline else ""))
+
+
+if __name__ == "__main__":
+    main()
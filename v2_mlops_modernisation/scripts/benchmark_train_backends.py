@@ -0,0 +1,114 @@
+"""
+Benchmark: training backends (ml/backends.py) on the same time split.
+
+For each backend the curated fact is encoded with that backend's encoding (one-hot or
+ordinal) and the classifier is fitted on rows before the split date. Reported per backend:
+- encode_s: fit + transform of the preprocessor (what the feature cache saves on a hit)
+- fit_s and peak_fit_mb (tracemalloc peak of Python/NumPy allocations during fit)
+- predict_rows_per_s: full pipeline predict_proba on the raw test frame (API-like path,
+  preprocessing included)
+- roc_auc on the test rows, and the design-matrix width
+
+Without a curated fact (no ETL run yet) rows are generated with the sample-data generator.
+
+Usage (from the repository root):
+  python -m v2_mlops_modernisation.scripts.benchmark_train_backends
+  python -m v2_mlops_modernisation.scripts.benchmark_train_backends --backends hgb --rows 500000
+"""
+
+from __future__ import annotations
+
+from dataclasses import replace
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.pipeline import Pipeline
+
+from v2_mlops_modernisation.etl import run_etl
+from v2_mlops_modernisation.features import vocab
+from v2_mlops_modernisation.features.derivations import model_frame
+from v2_mlops_modernisation.ml import backends, feature_cache, train
+from v2_mlops_modernisation.scripts.make_sample_data import Config as SampleConfig, make_raw_chunk
+from v2_mlops_modernisation.storage import parquet_store
+
+
+def load_rows(rows: int | None) -> tuple[pd.DataFrame, dict[str, list[str]]]:
+    if rows is None:
+        try:
+            vocabulary = parquet_store.vocabulary()
+            return vocab.encode(train.load_fact(columns=feature_cache.INPUT_COLUMNS), vocabulary), vocabulary
+        except FileNotFoundError:
+            rows = SampleConfig().n_rows
+    cfg = replace(SampleConfig(), n_rows=rows)
+    df_neigh, df_clinic = run_etl.load_reference()
+    raw = make_raw_chunk(cfg, 0, cfg.n_rows, df_neigh, df_clinic)
+    stage = run_etl.transform_stage(raw.astype({"appointment_datetime": str, "booking_datetime": str}))
+    vocabulary = vocab.update(vocab.from_reference(df_neigh, df_clinic), stage)
+    return vocab.encode(run_etl.build_fact(stage), vocabulary), vocabulary
+
+
+def run_backend(name: str, df: pd.DataFrame, vocabulary: dict[str, list[str]], split_date: str,
+                random_state: int) -> dict:
+    backend = backends.get(name)
+    categories = feature_cache.encoder_categories(vocabulary, df)
+
+    t0 = time.perf_counter()
+    fm = feature_cache.build(df, split_date, categories, encoding=backend.encoding)
+    encode_s = time.perf_counter() - t0
+
+    clf = backend.make_estimator(categories, random_state)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    clf.fit(fm.X_train, fm.y_train)
+    fit_s = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pipe = Pipeline([("pre", fm.preprocessor), ("clf", clf)])
+    X_test = model_frame(df[~feature_cache.split_mask(df, split_date)])
+    t0 = time.perf_counter()
+    proba = pipe.predict_proba(X_test)[:, 1]
+    predict_s = time.perf_counter() - t0
+
+    row = {
+        "backend": name,
+        "n_train": int(fm.X_train.shape[0]),
+        "n_test": int(fm.X_test.shape[0]),
+        "width": int(fm.X_train.shape[1]),
+        "encode_s": round(encode_s, 3),
+        "fit_s": round(fit_s, 3),
+        "iterations": int(np.max(clf.n_iter_)),
+        "peak_fit_mb": round(peak / 2**20, 1),
+        "predict_rows_per_s": int(len(X_test) / predict_s),
+        "roc_auc": round(float(roc_auc_score(fm.y_test, proba)), 4),
+    }
+    print(json.dumps(row))
+    return row
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Benchmark training backends on the same time split.")
+    ap.add_argument("--backends", nargs="+", choices=sorted(backends.BACKENDS), default=sorted(backends.BACKENDS))
+    ap.add_argument("--rows", type=int, default=None,
+                    help="generate this many sample rows instead of reading the curated fact")
+    ap.add_argument("--split-date", default=train.Config.split_date)
+    ap.add_argument("--seed", type=int, default=train.Config.random_state)
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    df, vocabulary = load_rows(args.rows)
+    df["date_key"] = pd.to_datetime(df["date_key"])
+    for name in args.backends:
+        run_backend(name, df, vocabulary, args.split_date, args.seed)
+    print("[OK] training backend benchmark complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,28 @@ Policy: Synthetic data only (portfolio-safe).
 
 This generator intentionally injects a small amount of data defects into the RAW layer
 to demonstrate Data Quality (DQ) gates in V2.
+
+Two engines are available:
+- loop (default): the original row-by-row generator used for the committed sample outputs
+- vectorized: draws whole columns with NumPy and writes seed-reproducible chunks, for
+  multi-million-row load tests (optionally sharded across worker processes)
+
+Usage:
+  python make_sample_data.py
+  python make_sample_data.py --engine vectorized --rows 10000000 --workers 8
+  python make_sample_data.py --engine vectorized --rows 100000000 --workers 32 --shards
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
 from datetime import datetime, timedelta
+import argparse
+import binascii
 import random
+import shutil
 import uuid
 
 import numpy as np
@@ -36,6 +50,22 @@ class Config:
     pct_negative_lead_time: float = 0.004
     pct_duplicate_appointment_id: float = 0.004
 
+    # Vectorized engine: rows per chunk (each chunk has its own derived seed)
+    chunk_rows: int = 1_000_000
+
+
+GENDERS = ["F", "M"]
+APPOINTMENT_TYPES = ["General", "Specialist", "Lab", "Follow-up"]
+BOOKING_CHANNELS = ["Online", "Phone", "Walk-in", "Referral"]
+
+RAW_COLUMNS = [
+    "appointment_id", "patient_id", "clinic_id", "neighbourhood_id",
+    "gender", "age", "chronic_conditions_count", "disability_flag",
+    "appointment_datetime", "booking_datetime",
+    "appointment_type", "booking_channel", "sms_reminder_sent",
+    "prior_no_show_count", "prior_show_count", "no_show",
+]
+
 
 def _rng(seed: int) -> random.Random:
     return random.Random(seed)
@@ -126,6 +156,27 @@ def _no_show_probability(row: dict) -> float:
     return float(max(0.01, min(0.90, p)))
 
 
+def _no_show_probability_vec(cols: dict[str, np.ndarray]) -> np.ndarray:
+    # Column-wise version of _no_show_probability (same coefficients, same clipping)
+    x = np.full(len(cols["lead_time_days"]), -1.2)
+
+    x += 0.018 * np.clip(cols["lead_time_days"], 0, 60)
+    x += 0.38 * np.minimum(6, cols["prior_no_show_count"])
+    x += 0.10 * cols["chronic_conditions_count"]
+    x += 0.35 * cols["deprivation_index"]
+
+    x -= 0.55 * (cols["sms_reminder_sent"] == 1)
+    x += 0.18 * np.isin(cols["appointment_type"], ["Specialist", "Lab"])
+    x -= 0.12 * (cols["booking_channel"] == "Walk-in")
+
+    hour = cols["appointment_hour"]
+    x += np.where(hour < 9, 0.10, np.where(hour >= 17, 0.08, 0.0))
+    x += 0.10 * (cols["appointment_is_weekend"] == 1)
+
+    p = 1 / (1 + np.exp(-x))
+    return np.clip(p, 0.01, 0.90)
+
+
 def make_raw_dataset(cfg: Config, base_dir: Path) -> pd.DataFrame:
     rng = _rng(cfg.seed)
     np.random.seed(cfg.seed)
@@ -245,11 +296,211 @@ def make_raw_dataset(cfg: Config, base_dir: Path) -> pd.DataFrame:
     return df
 
 
+def _uuid4_strings(rng: np.random.Generator, n: int) -> np.ndarray:
+    # Random (version 4) UUIDs drawn from the chunk generator, so ids are seed-reproducible
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = np.frombuffer(binascii.hexlify(raw.tobytes()), dtype=np.uint8).reshape(n, 32)
+    out = np.full((n, 36), ord("-"), dtype=np.uint8)
+    out[:, 0:8] = hexed[:, 0:8]
+    out[:, 9:13] = hexed[:, 8:12]
+    out[:, 14:18] = hexed[:, 12:16]
+    out[:, 19:23] = hexed[:, 16:20]
+    out[:, 24:36] = hexed[:, 20:32]
+    return out.view("S36").ravel().astype(str)
+
+
+def _inject_defects_vec(df: pd.DataFrame, cfg: Config, rng: np.random.Generator) -> None:
+    # Same defect mix as make_raw_dataset, applied in place within one chunk
+    n = len(df)
+
+    k = int(cfg.pct_invalid_neighbourhood * n)
+    if k > 0:
+        idx = rng.choice(n, k, replace=False)
+        df.loc[idx, "neighbourhood_id"] = "N999"
+
+    k = int(cfg.pct_negative_age * n)
+    if k > 0:
+        idx = rng.choice(n, k, replace=False)
+        df.loc[idx, "age"] = -1 * rng.integers(1, 5, size=k)
+
+    k = int(cfg.pct_age_over_120 * n)
+    if k > 0:
+        idx = rng.choice(n, k, replace=False)
+        df.loc[idx, "age"] = rng.integers(121, 140, size=k)
+
+    k = int(cfg.pct_negative_lead_time * n)
+    if k > 0:
+        idx = rng.choice(n, k, replace=False)
+        df.loc[idx, "booking_datetime"] = (df.loc[idx, "appointment_datetime"]
+                                           + pd.to_timedelta(rng.integers(1, 4, size=k), unit="D"))
+
+    k = int(cfg.pct_duplicate_appointment_id * n)
+    if k > 0:
+        idx = rng.choice(n, k, replace=False)
+        df.loc[idx, "appointment_id"] = df.loc[idx // 2, "appointment_id"].values
+
+
+def make_raw_chunk(cfg: Config, chunk_index: int, n_rows: int,
+                   df_neigh: pd.DataFrame, df_clinic: pd.DataFrame) -> pd.DataFrame:
+    """Generate one RAW chunk column-wise.
+
+    The chunk generator is seeded with (cfg.seed, chunk_index), so a chunk's content does
+    not depend on how many chunks exist, on the chunk order or on the worker that builds it.
+    """
+    rng = np.random.default_rng([cfg.seed, chunk_index])
+    n = n_rows
+
+    patient_ids = np.array([f"P{i+1:05d}" for i in range(cfg.n_patients)])
+    clinic_ids = df_clinic["clinic_id"].to_numpy()
+    neigh_ids = df_neigh["neighbourhood_id"].to_numpy()
+    deprivation = df_neigh["deprivation_index"].to_numpy(dtype=float)
+
+    start = np.datetime64(datetime.fromisoformat(cfg.start_date), "s")
+    end = np.datetime64(datetime.fromisoformat(cfg.end_date), "s") + np.timedelta64(86399, "s")
+    span = (end - start).astype(np.int64)
+
+    appt_dt = start + (rng.random(n) * span).astype(np.int64).astype("timedelta64[s]")
+    lead_days = np.maximum(0, rng.normal(9, 6, n)).astype(np.int64)
+    booking_dt = (appt_dt
+                  - lead_days.astype("timedelta64[D]")
+                  - rng.integers(0, 24, n).astype("timedelta64[h]"))
+
+    age = np.clip(rng.normal(38, 17, n), 0, 95).astype(np.int64)
+    gender = np.array(GENDERS)[rng.integers(0, len(GENDERS), n)]
+    chronic = np.clip(rng.normal(1.1, 1.2, n), 0, 5).astype(np.int64)
+    disability = (rng.random(n) < 0.07).astype(np.int64)
+
+    neigh_idx = rng.integers(0, len(neigh_ids), n)
+    clinic_idx = rng.integers(0, len(clinic_ids), n)
+    appointment_type = np.array(APPOINTMENT_TYPES)[rng.integers(0, len(APPOINTMENT_TYPES), n)]
+    booking_channel = np.array(BOOKING_CHANNELS)[rng.integers(0, len(BOOKING_CHANNELS), n)]
+
+    prior_no_show = np.clip(rng.normal(0.8, 1.3, n), 0, 6).astype(np.int64)
+    prior_show = np.clip(rng.normal(4.2, 3.5, n), 0, 20).astype(np.int64)
+    sms = (rng.random(n) < 0.55).astype(np.int64)
+
+    appt_day = appt_dt.astype("datetime64[D]")
+    hour = (appt_dt - appt_day).astype("timedelta64[h]").astype(np.int64)
+    # 1970-01-01 was a Thursday; shift so Monday == 0 like datetime.weekday()
+    is_weekend = (((appt_day.astype(np.int64) + 3) % 7) >= 5).astype(np.int64)
+
+    p_no_show = _no_show_probability_vec({
+        "lead_time_days": (appt_day - booking_dt.astype("datetime64[D]")).astype(np.int64),
+        "prior_no_show_count": prior_no_show,
+        "chronic_conditions_count": chronic,
+        "deprivation_index": deprivation[neigh_idx],
+        "sms_reminder_sent": sms,
+        "appointment_type": appointment_type,
+        "booking_channel": booking_channel,
+        "appointment_hour": hour,
+        "appointment_is_weekend": is_weekend,
+    })
+    no_show = (rng.random(n) < p_no_show).astype(np.int64)
+
+    df = pd.DataFrame({
+        "appointment_id": _uuid4_strings(rng, n),
+        "patient_id": patient_ids[rng.integers(0, cfg.n_patients, n)],
+        "clinic_id": clinic_ids[clinic_idx],
+        "neighbourhood_id": neigh_ids[neigh_idx],
+        "gender": gender,
+        "age": age,
+        "chronic_conditions_count": chronic,
+        "disability_flag": disability,
+        "appointment_datetime": appt_dt.astype("datetime64[ns]"),
+        "booking_datetime": booking_dt.astype("datetime64[ns]"),
+        "appointment_type": appointment_type,
+        "booking_channel": booking_channel,
+        "sms_reminder_sent": sms,
+        "prior_no_show_count": prior_no_show,
+        "prior_show_count": prior_show,
+        "no_show": no_show,
+    }, columns=RAW_COLUMNS)
+
+    _inject_defects_vec(df, cfg, rng)
+    return df
+
+
+def _chunk_sizes(cfg: Config) -> list[int]:
+    full, rest = divmod(cfg.n_rows, cfg.chunk_rows)
+    return [cfg.chunk_rows] * full + ([rest] if rest else [])
+
+
+def _write_chunk(cfg: Config, chunk_index: int, n_rows: int, ref_dir: Path, out_path: Path) -> Path:
+    df_neigh = pd.read_csv(ref_dir / "neighbourhood_master.csv")
+    df_clinic = pd.read_csv(ref_dir / "clinic_master.csv")
+    df = make_raw_chunk(cfg, chunk_index, n_rows, df_neigh, df_clinic)
+    df.to_csv(out_path, index=False, date_format="%Y-%m-%d %H:%M:%S")
+    return out_path
+
+
+def make_raw_dataset_vectorized(cfg: Config, base_dir: Path, workers: int = 1,
+                                shards: bool = False) -> list[Path]:
+    """Write the RAW dataset in seed-reproducible chunks.
+
+    With shards=False the chunks are concatenated (in chunk order) into
+    raw/appointments_raw.csv. With shards=True each chunk stays as
+    raw/appointments_raw_part-NNNNN.csv. The output bytes are the same for any
+    number of workers.
+    """
+    _make_reference(cfg, base_dir)
+    ref_dir = base_dir / "reference"
+    raw_dir = base_dir / "raw"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+
+    sizes = _chunk_sizes(cfg)
+    parts = [raw_dir / f"appointments_raw_part-{i:05d}.csv" for i in range(len(sizes))]
+
+    if workers <= 1:
+        for i, n in enumerate(sizes):
+            _write_chunk(cfg, i, n, ref_dir, parts[i])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_write_chunk, cfg, i, n, ref_dir, parts[i]) for i, n in enumerate(sizes)]
+            for f in futures:
+                f.result()
+
+    if shards:
+        return parts
+
+    out_path = raw_dir / "appointments_raw.csv"
+    with open(out_path, "wb") as out:
+        for i, part in enumerate(parts):
+            with open(part, "rb") as f:
+                if i > 0:
+                    f.readline()  # header
+                shutil.copyfileobj(f, out, length=16 * 1024 * 1024)
+            part.unlink()
+    return [out_path]
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Generate the synthetic RAW appointments dataset.")
+    ap.add_argument("--engine", choices=["loop", "vectorized"], default="loop")
+    ap.add_argument("--rows", type=int, default=None, help="number of appointments (default: Config.n_rows)")
+    ap.add_argument("--patients", type=int, default=None, help="number of patients (default: Config.n_patients)")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--chunk-rows", type=int, default=None, help="vectorized engine: rows per chunk")
+    ap.add_argument("--workers", type=int, default=1, help="vectorized engine: worker processes")
+    ap.add_argument("--shards", action="store_true", help="vectorized engine: keep one CSV per chunk")
+    return ap.parse_args()
+
+
 def main() -> None:
+    args = _parse_args()
     base_dir = Path(__file__).resolve().parents[1] / "data"
     cfg = Config()
-    df = make_raw_dataset(cfg, base_dir)
-    print(f"[OK] Wrote RAW dataset: {len(df):,} rows -> {base_dir/'raw/appointments_raw.csv'}")
+    overrides = {"n_rows": args.rows, "n_patients": args.patients, "seed": args.seed, "chunk_rows": args.chunk_rows}
+    cfg = replace(cfg, **{k: v for k, v in overrides.items() if v is not None})
+
+    if args.engine == "vectorized":
+        paths = make_raw_dataset_vectorized(cfg, base_dir, workers=args.workers, shards=args.shards)
+        where = paths[0] if len(paths) == 1 else f"{len(paths)} shards in {base_dir/'raw'}"
+        print(f"[OK] Wrote RAW dataset: {cfg.n_rows:,} rows -> {where}")
+    else:
+        df = make_raw_dataset(cfg, base_dir)
+        print(f"[OK] Wrote RAW dataset: {len(df):,} rows -> {base_dir/'raw/appointments_raw.csv'}")
     print(f"[OK] Reference masters written to: {base_dir/'reference'}")
 
 
@@ -0,0 +1,140 @@
+"""
+CSV side outputs (V2): the BI copies of the staged and curated tables.
+
+Each table stays one CSV file (data/staged/<table>.csv, data/curated/<table>.csv).
+Date-keyed tables (parquet_store.PARTITIONED) are written in month order, so the
+rows of a month are contiguous and later months sit at the end of the file. An
+incremental refresh then replaces rows by key like parquet_store.upsert_table does
+for month partitions: it finds the start of the earliest month it touches by scanning
+the file backwards, and rewrites only the tail from there (new bookings and
+re-bookings land in the latest months, so the tail is small).
+
+Untouched rows are copied as text, so they keep their formatting byte for byte.
+
+table_writer replaces a table frame by frame (streaming ETL, batch scores): rows are
+gathered per month in files aside and joined in month order at the end, so the file
+matches write_table over the whole table without holding it.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+import csv
+import io
+import os
+import shutil
+
+import pandas as pd
+
+from v2_mlops_modernisation.storage import parquet_store
+
+
+BLOCK_BYTES = 1 << 20
+
+
+def _month_order(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    if name not in parquet_store.PARTITIONED:
+        return df
+    months = df[parquet_store.PARTITIONED[name]].astype(str).str.slice(0, 7)
+    return df.iloc[months.argsort(kind="stable")]
+
+
+def write_table(df: pd.DataFrame, path: Path, name: str, **to_csv) -> None:
+    """Replace a CSV (month-ordered for date-keyed tables); written aside, swapped in by rename."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    _month_order(df, name).to_csv(tmp, index=False, **to_csv)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def table_writer(path: Path, name: str, **to_csv) -> Iterator[Callable[[pd.DataFrame], None]]:
+    """Replace a CSV frame by frame: yields write(df). An error leaves the old file in place."""
+    parts = path.with_name(f".{path.name}.parts")
+    shutil.rmtree(parts, ignore_errors=True)
+    parts.mkdir(parents=True)
+    header: list[str] = []
+
+    def write(df: pd.DataFrame) -> None:
+        header[:] = header or list(df.columns)
+        if name in parquet_store.PARTITIONED:
+            groups = df.groupby(df[parquet_store.PARTITIONED[name]].astype(str).str.slice(0, 7), sort=False)
+        else:
+            groups = [("all", df)]
+        for month, rows in groups:
+            rows[header].to_csv(parts / f"{month}.csv", mode="a", header=False, index=False, **to_csv)
+
+    try:
+        yield write
+        tmp = path.with_name(f".{path.name}.tmp")
+        with tmp.open("wb") as out:
+            out.write(pd.DataFrame(columns=header).to_csv(index=False).encode("utf-8"))
+            for part in sorted(parts.iterdir()):
+                with part.open("rb") as f:
+                    shutil.copyfileobj(f, out)
+        os.replace(tmp, path)
+    finally:
+        shutil.rmtree(parts, ignore_errors=True)
+
+
+def _read_text(data: bytes, columns: list[str]) -> pd.DataFrame:
+    """CSV rows (no header) as strings, so they are written back unchanged."""
+    if not data:
+        return pd.DataFrame(columns=columns, dtype=object)
+    return pd.read_csv(io.BytesIO(data), names=columns, header=None, dtype=str, keep_default_na=False)
+
+
+def _month(line: bytes, col: int) -> str:
+    return next(csv.reader([line.decode("utf-8")]))[col][:7]
+
+
+def _tail_offset(f, data_start: int, col: int, month: str) -> int:
+    """Byte offset of the first of the trailing rows dated in or after month."""
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    carry = b""
+    while pos > data_start:
+        step = min(BLOCK_BYTES, pos - data_start)
+        pos -= step
+        f.seek(pos)
+        block = f.read(step) + carry
+        lines = block.split(b"\n")
+        # unless the block starts at the first row, its first piece may be part of a row
+        carry = lines.pop(0) if pos > data_start else b""
+        start = pos + len(block)
+        for line in reversed(lines):
+            start -= len(line)
+            if line and _month(line, col) < month:
+                return start + len(line) + 1
+            start -= 1
+    return data_start
+
+
+def upsert_table(delta: pd.DataFrame, path: Path, name: str, key: str,
+                 stale_months: set[str] | None = None, keys=None, **to_csv) -> None:
+    """Replace rows by key in a month-ordered CSV, rewriting only the tail it touches.
+
+    stale_months lists the months that held previous versions of the rows (as for
+    parquet_store.upsert_table); keys are the key values whose rows are replaced
+    (default: delta's keys), so keys missing from delta are deleted. to_csv must match
+    the options the table was written with.
+    """
+    date_col = parquet_store.PARTITIONED[name]
+    months = parquet_store.months(delta[date_col]) | set(stale_months or ())
+    if not months:
+        return
+    keys = set(delta[key] if keys is None else keys)
+
+    with path.open("rb+") as f:
+        header = f.readline()
+        columns = next(csv.reader([header.decode("utf-8")]))
+        offset = _tail_offset(f, len(header), columns.index(date_col), min(months))
+        f.seek(offset)
+        tail = _read_text(f.read(), columns)
+        new = _read_text(delta.reindex(columns=columns).to_csv(index=False, header=False, **to_csv).encode("utf-8"),
+                         columns)
+        rows = pd.concat([tail[~tail[key].isin(keys)], new], ignore_index=True)
+        f.seek(offset)
+        f.truncate()
+        f.write(_month_order(rows, name).to_csv(index=False, header=False).encode("utf-8"))
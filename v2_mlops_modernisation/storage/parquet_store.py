@@ -0,0 +1,231 @@
+"""
+Columnar storage layer (V2): staged and curated tables as typed Parquet.
+
+Layout (under v2_mlops_modernisation/data/parquet/):
+- <layer>/<table>/date_month=YYYY-MM/part-*.parquet  for date-keyed tables
+- <layer>/<table>/part-*.parquet                     for the other tables
+
+write_table replaces a table from one DataFrame; table_writer replaces it frame by
+frame (e.g. batch scores), so the writer never holds the whole table.
+
+Datetimes are stored as timestamps, counts/flags as small integers and low-cardinality
+strings as dictionary-encoded columns (features/vocab.py), so readers no longer re-parse
+CSV text and load those columns as Categorical with stable codes. Readers get column
+projection and a date-range predicate that prunes month partitions and row groups
+(files are written sorted by date).
+
+CSV files under data/staged and data/curated remain an optional side output for BI.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from v2_mlops_modernisation.features import vocab
+
+
+PARTITION_COLUMN = "date_month"
+
+# table -> ISO date column (YYYY-MM-DD) used for month partitions and range filters
+PARTITIONED = {
+    "appointments_staged": "appointment_date",
+    "fact_appointments": "date_key",
+    "fact_predictions": "date_key",
+    "kpi_daily": "date_key",
+    "dim_date": "date_key",
+}
+
+
+def default_root() -> Path:
+    return Path(__file__).resolve().parents[1] / "data" / "parquet"
+
+
+def table_path(layer: str, name: str, root: Path | None = None) -> Path:
+    return (root or default_root()) / layer / name
+
+
+def exists(layer: str, name: str, root: Path | None = None) -> bool:
+    return table_path(layer, name, root).is_dir()
+
+
+def _partitioning() -> ds.Partitioning:
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+
+
+def vocabulary(root: Path | None = None) -> dict[str, list[str]]:
+    """Category vocabularies kept with the data (<data>/reference next to <data>/parquet)."""
+    return vocab.load((root or default_root()).parent / "reference" / vocab.VOCAB_FILE)
+
+
+def months(dates) -> set[str]:
+    """Month partitions (YYYY-MM) of ISO dates."""
+    return set(pd.Series(list(dates), dtype=object).astype(str).str.slice(0, 7))
+
+
+def _dictionary_int32(schema: pa.Schema) -> pa.Schema:
+    # One dictionary index type for every file, however many categories a column has
+    for i, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type)))
+    return schema
+
+
+def _to_arrow(df: pd.DataFrame, name: str, root: Path | None = None, schema: pa.Schema | None = None) -> pa.Table:
+    df = vocab.encode(df, vocabulary(root))
+    if name in PARTITIONED:
+        date_col = PARTITIONED[name]
+        df = df.sort_values(date_col, kind="stable")
+        df = df.assign(**{PARTITION_COLUMN: df[date_col].astype(str).str.slice(0, 7)})
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    return table.cast(_dictionary_int32(table.schema))
+
+
+def _write(table: pa.Table, name: str, path: Path, behavior: str, prefix: str | None = None) -> None:
+    kwargs = {"partitioning": _partitioning()} if name in PARTITIONED else {}
+    ds.write_dataset(
+        table, path, format="parquet",
+        basename_template=f"part-{prefix or uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior=behavior,
+        **kwargs,
+    )
+
+
+def write_table(df: pd.DataFrame, layer: str, name: str, root: Path | None = None) -> Path:
+    """Replace a table. The new files are written aside and swapped in by rename."""
+    path = table_path(layer, name, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    _write(_to_arrow(df, name, root), name, tmp, "error")
+    _swap(tmp, path, name)
+    return path
+
+
+@contextmanager
+def table_writer(layer: str, name: str, root: Path | None = None) -> Iterator[Callable[[pd.DataFrame], None]]:
+    """Replace a table frame by frame: yields write(df), which adds each frame as new files.
+
+    The files are written aside and swapped in by rename when the block exits cleanly
+    (like write_table); an error discards them. The first frame fixes the schema. Files
+    are numbered in write order, so a read returns the rows of a partition in the order
+    they were written.
+    """
+    path = table_path(layer, name, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    schema: pa.Schema | None = None
+    frames = 0
+
+    def write(df: pd.DataFrame) -> None:
+        nonlocal schema, frames
+        table = _to_arrow(df, name, root, schema)
+        schema = schema or table.schema
+        _write(table, name, tmp, "overwrite_or_ignore", prefix=f"{frames:06d}")
+        frames += 1
+
+    try:
+        yield write
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    _swap(tmp, path, name)
+
+
+def _swap(tmp: Path, path: Path, name: str) -> None:
+    old = path.with_name(f".{name}.old-{os.getpid()}")
+    if path.exists():
+        path.rename(old)
+    tmp.rename(path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _dataset(layer: str, name: str, root: Path | None = None) -> ds.Dataset:
+    path = table_path(layer, name, root)
+    if not path.is_dir():
+        raise FileNotFoundError(f"Missing Parquet table: {path}. Run ETL first.")
+    partitioning = _partitioning() if name in PARTITIONED else None
+    return ds.dataset(path, format="parquet", partitioning=partitioning)
+
+
+def _schema(dataset: ds.Dataset) -> pa.Schema:
+    schema = dataset.schema
+    idx = schema.get_field_index(PARTITION_COLUMN)
+    return schema.remove(idx) if idx >= 0 else schema
+
+
+def append_table(df: pd.DataFrame, layer: str, name: str, root: Path | None = None) -> None:
+    """Add rows as new files (append-only tables such as the staged layer)."""
+    if not exists(layer, name, root):
+        write_table(df, layer, name, root)
+        return
+    schema = _schema(_dataset(layer, name, root))
+    table = _to_arrow(df.reindex(columns=schema.names), name, root, schema.append(pa.field(PARTITION_COLUMN, pa.string())))
+    _write(table, name, table_path(layer, name, root), "overwrite_or_ignore")
+
+
+def upsert_table(delta: pd.DataFrame, layer: str, name: str, key: str,
+                 stale_months: set[str] | None = None, root: Path | None = None, keys=None) -> None:
+    """Replace rows by key, rewriting only the month partitions they touch.
+
+    stale_months lists the partitions that held previous versions of the rows (their
+    old dates), so moved rows are removed from where they used to live. keys are the
+    key values whose rows are replaced (default: delta's keys); keys missing from
+    delta are deleted.
+    """
+    date_col = PARTITIONED[name]
+    touched = months(delta[date_col]) | set(stale_months or ())
+    if not touched:
+        return
+    keys = delta[key] if keys is None else pd.Series(list(keys), dtype=object)
+    dataset = _dataset(layer, name, root)
+    schema = _schema(dataset)
+
+    current = dataset.to_table(filter=ds.field(PARTITION_COLUMN).isin(sorted(touched))).to_pandas()
+    current = current.drop(columns=[PARTITION_COLUMN])
+    merged = pd.concat([current[~current[key].isin(keys)], delta.reindex(columns=schema.names)],
+                       ignore_index=True)
+    table = _to_arrow(merged[schema.names], name, root, schema.append(pa.field(PARTITION_COLUMN, pa.string())))
+    # delete_matching clears every partition written here; partitions emptied by a move
+    # are cleared explicitly
+    for month in touched - set(table.column(PARTITION_COLUMN).to_pylist()):
+        shutil.rmtree(table_path(layer, name, root) / f"{PARTITION_COLUMN}={month}", ignore_errors=True)
+    _write(table, name, table_path(layer, name, root), "delete_matching")
+
+
+def read_table(layer: str, name: str, columns: list[str] | None = None,
+               date_range: tuple[str, str] | None = None, root: Path | None = None) -> pd.DataFrame:
+    """Read a table with optional column projection and inclusive date range (YYYY-MM-DD).
+
+    Vocabulary columns come back as Categorical with the persisted (stable) codes.
+    """
+    dataset = _dataset(layer, name, root)
+    flt = None
+    if date_range is not None:
+        date_col = PARTITIONED[name]
+        start, end = (str(d)[:10] for d in date_range)
+        flt = ((ds.field(PARTITION_COLUMN) >= start[:7]) & (ds.field(PARTITION_COLUMN) <= end[:7])
+               & (ds.field(date_col) >= start) & (ds.field(date_col) <= end))
+    cols = columns if columns is not None else _schema(dataset).names
+    return vocab.encode(dataset.to_table(columns=cols, filter=flt).to_pandas(), vocabulary(root))
+
+
+def iter_batches(layer: str, name: str, columns: list[str] | None = None, batch_rows: int = 100_000,
+                 root: Path | None = None):
+    """Stream a table as DataFrames of at most batch_rows rows, in file order (bounded memory)."""
+    dataset = _dataset(layer, name, root)
+    vocabulary_ = vocabulary(root)
+    cols = columns if columns is not None else _schema(dataset).names
+    for batch in dataset.to_batches(columns=cols, batch_size=batch_rows):
+        if batch.num_rows:
+            yield vocab.encode(batch.to_pandas(), vocabulary_)
@@ -0,0 +1,246 @@
+"""
+SQLite warehouse bulk loader (V2).
+
+Replaces whole tables while keeping the DDL declared in warehouse/schema.sql (typed
+columns, PRIMARY KEYs), instead of letting pandas.to_sql drop and recreate them untyped.
+
+A load:
+- sets bulk-load pragmas on its connection (in-memory rollback journal,
+  synchronous=NORMAL, large page cache, in-memory temp store for index builds)
+- opens ONE transaction
+- creates each table under a temporary name from its declared DDL (columns the DDL
+  does not declare, e.g. model scores, are appended with a type inferred from dtype)
+- inserts rows with executemany in batches (a table may be given as a stream of frames,
+  e.g. the fact of a streaming ETL run, so it is never held in memory at once)
+- drops the old tables, renames the new ones into place and builds secondary indexes
+- commits
+
+Readers therefore see either the previous warehouse or the new one, never a partially
+loaded table, and a failed load rolls back to the previous warehouse. The in-memory
+journal avoids writing every loaded page twice (a WAL or on-disk journal roughly doubles
+the load time); the trade-off is that an OS crash during COMMIT can leave the file
+damaged, which is acceptable for a warehouse that is rebuilt from RAW by re-running ETL.
+
+Rows must be unique on the declared PRIMARY KEY: a table that repeats a key raises
+ValueError and the load rolls back. Duplicate appointment_ids are resolved upstream,
+at staging (run_etl.dedupe_appointments, "last record wins" like the incremental
+upsert), so every layer holds the same rows.
+
+update_columns applies column-only changes (e.g. batch scores) as UPDATE ... WHERE
+<primary key> = ? in one transaction instead of replacing the whole table.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Iterable
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+BATCH_ROWS = 50_000
+
+PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "NORMAL",
+    "cache_size": -262144,  # KiB -> 256 MiB
+    "temp_store": "MEMORY",
+}
+
+# Secondary indexes, built after the rows are loaded (dashboard covering indexes live
+# in warehouse/queries.py)
+SECONDARY_INDEXES = {
+    "fact_appointments": ["patient_id"],
+}
+
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*?)\)\s*;",
+                           re.IGNORECASE | re.DOTALL)
+_CONSTRAINT_WORDS = ("PRIMARY", "UNIQUE", "CHECK", "FOREIGN", "CONSTRAINT")
+
+
+def _split_definitions(body: str) -> list[str]:
+    defs, depth, current = [], 0, ""
+    for ch in body:
+        depth += (ch == "(") - (ch == ")")
+        if ch == "," and depth == 0:
+            defs.append(current.strip())
+            current = ""
+        else:
+            current += ch
+    if current.strip():
+        defs.append(current.strip())
+    return defs
+
+
+def parse_schema(sql: str) -> dict[str, list[str]]:
+    """Table name -> column and constraint definitions, from CREATE TABLE statements."""
+    sql = re.sub(r"--[^\n]*", "", sql)
+    return {m.group(1): _split_definitions(m.group(2)) for m in _CREATE_TABLE.finditer(sql)}
+
+
+def _is_constraint(definition: str) -> bool:
+    return definition.split(None, 1)[0].upper() in _CONSTRAINT_WORDS
+
+
+def _sql_type(s: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_integer_dtype(s):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(s):
+        return "REAL"
+    return "TEXT"
+
+
+def table_definitions(df: pd.DataFrame, declared: list[str] | None = None) -> list[str]:
+    """Declared definitions plus inferred ones for frame columns the DDL does not list."""
+    defs = list(declared or [])
+    known = {d.split(None, 1)[0].strip('"') for d in defs if not _is_constraint(d)}
+    columns = [d for d in defs if not _is_constraint(d)]
+    constraints = [d for d in defs if _is_constraint(d)]
+    extra = [f'"{c}" {_sql_type(df[c])}' for c in df.columns if c not in known]
+    return columns + extra + constraints
+
+
+def primary_key(declared: list[str] | None) -> list[str]:
+    for d in declared or []:
+        words = d.split()
+        if _is_constraint(d):
+            m = re.match(r"PRIMARY\s+KEY\s*\((.*)\)", d, re.IGNORECASE)
+            if m:
+                return [c.strip().strip('"') for c in m.group(1).split(",")]
+        elif re.search(r"\bPRIMARY\s+KEY\b", d, re.IGNORECASE):
+            return [words[0].strip('"')]
+    return []
+
+
+def _column_values(s: pd.Series) -> list:
+    """Python values sqlite3 can bind: datetimes as text, missing values as NULL."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        s = s.dt.strftime(DATETIME_FORMAT)
+    if s.hasnans or s.dtype == object or isinstance(s.dtype, pd.CategoricalDtype):
+        return s.astype(object).where(s.notna(), None).tolist()
+    return s.tolist()
+
+
+def sql_rows(df: pd.DataFrame):
+    """Row tuples for executemany, converted column-wise."""
+    return zip(*(_column_values(df[c]) for c in df.columns))
+
+
+def insert_rows(conn: sqlite3.Connection, table: str, df: pd.DataFrame, batch_rows: int = BATCH_ROWS) -> None:
+    cols = ", ".join(f'"{c}"' for c in df.columns)
+    marks = ", ".join("?" for _ in df.columns)
+    sql = f'INSERT INTO "{table}" ({cols}) VALUES ({marks})'
+    for start in range(0, len(df), batch_rows):
+        conn.executemany(sql, sql_rows(df.iloc[start:start + batch_rows]))
+
+
+def update_rows(conn: sqlite3.Connection, table: str, df: pd.DataFrame, key: str,
+                batch_rows: int = BATCH_ROWS) -> None:
+    """UPDATE the non-key columns of df by key (an indexed lookup per row); adds missing columns."""
+    existing = {r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')}
+    values = [c for c in df.columns if c != key]
+    for c in values:
+        if c not in existing:
+            conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{c}" {_sql_type(df[c])}')
+    assignments = ", ".join(f'"{c}" = ?' for c in values)
+    sql = f'UPDATE "{table}" SET {assignments} WHERE "{key}" = ?'
+    for start in range(0, len(df), batch_rows):
+        conn.executemany(sql, sql_rows(df.iloc[start:start + batch_rows][values + [key]]))
+
+
+def create_indexes(conn: sqlite3.Connection, table: str) -> None:
+    for col in SECONDARY_INDEXES.get(table, []):
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{table}_{col}" ON "{table}" ("{col}")')
+
+
+def _set_pragmas(conn: sqlite3.Connection) -> None:
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def bulk_load(db_path: Path, tables: dict[str, pd.DataFrame | Iterable[pd.DataFrame]], schema_sql: str = "",
+              finalize: Callable[[sqlite3.Connection], None] | None = None,
+              batch_rows: int = BATCH_ROWS) -> dict[str, dict[str, float]]:
+    """Replace tables in one transaction; returns rows and seconds per table.
+
+    Each table is a DataFrame or an iterable of DataFrames inserted one after another.
+    Rows must be unique on the declared PRIMARY KEY (duplicates are resolved upstream,
+    at staging); a table that is not raises ValueError and nothing is replaced.
+    finalize(conn) runs inside the same transaction, after the swap and before commit
+    (e.g. to record the ETL watermark together with the data it describes).
+    """
+    declared = parse_schema(schema_sql)
+    stats: dict[str, dict[str, float]] = {}
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        _set_pragmas(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        for name, frames in tables.items():
+            t0 = time.perf_counter()
+            key = primary_key(declared.get(name))
+            tmp = f"_load_{name}"
+            conn.execute(f'DROP TABLE IF EXISTS "{tmp}"')
+            rows, created = 0, False
+            for df in ([frames] if isinstance(frames, pd.DataFrame) else frames):
+                repeated = int(df.duplicated(subset=key).sum()) if key else 0
+                if repeated:
+                    raise ValueError(f"{name}: {repeated:,} rows repeat the primary key ({', '.join(key)})")
+                if not created:
+                    conn.execute(f'CREATE TABLE "{tmp}" ({", ".join(table_definitions(df, declared.get(name)))})')
+                    created = True
+                try:
+                    insert_rows(conn, tmp, df, batch_rows)
+                except sqlite3.IntegrityError:
+                    # a key repeated in an earlier frame of the stream
+                    raise ValueError(f"{name}: rows repeat the primary key ({', '.join(key)}) across frames") from None
+                rows += len(df)
+            if not created:
+                conn.execute(f'CREATE TABLE "{tmp}" ({", ".join(table_definitions(pd.DataFrame(), declared.get(name)))})')
+            stats[name] = {"rows": rows, "seconds": time.perf_counter() - t0}
+
+        for name in tables:
+            t0 = time.perf_counter()
+            conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            conn.execute(f'ALTER TABLE "_load_{name}" RENAME TO "{name}"')
+            create_indexes(conn, name)
+            stats[name]["seconds"] += time.perf_counter() - t0
+
+        if finalize is not None:
+            finalize(conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return stats
+
+
+def update_columns(db_path: Path, table: str, frames: Iterable[pd.DataFrame], key: str,
+                   finalize: Callable[[sqlite3.Connection], None] | None = None,
+                   batch_rows: int = BATCH_ROWS) -> int:
+    """Apply streamed column updates (update_rows per frame) in one transaction; returns rows sent."""
+    rows = 0
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        _set_pragmas(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        for df in frames:
+            update_rows(conn, table, df, key, batch_rows)
+            rows += len(df)
+        if finalize is not None:
+            finalize(conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return rows
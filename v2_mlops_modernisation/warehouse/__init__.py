@@ -0,0 +1 @@
+# warehouse package
@@ -0,0 +1,229 @@
+"""
+Warehouse query layer (V2): covering indexes, KPI rollups and dashboard queries.
+
+The BI pages (heatmaps, clinic leaderboard, risk worklist) aggregate fact_appointments.
+Instead of scanning the fact table per visual, the warehouse keeps:
+- covering indexes on fact_appointments for the main slicers (date_key, clinic_id,
+  neighbourhood_id, risk_band), carrying the measure columns so filtered aggregates
+  are answered from the index alone
+- additive rollups keyed by date (sums and counts, so any coarser grouping and any
+  date range can be summed from them):
+  - rollup_clinic_hour_dow: date_key x clinic_id x appointment_hour x appointment_dow
+  - rollup_lead_band_dow:   date_key x lead_time_band x appointment_dow
+
+The rollups are rebuilt with every warehouse load (ETL and scoring) and refreshed for
+the affected dates by the incremental ETL. Risk measures are NULL until the fact table
+has been scored by ml/train.py.
+
+Usage:
+  from v2_mlops_modernisation.warehouse import queries
+  with queries.connect() as conn:
+      queries.dow_hour_heatmap(conn, start="2026-01-01", end="2026-01-31")
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+
+import pandas as pd
+
+
+FACT = "fact_appointments"
+HIGH_RISK_BANDS = ("High", "Critical")
+
+_MEASURE_COLUMNS = ["no_show_label", "lead_time_days", "sms_reminder_sent"]
+
+# index column -> columns of the covering index (slicer first, then carried columns)
+COVERING_INDEXES = {
+    "date_key": ["date_key", "clinic_id", *_MEASURE_COLUMNS],
+    "clinic_id": ["clinic_id", "date_key", *_MEASURE_COLUMNS],
+    "neighbourhood_id": ["neighbourhood_id", "date_key", *_MEASURE_COLUMNS],
+    "risk_band": ["risk_band", "predicted_no_show_proba", "date_key", "clinic_id"],
+}
+
+# rollup table -> grouping columns (date_key first)
+ROLLUPS = {
+    "rollup_clinic_hour_dow": ["date_key", "clinic_id", "appointment_hour", "appointment_dow"],
+    "rollup_lead_band_dow": ["date_key", "lead_time_band", "appointment_dow"],
+}
+
+_MEASURES = ["appointments", "no_shows", "sum_lead_time_days", "sms_sent", "high_risk", "sum_predicted_proba"]
+
+
+def default_db_path() -> Path:
+    return Path(__file__).resolve().parent / "warehouse.db"
+
+
+def connect(db_path: Path | None = None) -> sqlite3.Connection:
+    """Read-only connection to the warehouse."""
+    path = Path(db_path or default_db_path())
+    if not path.exists():
+        raise FileNotFoundError(f"Missing warehouse: {path}. Run ETL first.")
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')}
+
+
+def _keys(conn: sqlite3.Connection, values) -> str:
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _rollup_dates (k TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM _rollup_dates")
+    conn.executemany("INSERT OR IGNORE INTO _rollup_dates VALUES (?)", [(str(v),) for v in values])
+    return "(SELECT k FROM _rollup_dates)"
+
+
+# ---------------------------------------------------------------------------
+# Build / refresh (called inside the loaders' transactions)
+# ---------------------------------------------------------------------------
+
+def ensure_indexes(conn: sqlite3.Connection) -> None:
+    """Create the covering indexes whose columns exist (risk_band appears after scoring)."""
+    cols = _columns(conn, FACT)
+    for name, index_cols in COVERING_INDEXES.items():
+        if set(index_cols) <= cols:
+            col_list = ", ".join(f'"{c}"' for c in index_cols)
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{FACT}_cover_{name}" ON "{FACT}" ({col_list})')
+
+
+def _measure_sql(cols: set[str]) -> str:
+    scored = {"risk_band", "predicted_no_show_proba"} <= cols
+    bands = ", ".join(f"'{b}'" for b in HIGH_RISK_BANDS)
+    return ", ".join([
+        "COUNT(*)",
+        "SUM(no_show_label)",
+        "SUM(lead_time_days)",
+        "SUM(sms_reminder_sent)",
+        f"SUM(risk_band IN ({bands}))" if scored else "NULL",
+        "SUM(predicted_no_show_proba)" if scored else "NULL",
+    ])
+
+
+def refresh_rollups(conn: sqlite3.Connection, dates=None) -> None:
+    """Recompute rollup rows from fact_appointments, for all dates or only the given ones."""
+    cols = _columns(conn, FACT)
+    where = f"WHERE date_key IN {_keys(conn, dates)}" if dates is not None else ""
+    for table, group in ROLLUPS.items():
+        group_list = ", ".join(group)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(group)}, "
+                     "appointments INTEGER, no_shows INTEGER, sum_lead_time_days REAL, sms_sent INTEGER, "
+                     f"high_risk INTEGER, sum_predicted_proba REAL, PRIMARY KEY ({group_list}))")
+        conn.execute(f"DELETE FROM {table} {where}")
+        conn.execute(f"INSERT INTO {table} SELECT {group_list}, {_measure_sql(cols)} "
+                     f"FROM {FACT} {where} GROUP BY {group_list}")
+
+
+def build_query_layer(conn: sqlite3.Connection) -> None:
+    """Covering indexes plus full rollup rebuild, after a full fact load."""
+    ensure_indexes(conn)
+    for table in ROLLUPS:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    refresh_rollups(conn)
+
+
+def ensure_query_layer(conn: sqlite3.Connection) -> None:
+    """Build the query layer if the warehouse predates it (before date-level refreshes)."""
+    existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not set(ROLLUPS) <= existing:
+        build_query_layer(conn)
+    else:
+        ensure_indexes(conn)
+
+
+# ---------------------------------------------------------------------------
+# Dashboard queries
+# ---------------------------------------------------------------------------
+
+def _date_filter(start: str | None, end: str | None, extra: dict[str, str] | None = None) -> tuple[str, list]:
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("date_key >= ?")
+        params.append(str(start)[:10])
+    if end is not None:
+        clauses.append("date_key <= ?")
+        params.append(str(end)[:10])
+    for col, value in (extra or {}).items():
+        if value is not None:
+            clauses.append(f"{col} = ?")
+            params.append(value)
+    return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _finish(df: pd.DataFrame) -> pd.DataFrame:
+    """Rates from summed measures (same rounding as the kpi_* tables)."""
+    out = df.drop(columns=["sum_lead_time_days", "sms_sent", "high_risk", "sum_predicted_proba"])
+    n = df["appointments"]
+    out["no_show_rate"] = (df["no_shows"] / n).round(4)
+    out["avg_lead_time"] = (df["sum_lead_time_days"] / n).round(2)
+    out["sms_rate"] = (df["sms_sent"] / n).round(3)
+    out["high_risk_rate"] = (df["high_risk"] / n).round(4)
+    out["avg_predicted_risk"] = (df["sum_predicted_proba"] / n).round(4)
+    return out
+
+
+def _rollup(conn: sqlite3.Connection, table: str, by: list[str], start: str | None, end: str | None,
+            filters: dict[str, str] | None = None) -> pd.DataFrame:
+    where, params = _date_filter(start, end, filters)
+    sums = ", ".join(f"SUM({m}) AS {m}" for m in _MEASURES)
+    group = ", ".join(by)
+    sql = f"SELECT {group + ', ' if by else ''}{sums} FROM {table} {where}"
+    if by:
+        sql += f" GROUP BY {group} ORDER BY {group}"
+    df = pd.read_sql(sql, conn, params=params)
+    return _finish(df.astype({m: float for m in _MEASURES[2:]}))
+
+
+def summary(conn: sqlite3.Connection, start: str | None = None, end: str | None = None,
+            clinic_id: str | None = None) -> dict[str, float]:
+    """Executive tiles: totals and rates over a date range (optionally one clinic)."""
+    row = _rollup(conn, "rollup_clinic_hour_dow", [], start, end, {"clinic_id": clinic_id}).iloc[0]
+    return {k: (None if pd.isna(v) else float(v)) for k, v in row.items()}
+
+
+def daily_trend(conn: sqlite3.Connection, start: str | None = None, end: str | None = None,
+                clinic_id: str | None = None) -> pd.DataFrame:
+    return _rollup(conn, "rollup_clinic_hour_dow", ["date_key"], start, end, {"clinic_id": clinic_id})
+
+
+def dow_hour_heatmap(conn: sqlite3.Connection, start: str | None = None, end: str | None = None,
+                     clinic_id: str | None = None) -> pd.DataFrame:
+    return _rollup(conn, "rollup_clinic_hour_dow", ["appointment_dow", "appointment_hour"], start, end,
+                   {"clinic_id": clinic_id})
+
+
+def clinic_leaderboard(conn: sqlite3.Connection, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+    board = _rollup(conn, "rollup_clinic_hour_dow", ["clinic_id"], start, end)
+    return board.sort_values(["no_show_rate", "clinic_id"], ascending=[False, True]).reset_index(drop=True)
+
+
+def lead_band_dow_heatmap(conn: sqlite3.Connection, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+    return _rollup(conn, "rollup_lead_band_dow", ["lead_time_band", "appointment_dow"], start, end)
+
+
+def neighbourhood_hotspots(conn: sqlite3.Connection, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+    """Per-neighbourhood totals, answered from the neighbourhood covering index."""
+    where, params = _date_filter(start, end)
+    df = pd.read_sql(
+        f"SELECT neighbourhood_id, COUNT(*) AS appointments, SUM(no_show_label) AS no_shows, "
+        f"SUM(lead_time_days) AS sum_lead_time_days, SUM(sms_reminder_sent) AS sms_sent, "
+        f"NULL AS high_risk, NULL AS sum_predicted_proba "
+        f"FROM {FACT} {where} "
+        f"GROUP BY neighbourhood_id ORDER BY neighbourhood_id",
+        conn, params=params)
+    return _finish(df.astype({m: float for m in _MEASURES[2:]})).drop(columns=["high_risk_rate", "avg_predicted_risk"])
+
+
+def risk_worklist(conn: sqlite3.Connection, limit: int = 200, start: str | None = None,
+                  end: str | None = None, clinic_id: str | None = None) -> pd.DataFrame:
+    """Highest-risk scored appointments (High/Critical bands), most likely no-show first."""
+    if "risk_band" not in _columns(conn, FACT):
+        raise RuntimeError("fact_appointments is not scored yet. Run ml/train.py first.")
+    where, params = _date_filter(start, end, {"clinic_id": clinic_id})
+    band_clause = f"risk_band IN ({', '.join('?' for _ in HIGH_RISK_BANDS)})"
+    where = f"{where} AND {band_clause}" if where else f"WHERE {band_clause}"
+    return pd.read_sql(
+        f"SELECT appointment_id, date_key, appointment_datetime, clinic_id, patient_id, appointment_type, "
+        f"risk_band, predicted_no_show_proba FROM {FACT} {where} "
+        f"ORDER BY predicted_no_show_proba DESC, appointment_id LIMIT ?",
+        conn, params=params + list(HIGH_RISK_BANDS) + [int(limit)])